@@ -0,0 +1,325 @@
+"""Threshold alerts on every new snapshot, with hysteresis, debounce and fan-out to sinks.
+
+A rule compares one metric of a subject (the market for a bar interval, a universe pair,
+a portfolio) with a threshold:
+
+    name,metric,op,threshold,hysteresis,debounce,severity,scope
+    risk_elevated,risk_score,>=,6,1,1,warning,market
+    credit_stress,hyg_tlt_change,<,-1.5,0.5,2,warning,market
+    divergence,vix_outlook,==,DIVERGENCE ALERT,0,1,critical,market
+
+A rule fires once its condition has held for `debounce` consecutive evaluations and clears
+only when the metric is back more than `hysteresis` past the threshold, so a score
+flickering around 6 raises one alert rather than one per tick. Text metrics such as the
+VIX outlook are compared on their label (the text before the first colon).
+
+Rules are compiled into arrays once; an evaluation gathers a (subjects x rules) matrix of
+metric values and updates the streak and active state of every rule and subject in a few
+numpy operations. Alerts go to the sinks from a background thread, so a slow webhook or
+mail server never holds up a refresh.
+"""
+import json
+import os
+import queue
+import smtplib
+import threading
+import urllib.request
+from collections import Counter, deque, namedtuple
+from datetime import datetime
+from email.message import EmailMessage
+
+import numpy as np
+import pandas as pd
+
+from hedging import read_table
+from instrumentation import count, timer
+
+# JAMS_ALERT_RULES=<csv or parquet> replaces DEFAULT_RULES
+RULES_FILE = os.environ.get('JAMS_ALERT_RULES')
+
+# Sinks: the log file is always written; the webhook and mail sinks are enabled by their variables
+ALERT_LOG = os.environ.get(
+    'JAMS_ALERT_LOG',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'alerts.jsonl')
+)
+ALERT_WEBHOOK = os.environ.get('JAMS_ALERT_WEBHOOK')
+ALERT_SMTP = os.environ.get('JAMS_ALERT_SMTP')  # host:port, e.g. localhost:1025
+ALERT_TO = [a.strip() for a in os.environ.get('JAMS_ALERT_TO', '').split(',') if a.strip()]
+ALERT_FROM = os.environ.get('JAMS_ALERT_FROM', 'jams-terminal@localhost')
+
+# Alerts kept in memory for display
+RECENT_ALERTS = 100
+
+SCOPES = ('market', 'universe', 'portfolio')
+SEVERITIES = ('info', 'warning', 'critical')
+
+RULE_COLUMNS = ['name', 'metric', 'op', 'threshold', 'hysteresis', 'debounce', 'severity', 'scope']
+
+Rule = namedtuple('Rule', RULE_COLUMNS, defaults=(0.0, 1, 'warning', 'market'))
+
+# One state change of a rule for one subject; state is 'fired' or 'cleared'
+Alert = namedtuple('Alert', ['at', 'scope', 'subject', 'rule', 'severity', 'state', 'metric', 'value', 'op',
+                             'threshold'])
+
+DEFAULT_RULES = [
+    Rule('risk_elevated', 'risk_score', '>=', 6, 1, 1, 'warning'),
+    Rule('risk_extreme', 'risk_score', '>=', 8, 1, 1, 'critical'),
+    Rule('credit_stress', 'hyg_tlt_change', '<', -1.5, 0.5, 2, 'warning'),
+    Rule('vix_divergence', 'vix_outlook', '==', 'DIVERGENCE ALERT', 0, 1, 'critical'),
+    Rule('pair_breakdown', 'zscore', '<=', -3, 0.5, 1, 'info', 'universe'),
+]
+
+# Side of the threshold each comparison fires on, and whether it excludes the threshold itself
+_OPS = {'>': (1.0, True), '>=': (1.0, False), '<': (-1.0, True), '<=': (-1.0, False), '==': (0.0, False)}
+
+
+def outlook_label(text):
+    """Label of a VIX outlook ('DIVERGENCE ALERT: ...' -> 'DIVERGENCE ALERT')"""
+    return str(text).split(':')[0].strip().upper()
+
+
+def load_rules(path=RULES_FILE):
+    """Rules from a CSV or Parquet table, or DEFAULT_RULES"""
+    if not path:
+        return list(DEFAULT_RULES)
+    with open(path, 'rb') as f:
+        frame = read_table(f.read(), path)
+    missing = {'name', 'metric', 'op', 'threshold'} - set(frame.columns)
+    if missing:
+        raise ValueError(f"alert rules need {', '.join(sorted(missing))} columns")
+    frame = frame[[c for c in RULE_COLUMNS if c in frame.columns]]
+    rules = []
+    for row in frame.itertuples(index=False):
+        values = {k: v for k, v in row._asdict().items() if not pd.isna(v)}
+        try:
+            values['threshold'] = float(values['threshold'])
+        except ValueError:
+            pass  # a text threshold, matched against the metric's label
+        rules.append(Rule(**values))
+    return rules
+
+
+class AlertEngine:
+    """Compiled rules of one scope and the per-subject state they carry between evaluations"""
+
+    def __init__(self, rules, scope='market', dispatcher=None, recent=RECENT_ALERTS):
+        self.scope = scope
+        self.rules = [r for r in rules if r.scope == scope]
+        self.dispatcher = dispatcher
+        self.recent = deque(maxlen=recent)
+        for rule in self.rules:
+            if rule.op not in _OPS:
+                raise ValueError(f"rule {rule.name}: unknown operator {rule.op}")
+            if rule.severity not in SEVERITIES:
+                raise ValueError(f"rule {rule.name}: unknown severity {rule.severity}")
+
+        self.metrics = list(dict.fromkeys(r.metric for r in self.rules))
+        # Text thresholds are compared as codes in a per-engine vocabulary
+        self._vocabulary = {}
+        self._text_metrics = {r.metric for r in self.rules if isinstance(r.threshold, str)}
+        thresholds = [self._code(r.threshold) if r.metric in self._text_metrics else float(r.threshold)
+                      for r in self.rules]
+
+        self._metric = np.array([self.metrics.index(r.metric) for r in self.rules], dtype=np.intp)
+        self._side = np.array([_OPS[r.op][0] for r in self.rules])
+        self._strict = np.array([_OPS[r.op][1] for r in self.rules])
+        self._equal = self._side == 0
+        self._threshold = np.array(thresholds, dtype=float)
+        self._hysteresis = np.array([float(r.hysteresis) for r in self.rules])
+        self._debounce = np.array([max(int(r.debounce), 1) for r in self.rules])
+
+        self._subjects = {}
+        self._active = np.zeros((0, len(self.rules)), dtype=bool)
+        self._streak = np.zeros((0, len(self.rules)), dtype=np.int64)
+        self._lock = threading.Lock()
+
+    def _code(self, text):
+        return float(self._vocabulary.setdefault(outlook_label(text), len(self._vocabulary)))
+
+    def _encode(self, metric, value):
+        if metric in self._text_metrics:
+            return self._vocabulary.get(outlook_label(value), -1.0) if value is not None else np.nan
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return np.nan
+
+    def _rows(self, subjects):
+        """State rows of `subjects`, adding empty state for ones not seen before"""
+        rows = []
+        for subject in subjects:
+            row = self._subjects.get(subject)
+            if row is None:
+                row = self._subjects[subject] = len(self._subjects)
+            rows.append(row)
+        grow = len(self._subjects) - len(self._active)
+        if grow > 0:
+            self._active = np.vstack([self._active, np.zeros((grow, len(self.rules)), dtype=bool)])
+            self._streak = np.vstack([self._streak, np.zeros((grow, len(self.rules)), dtype=np.int64)])
+        return np.array(rows, dtype=np.intp)
+
+    def evaluate_one(self, subject, values, at=None):
+        """Evaluate one subject's {metric: value} mapping; returns the alerts raised or cleared"""
+        row = np.array([[self._encode(m, values.get(m)) for m in self.metrics]], dtype=float)
+        return self._evaluate([subject], row, at)
+
+    def evaluate(self, frame, at=None):
+        """Evaluate every row of a (subjects x metrics) frame; returns the alerts raised or cleared"""
+        values = np.full((len(frame), len(self.metrics)), np.nan)
+        for k, metric in enumerate(self.metrics):
+            if metric not in frame.columns:
+                continue
+            if metric in self._text_metrics:
+                values[:, k] = [self._encode(metric, v) for v in frame[metric]]
+            else:
+                values[:, k] = pd.to_numeric(frame[metric], errors='coerce').to_numpy(dtype=float)
+        return self._evaluate(list(frame.index), values, at)
+
+    def _evaluate(self, subjects, values, at):
+        if not self.rules or not subjects:
+            return []
+        with timer('alert_evaluate'), self._lock:
+            rows = self._rows(subjects)
+            value = values[:, self._metric]                # (subjects, rules)
+            distance = (value - self._threshold) * self._side
+            with np.errstate(invalid='ignore'):
+                condition = np.where(self._equal, value == self._threshold,
+                                     np.where(self._strict, distance > 0, distance >= 0))
+                # An active rule holds until the metric is back more than the hysteresis past the
+                # threshold; a missing value leaves it as it is
+                hold = np.isnan(value) | np.where(self._equal, condition, distance >= -self._hysteresis)
+
+            active = self._active[rows]
+            streak = np.where(condition, self._streak[rows] + 1, 0)
+            fired = ~active & (streak >= self._debounce)
+            cleared = active & ~hold
+            self._active[rows] = (active | fired) & ~cleared
+            self._streak[rows] = streak
+
+        alerts = self._alerts(subjects, value, fired, cleared, at)
+        if alerts:
+            self.recent.extend(alerts)
+            for (severity, state), n in Counter((a.severity, a.state) for a in alerts).items():
+                count('alerts', n, scope=self.scope, severity=severity, state=state)
+            if self.dispatcher is not None:
+                self.dispatcher.publish(alerts)
+        return alerts
+
+    def _alerts(self, subjects, value, fired, cleared, at):
+        at = at or datetime.now()
+        alerts = []
+        for state, mask in (('fired', fired), ('cleared', cleared)):
+            for i, j in zip(*np.nonzero(mask)):
+                rule = self.rules[j]
+                shown = rule.threshold if rule.metric in self._text_metrics else float(value[i, j])
+                alerts.append(Alert(at, self.scope, subjects[i], rule.name, rule.severity, state, rule.metric,
+                                    shown, rule.op, rule.threshold))
+        return alerts
+
+    def active(self):
+        """(subject, rule name) of every alert currently raised"""
+        with self._lock:
+            subjects = list(self._subjects)
+            rows, cols = np.nonzero(self._active)
+        return [(subjects[i], self.rules[j].name) for i, j in zip(rows, cols)]
+
+
+def _record(alert):
+    record = alert._asdict()
+    record['at'] = alert.at.isoformat()
+    record['subject'] = str(alert.subject)
+    if isinstance(alert.value, float) and not np.isfinite(alert.value):
+        record['value'] = None
+    return record
+
+
+def _text(alert):
+    return (f"[{alert.severity.upper()}] {alert.rule} {alert.state} for {alert.scope} {alert.subject}: "
+            f"{alert.metric} {alert.value} {alert.op} {alert.threshold}")
+
+
+class LogSink:
+    """Appends one JSON line per alert"""
+
+    def __init__(self, path=ALERT_LOG):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def send(self, alerts):
+        with open(self.path, 'a') as f:
+            f.writelines(json.dumps(_record(a)) + '\n' for a in alerts)
+
+
+class WebhookSink:
+    """POSTs each batch of alerts as a JSON array"""
+
+    def __init__(self, url=ALERT_WEBHOOK, timeout=5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, alerts):
+        request = urllib.request.Request(self.url, data=json.dumps([_record(a) for a in alerts]).encode(),
+                                         headers={'Content-Type': 'application/json'}, method='POST')
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class SMTPSink:
+    """Mails each batch of alerts as one plain-text message"""
+
+    def __init__(self, address=ALERT_SMTP, recipients=ALERT_TO, sender=ALERT_FROM, timeout=5.0):
+        host, _, port = address.partition(':')
+        self.host, self.port = host, int(port or 25)
+        self.recipients = list(recipients)
+        self.sender = sender
+        self.timeout = timeout
+
+    def send(self, alerts):
+        message = EmailMessage()
+        worst = max(alerts, key=lambda a: SEVERITIES.index(a.severity))
+        message['Subject'] = f"JAMS {worst.severity.upper()}: {len(alerts)} alert(s), {worst.rule} {worst.state}"
+        message['From'] = self.sender
+        message['To'] = ', '.join(self.recipients)
+        message.set_content('\n'.join(_text(a) for a in alerts))
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            smtp.send_message(message)
+
+
+def default_sinks():
+    """Log file sink, plus webhook and mail sinks when JAMS_ALERT_WEBHOOK / JAMS_ALERT_SMTP are set"""
+    sinks = [LogSink()]
+    if ALERT_WEBHOOK:
+        sinks.append(WebhookSink())
+    if ALERT_SMTP and ALERT_TO:
+        sinks.append(SMTPSink())
+    return sinks
+
+
+class AlertDispatcher:
+    """Delivers alert batches to every sink from one background thread"""
+
+    def __init__(self, sinks):
+        self.sinks = list(sinks)
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='alert-dispatcher', daemon=True)
+        self._thread.start()
+
+    def publish(self, alerts):
+        self._queue.put(list(alerts))
+
+    def flush(self):
+        """Block until every published batch has been delivered"""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            alerts = self._queue.get()
+            try:
+                for sink in self.sinks:
+                    try:
+                        sink.send(alerts)
+                    except Exception:
+                        count('alert_delivery_errors', sink=type(sink).__name__)
+            finally:
+                self._queue.task_done()
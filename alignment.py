@@ -0,0 +1,88 @@
+"""Calendar alignment of close frames with missing bars and mismatched trading calendars.
+
+Tickers do not all print on the same days: ^VIX trades some sessions the ETFs do not, FX
+ETFs skip others, and a late print leaves a hole in the newest row. align_prices puts every
+column on one session calendar, carries each gap forward for at most FILL_SESSIONS sessions
+and records how many sessions old every value is, so a missing close is bridged briefly and
+flagged instead of turning a ratio change into NaN. Gaps longer than the limit stay missing,
+and the scores computed from them are left unscored rather than bucketed as calm.
+"""
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Sessions a missing close may be carried forward before it is left missing
+FILL_SESSIONS = int(os.environ.get('JAMS_FILL_SESSIONS', 3))
+
+# Share of the printing tickers that must have a bar for a date to count as a session
+CALENDAR_QUORUM = 0.5
+
+# prices: closes on the session calendar, gaps of up to max_fill sessions carried forward
+# age: sessions since the value's own print, 0 where it printed, NaN before a ticker's first print
+# last_valid: timestamp of every ticker's newest real print, NaT if it never printed
+AlignedPrices = namedtuple('AlignedPrices', ['prices', 'age', 'last_valid'])
+
+
+def session_calendar(frame, quorum=CALENDAR_QUORUM):
+    """Boolean mask of the rows where at least `quorum` of the printing columns have a bar"""
+    printed = frame.notna().to_numpy()
+    active = printed.any(axis=0).sum()
+    return printed.sum(axis=1) >= max(quorum * active, 1)
+
+
+def _fill(values, missing, max_fill):
+    """Bounded forward fill of a (rows, columns) block: (filled, age, newest printed row)"""
+    rows = np.arange(len(values), dtype=np.int32)[:, None]
+    # Row of the latest print at or before every row, -1 before a ticker's first print
+    last_row = np.maximum.accumulate(np.where(missing, np.int32(-1), rows), axis=0)
+    age = (rows - last_row).astype(float)
+    age[last_row < 0] = np.nan
+    filled = np.take_along_axis(values, np.maximum(last_row, 0), axis=0)
+    filled[~(age <= max_fill)] = np.nan
+    newest = last_row[-1] if len(values) else np.full(values.shape[1], -1)
+    return filled, age, newest
+
+
+def align_prices(frame, max_fill=FILL_SESSIONS, quorum=CALENDAR_QUORUM):
+    """Closes of `frame` on one session calendar with bounded forward fill and per-value data age.
+
+    Rows outside the calendar (a lone ^VIX print on an exchange holiday) are dropped. Each
+    value is replaced by the ticker's last print when that print is at most `max_fill`
+    sessions old. The fill is one running maximum and one gather over just the columns that
+    have a gap, so a clean frame costs a copy and thousands of tickers a few array passes.
+    """
+    frame = frame.loc[session_calendar(frame, quorum)]
+    values = frame.to_numpy(dtype=float)
+    missing = np.isnan(values)
+
+    # Only columns with a gap need the fill; the rest are fresh on every session
+    gappy = np.flatnonzero(missing.any(axis=0))
+    if len(gappy) == values.shape[1]:
+        filled, age, newest = _fill(values, missing, max_fill)
+    else:
+        filled, age = values.copy(), np.zeros(values.shape)
+        newest = np.full(values.shape[1], len(values) - 1)
+        if len(gappy):
+            filled[:, gappy], age[:, gappy], newest[gappy] = _fill(values[:, gappy], missing[:, gappy], max_fill)
+
+    last_valid = pd.Series(frame.index[np.maximum(newest, 0)] if len(values) else pd.NaT,
+                           index=frame.columns).where(newest >= 0)
+    return AlignedPrices(
+        prices=pd.DataFrame(filled, index=frame.index, columns=frame.columns),
+        age=pd.DataFrame(age, index=frame.index, columns=frame.columns),
+        last_valid=last_valid,
+    )
+
+
+def latest_age(aligned):
+    """Sessions since every ticker's last print as of the newest session, NaN if it never printed"""
+    return aligned.age.iloc[-1] if len(aligned.age) else pd.Series(np.nan, index=aligned.age.columns)
+
+
+def stale_tickers(ages):
+    """Tickers whose newest value is carried forward or missing, oldest first"""
+    ages = pd.Series(ages, dtype=float)
+    stale = ages[~(ages == 0)]
+    return stale.fillna(np.inf).sort_values(ascending=False, kind='stable').index.tolist()
@@ -0,0 +1,296 @@
+"""Headless scoring API: the terminal's numbers as JSON over HTTP, without Streamlit.
+
+Usage:  python api.py [--host 127.0.0.1] [--port 8502] [--interval 1d]
+
+    GET /score                        risk score, signals, outlook and hedge % of the latest snapshot
+    GET /hedge?dollar_beta=1000000    hedge recommendation for one portfolio
+    GET /history?start=2024-01-01     latest stored score of every market date in [start, end]
+    GET /alerts                       active alerts and the latest alerts raised or cleared
+    GET /metrics                      stage latencies and counters as Prometheus text
+
+Requests are served by a small asyncio HTTP/1.1 server with keep-alive. Every response is
+built from the shared snapshot in core.py, so the numbers are the dashboard's. /score and
+/hedge bodies are serialized once per snapshot version (and dollar beta) and then served
+as cached bytes. /history reads run on a thread pool against the score store's read-only
+connection pool and are cached per date range until the next snapshot is published. While
+a ticker is stale past the fill limit the snapshot cannot be scored, and /score and /hedge
+answer 503 with the stale tickers.
+"""
+import argparse
+import asyncio
+import json
+import math
+from collections import OrderedDict
+from datetime import date, datetime
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from alignment import stale_tickers
+from core import alert_engine, hedge_recommendation, market_service, regime_generation, score_store, snapshot_scores
+from instrumentation import METRICS, count, timer
+from price_store import DEFAULT_INTERVAL, INTERVALS
+from risk_engine import TICKERS
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8502
+
+# Serialized bodies kept for the current snapshot: /hedge per dollar beta, /history per date range
+HEDGE_CACHE_ENTRIES = 256
+HISTORY_CACHE_ENTRIES = 64
+
+# Largest request head accepted, and largest body drained to keep a connection open, in bytes
+MAX_HEAD_BYTES = 16 * 1024
+MAX_BODY_BYTES = 64 * 1024
+
+HISTORY_COLUMNS = ('risk_score', 'hedge_percentage', 'credit_score', 'currency_score', 'breadth_score',
+                   'vix_momentum_score', 'vix_percentile')
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error',
+            503: 'Service Unavailable'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, **details):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+
+def _clean(value):
+    """JSON-ready copy of a result: numpy scalars unwrapped, NaN, inf and NaT as null, times as ISO strings"""
+    if isinstance(value, dict):
+        return {str(k): _clean(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_clean(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is pd.NaT:
+        return None
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, (datetime, date, pd.Timestamp)):
+        return value.isoformat()
+    return value
+
+
+def _json(value):
+    return json.dumps(_clean(value), separators=(',', ':')).encode()
+
+
+def _cached(bodies, key, name, entries):
+    """Body cached under `key`, refreshed as most recent; None on a miss once room is made for it"""
+    count('cache_requests', cache=name)
+    body = bodies.get(key)
+    if body is not None:
+        bodies.move_to_end(key)
+        return body
+    count('cache_misses', cache=name)
+    while len(bodies) >= entries:
+        bodies.popitem(last=False)
+    return None
+
+
+class ScoringService:
+    """Route handlers over one bar interval's shared snapshot, with per-version response caches"""
+
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self.service = market_service(interval)
+        self._version = None
+        self._generation = None
+        self._scores = None
+        self._current_data = None
+        self._score_body = None
+        self._hedge_bodies = OrderedDict()
+        self._history_bodies = OrderedDict()
+
+    async def _snapshot(self, loop):
+        snapshot = self.service.snapshot() if self._version is not None else None
+        if snapshot is None:
+            # Nothing published yet: the first fetch blocks, so it runs off the event loop
+            snapshot = await loop.run_in_executor(None, self.service.snapshot)
+            if snapshot is None:
+                raise HTTPError(503, f"no market data: {self.service.last_error}")
+        generation = regime_generation()
+        if snapshot.version != self._version or generation != self._generation:
+            # A new snapshot, or a regime model fitted since these bodies were built
+            try:
+                scores = await loop.run_in_executor(None, snapshot_scores, self.interval, snapshot)
+            except ValueError as e:
+                # A close missing past the fill limit leaves the snapshot unscored until it prints
+                ages = snapshot.current_data.get('data_age', {})
+                raise HTTPError(503, f"latest snapshot is unscored: {e}",
+                                stale_tickers=stale_tickers({t: ages.get(t) for t in TICKERS}))
+            self._publish(snapshot, scores)
+            self._generation = generation
+        return snapshot
+
+    def _publish(self, snapshot, scores):
+        risk_score, detailed_metrics = scores
+        self._scores = scores
+        self._current_data = dict(snapshot.current_data)
+        self._score_body = _json({
+            'interval': self.interval,
+            'version': snapshot.version,
+            'asof': snapshot.historical_data.index[-1],
+            'fetched_at': snapshot.fetched_at,
+            'risk_score': risk_score,
+            'metrics': detailed_metrics,
+            'prices': self._current_data,
+        })
+        self._hedge_bodies.clear()
+        self._history_bodies.clear()
+        self._version = snapshot.version
+
+    async def score(self, loop, query):
+        await self._snapshot(loop)
+        return 200, 'application/json', self._score_body
+
+    async def hedge(self, loop, query):
+        try:
+            dollar_beta = float(query['dollar_beta'][0])
+        except (KeyError, ValueError):
+            raise HTTPError(400, "dollar_beta query parameter is required")
+        if not math.isfinite(dollar_beta) or dollar_beta <= 0:
+            raise HTTPError(400, "dollar_beta must be a positive number")
+        await self._snapshot(loop)
+
+        body = _cached(self._hedge_bodies, dollar_beta, 'api_hedge', HEDGE_CACHE_ENTRIES)
+        if body is None:
+            risk_score, detailed_metrics = self._scores
+            result = hedge_recommendation(dollar_beta, risk_score, detailed_metrics, self._current_data)
+            body = _json(dict(result, interval=self.interval, version=self._version, risk_score=risk_score))
+            self._hedge_bodies[dollar_beta] = body
+        return 200, 'application/json', body
+
+    async def history(self, loop, query):
+        try:
+            start, end = (pd.Timestamp(query[k][0]) if k in query else None for k in ('start', 'end'))
+        except ValueError:
+            raise HTTPError(400, "start and end must be dates")
+        await self._snapshot(loop)
+
+        body = _cached(self._history_bodies, (start, end), 'api_history', HISTORY_CACHE_ENTRIES)
+        if body is None:
+            version = self._version
+            body = await loop.run_in_executor(None, self._history, start, end)
+            if version == self._version:
+                self._history_bodies[(start, end)] = body
+        return 200, 'application/json', body
+
+    def _history(self, start, end):
+        with timer('score_store_read'):
+            frame = score_store().history(self.interval, start, end, columns=HISTORY_COLUMNS)
+        return _json({
+            'interval': self.interval,
+            'asof': [t.isoformat() for t in frame.index],
+            **{c: frame[c].tolist() for c in HISTORY_COLUMNS},
+        })
+
+    async def alerts(self, loop, query):
+        engines = [alert_engine(scope) for scope in ('market', 'universe')]
+        return 200, 'application/json', _json({
+            'active': [{'scope': e.scope, 'subject': subject, 'rule': rule}
+                       for e in engines for subject, rule in e.active()],
+            'recent': sorted((a._asdict() for e in engines for a in e.recent), key=lambda a: a['at'], reverse=True),
+        })
+
+    async def metrics(self, loop, query):
+        return 200, 'text/plain; version=0.0.4', METRICS.prometheus_text().encode()
+
+    def routes(self):
+        return {'/score': self.score, '/hedge': self.hedge, '/history': self.history, '/alerts': self.alerts,
+                '/metrics': self.metrics}
+
+
+def _response(status, content_type, body, keep_alive, head=False):
+    lines = [f"HTTP/1.1 {status} {_REASONS.get(status, '')}", f"Content-Type: {content_type}",
+             f"Content-Length: {len(body)}", f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode() + (b'' if head else body)
+
+
+async def handle_connection(scoring, reader, writer):
+    """Serve requests on one connection until the client closes it or asks to"""
+    loop = asyncio.get_running_loop()
+    routes = scoring.routes()
+    try:
+        while True:
+            try:
+                head = await reader.readuntil(b'\r\n\r\n')
+            except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                break
+            request_line, *header_lines = head.decode('latin-1').split('\r\n')
+            headers = {}
+            for line in header_lines:
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+            try:
+                method, target, version = request_line.split(' ')
+            except ValueError:
+                writer.write(_response(400, 'text/plain', b'malformed request line', False))
+                break
+            connection = headers.get('connection', '').lower()
+            keep_alive = connection != 'close' and (version == 'HTTP/1.1' or connection == 'keep-alive')
+
+            # No route reads a body, but one left on the connection would be parsed as the next
+            # request: drain it, or close after responding when it is chunked, malformed or too large
+            try:
+                length = int(headers.get('content-length', 0))
+            except ValueError:
+                length = -1
+            if 'transfer-encoding' in headers or not 0 <= length <= MAX_BODY_BYTES:
+                keep_alive = False
+            elif length:
+                try:
+                    await reader.readexactly(length)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+
+            url = urlsplit(target)
+            handler = routes.get(url.path)
+            try:
+                if handler is None:
+                    raise HTTPError(404, f"unknown path {url.path}")
+                if method not in ('GET', 'HEAD'):
+                    raise HTTPError(405, f"{method} is not supported")
+                with timer('api_request'):
+                    status, content_type, body = await handler(loop, parse_qs(url.query))
+            except HTTPError as e:
+                status, content_type, body = e.status, 'application/json', _json({'error': str(e), **e.details})
+            except Exception as e:
+                status, content_type, body = 500, 'application/json', _json({'error': str(e)})
+            count('api_requests', path=url.path if handler is not None else 'other', status=status)
+
+            writer.write(_response(status, content_type, body, keep_alive, head=method == 'HEAD'))
+            await writer.drain()
+            if not keep_alive:
+                break
+    finally:
+        writer.close()
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, interval=DEFAULT_INTERVAL):
+    scoring = ScoringService(interval)
+    server = await asyncio.start_server(lambda r, w: handle_connection(scoring, r, w), host, port,
+                                        limit=MAX_HEAD_BYTES)
+    print(f"serving {interval} scores on http://{host}:{port}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve risk scores and hedge recommendations as JSON over HTTP")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--interval', choices=list(INTERVALS), default=DEFAULT_INTERVAL)
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.interval))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Historical backtest of the risk score and hedge curve.
+
+Usage:  python backtest.py prices.csv [--start 2005-01-01] [--end 2024-12-31] [--dollar-beta 1000000]
+"""
+import argparse
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from price_store import PriceStore
+from risk_engine import DEFAULT_PARAMETERS, TICKERS, compute_score_history, hedge_percentage
+
+TRADING_DAYS = 252
+
+BacktestResult = namedtuple('BacktestResult', ['daily', 'summary'])
+
+
+def load_prices(path):
+    """Daily closes from a CSV (date index, one column per ticker) or a price store directory"""
+    if os.path.isdir(path):
+        return PriceStore(path).read(TICKERS)
+    return pd.read_csv(path, index_col=0, parse_dates=True)
+
+
+def _max_drawdown(pnl):
+    """Largest peak-to-trough fall of a cumulative P&L path, as a positive dollar amount"""
+    equity = np.cumsum(pnl)
+    return float(np.max(np.maximum.accumulate(np.maximum(equity, 0)) - equity, initial=0.0))
+
+
+def run_backtest(prices, start=None, end=None, dollar_beta=1_000_000, hedge_scale=1.0,
+                 carry_cost=0.0089, trade_cost_bps=5.0, alert_score=6, horizon=10, params=DEFAULT_PARAMETERS,
+                 scores=None):
+    """Simulate hedging a SPY dollar beta with the recommended hedge percentage.
+
+    The hedge set at each close applies to the next day's SPY return. Hedge cost is the
+    annual carry of the hedge notional (SH expense ratio by default) plus a per-trade cost
+    on every change in hedge notional. No hedge is set on dates the score leaves unscored.
+    """
+    if horizon < 1:
+        raise ValueError("hit rate horizon must be at least 1 session")
+    # Score the full history so look-backs are warm at the start of the range
+    if scores is None:
+        scores = compute_score_history(prices, params)
+    window = slice(start, end)
+    scores = scores.loc[window]
+    spy = prices['SPY'].loc[window].to_numpy(dtype=float)
+    vix = prices['^VIX'].loc[window].to_numpy(dtype=float)
+
+    risk_score = scores['risk_score'].to_numpy()
+    hedge = hedge_percentage(risk_score, scores['vix_percentile'].to_numpy(), vix) / 100
+    hedge = np.clip(hedge * hedge_scale, 0, 1)
+    # An unscored date (warm-up, or a gap past the fill limit) carries no hedge
+    hedge[np.isnan(risk_score)] = 0.0
+
+    # Position held over day t+1 is the hedge decided at the close of day t
+    spy_return = np.zeros_like(spy)
+    spy_return[1:] = np.nan_to_num(spy[1:] / spy[:-1] - 1)
+    held = np.concatenate([[0.0], hedge[:-1]])
+
+    unhedged_pnl = dollar_beta * spy_return
+    carry = dollar_beta * held * carry_cost / TRADING_DAYS
+    turnover = dollar_beta * np.abs(np.diff(hedge, prepend=0.0)) * trade_cost_bps / 10_000
+    hedged_pnl = dollar_beta * (1 - held) * spy_return - carry - turnover
+
+    # Hit rate: how often an alert-level score was followed by a SPY decline over the horizon
+    forward = np.full_like(spy, np.nan)
+    forward[:-horizon] = spy[horizon:] / spy[:-horizon] - 1
+    alerts = (risk_score >= alert_score) & ~np.isnan(forward)
+    measurable = ~np.isnan(forward)
+
+    unhedged_dd = _max_drawdown(unhedged_pnl)
+    hedged_dd = _max_drawdown(hedged_pnl)
+    years = max(len(spy) / TRADING_DAYS, 1 / TRADING_DAYS)
+    summary = {
+        'start': scores.index[0] if len(scores) else None,
+        'end': scores.index[-1] if len(scores) else None,
+        'days': len(spy),
+        'alert_days': int(alerts.sum()),
+        'hit_rate': float((forward[alerts] < 0).mean()) if alerts.any() else float('nan'),
+        'base_rate': float((forward[measurable] < 0).mean()) if measurable.any() else float('nan'),
+        'unhedged_max_drawdown': unhedged_dd,
+        'hedged_max_drawdown': hedged_dd,
+        'drawdown_reduction': 1 - hedged_dd / unhedged_dd if unhedged_dd else 0.0,
+        'hedge_cost': float(carry.sum() + turnover.sum()),
+        'hedge_cost_annual_pct': float((carry.sum() + turnover.sum()) / dollar_beta / years * 100),
+        'unhedged_pnl': float(unhedged_pnl.sum()),
+        'hedged_pnl': float(hedged_pnl.sum()),
+        'hedged_calmar': float(hedged_pnl.sum() / hedged_dd) if hedged_dd else 0.0,
+        'average_hedge_pct': float(held.mean() * 100) if len(held) else 0.0,
+    }
+
+    daily = pd.DataFrame({
+        'risk_score': risk_score,
+        'hedge_pct': hedge * 100,
+        'spy_return': spy_return,
+        'unhedged_pnl': unhedged_pnl,
+        'hedged_pnl': hedged_pnl,
+        'hedge_cost': carry + turnover,
+    }, index=scores.index)
+    return BacktestResult(daily, summary)
+
+
+# Prices and default scores are sent to each sweep worker once, not once per setting
+_worker_prices = None
+_worker_scores = None
+
+
+def _init_worker(prices):
+    global _worker_prices, _worker_scores
+    _worker_prices = prices
+    _worker_scores = compute_score_history(prices)
+
+
+def _run_settings(settings):
+    # Precomputed scores only apply when the settings keep the default score parameters
+    scores = None if 'params' in settings else _worker_scores
+    return dict(settings, **run_backtest(_worker_prices, scores=scores, **settings).summary)
+
+
+def sweep(prices, settings, max_workers=None):
+    """Run one backtest per settings dict across a process pool; returns a summary DataFrame"""
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(prices,)) as pool:
+        rows = list(pool.map(_run_settings, settings, chunksize=max(1, len(settings) // 64)))
+    return pd.DataFrame(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the risk score and hedge curve")
+    parser.add_argument('prices', help="CSV of daily closes or a price store directory")
+    parser.add_argument('--start')
+    parser.add_argument('--end')
+    parser.add_argument('--dollar-beta', type=float, default=1_000_000)
+    args = parser.parse_args()
+
+    result = run_backtest(load_prices(args.prices), args.start, args.end, args.dollar_beta)
+    for key, value in result.summary.items():
+        print(f"{key:>24}: {value:,.4f}" if isinstance(value, float) else f"{key:>24}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""Time one steady-state alert evaluation tick for 100 to 5,000 rules over 1 to 1,000 subjects.
+
+Run from the repo root:  python benchmarks/bench_alerts.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alerts import AlertEngine, Rule
+
+METRICS = 20
+OPS = ('>', '>=', '<', '<=')
+
+
+def main():
+    rng = np.random.default_rng(0)
+    for rules in (100, 1_000, 5_000):
+        engine = AlertEngine([Rule(f'rule_{i}', f'm{i % METRICS}', OPS[i % len(OPS)], rng.normal(), 0.1, 2)
+                              for i in range(rules)])
+        values = {f'm{k}': v for k, v in enumerate(rng.normal(size=METRICS))}
+        for _ in range(3):  # past the debounce, so the timed ticks raise nothing new
+            engine.evaluate_one('market', values)
+        start = time.perf_counter()
+        for _ in range(1_000):
+            engine.evaluate_one('market', values)
+        single = (time.perf_counter() - start) * 1000
+        for subjects in (100, 1_000):
+            frame = pd.DataFrame(rng.normal(size=(subjects, METRICS)), columns=[f'm{k}' for k in range(METRICS)])
+            for _ in range(3):
+                engine.evaluate(frame)
+            start = time.perf_counter()
+            engine.evaluate(frame)
+            print(f"{rules:>6,} rules: {single:8.1f} us / tick (1 subject), "
+                  f"{(time.perf_counter() - start) * 1000:8.2f} ms / tick ({subjects:,} subjects)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""Time a single 5,000-day backtest and a parallel parameter sweep.
+
+Run from the repo root:  python benchmarks/bench_backtest.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backtest import run_backtest, sweep
+from bench_risk_engine import best_of, synthetic_history
+
+
+def main():
+    prices = synthetic_history(5000)
+    print(f"single run ({len(prices)} days): {best_of(lambda: run_backtest(prices), 10):7.2f} ms")
+
+    grid = [dict(hedge_scale=s, trade_cost_bps=c, alert_score=a)
+            for s in (0.5, 0.75, 1.0, 1.25, 1.5) for c in (1, 2, 5, 10) for a in (4, 5, 6, 7, 8)]
+    start = time.perf_counter()
+    sweep(prices, grid)
+    print(f"sweep of {len(grid)} parameter sets: {(time.perf_counter() - start) * 1000:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""Time the Monte Carlo tail-risk engine at 10k and 100k paths of 20 sessions.
+
+Run from the repo root:  python benchmarks/bench_montecarlo.py [--workers 4]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_risk_engine import synthetic_history
+from montecarlo import tail_risk
+from pricing import instrument_prices
+from risk_engine import latest_metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time Monte Carlo VaR / ES on a synthetic year of closes")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    history = synthetic_history(260)
+    risk_score, metrics = latest_metrics(history)
+    prices = instrument_prices({'spy_price': history['SPY'].iloc[-1], 'vix_price': history['^VIX'].iloc[-1],
+                                'sh_price': 15.0})
+    for paths in (10_000, 100_000):
+        start = time.perf_counter()
+        tail_risk(history, 1_000_000, risk_score, metrics['vix_percentile'], prices, paths=paths, workers=args.workers)
+        print(f"{paths:>7,} paths x 20 sessions: {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
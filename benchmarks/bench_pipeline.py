@@ -0,0 +1,173 @@
+"""Time every stage of a terminal render against a frozen offline price fixture.
+
+Run from the repo root:
+    python benchmarks/bench_pipeline.py [--output results.json] [--compare baseline.json]
+
+Stages: the fixture download into a fresh price store, calendar alignment of every column,
+calculate_risk_metrics, create_charts over the whole history, the sensitivity table, the
+hedged scenario P&L grid and Plotly JSON serialization of the chart figure. Each stage is
+timed for every history length and ticker count; tickers beyond the tracked ten are a seeded
+random universe added next to the fixture columns. No network access is needed.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from alignment import align_prices, latest_age
+from bench_risk_engine import synthetic_history
+from market_data import PRICE_KEYS
+from price_store import FixtureFeed, PriceStore
+from risk_engine import TICKERS
+
+FIXTURE_PATH = os.path.join(ROOT, 'benchmarks', 'fixtures', 'market_20y.csv.gz')
+FIXTURE_DAYS = 5220  # business days in 20 years
+
+HISTORY_LENGTHS = {'90d': 90, '1y': 365, '5y': 5 * 365, '10y': 10 * 365, '20y': 20 * 365}
+TICKER_COUNTS = (10, 50, 100, 500)
+
+
+def write_fixture(path=FIXTURE_PATH):
+    """Regenerate the frozen fixture; only needed if the tracked tickers change"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    synthetic_history(FIXTURE_DAYS).round(4).to_csv(path, index_label='Date')
+
+
+def universe(prices, tickers, seed=0):
+    """Fixture closes widened to `tickers` columns with seeded random-walk extras"""
+    extra = tickers - len(prices.columns)
+    if extra <= 0:
+        return prices
+    rng = np.random.default_rng(seed)
+    returns = rng.normal(0, 0.015, (len(prices), extra))
+    names = [f'SYN{i:03d}' for i in range(extra)]
+    walks = pd.DataFrame(50 * np.exp(np.cumsum(returns, axis=0)), index=prices.index, columns=names)
+    return pd.concat([prices, walks], axis=1)
+
+
+def time_stage(fn, repeats):
+    """Return value of the last call, and per-call wall-clock timings in milliseconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return result, timings
+
+
+def bench_case(feed, period_days, repeats):
+    """Time each stage for one history length and ticker count; returns {stage: timings}"""
+    # Imported here so the Streamlit bare-mode warnings only appear once a run starts
+    from dashboard import MarketRiskDashboard, sensitivity_table
+    from pricing import instrument_prices
+    from scenarios import hedge_package, scenario_pnl
+
+    columns = list(feed.prices.columns)
+    period = f'{period_days}d'
+    timings = {}
+
+    def download():
+        with tempfile.TemporaryDirectory() as path:
+            store = PriceStore(path)
+            store.append(feed.download(columns, period=period)['Close'])
+            return store.read()
+
+    prices, timings['download'] = time_stage(download, repeats)
+    aligned, timings['align'] = time_stage(lambda: align_prices(prices), repeats)
+    history = aligned.prices[TICKERS]
+    latest = history.iloc[-1]
+    current_data = {PRICE_KEYS[t]: latest[t] for t in TICKERS}
+    current_data['data_age'] = latest_age(aligned).to_dict()
+    dashboard = MarketRiskDashboard()
+
+    metrics, timings['calculate_risk_metrics'] = time_stage(
+        lambda: dashboard.calculate_risk_metrics(current_data, history), repeats
+    )
+    risk_score = metrics[0]
+    fig, timings['create_charts'] = time_stage(
+        lambda: dashboard.create_charts(history, current_data, risk_score, sessions=None), repeats
+    )
+    _, timings['tables'] = time_stage(
+        lambda: sensitivity_table(current_data['vix_price'], risk_score), repeats
+    )
+    prices = instrument_prices(current_data)
+    _, timings['scenarios'] = time_stage(
+        lambda: scenario_pnl(hedge_package(1.0, risk_score, metrics[1]['vix_percentile'], prices.vix, prices,
+                                           whole=False), prices),
+        repeats
+    )
+    _, timings['serialize'] = time_stage(fig.to_json, repeats)
+    return timings
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path):
+    """Print the median-time ratio of each case against a previous results file"""
+    with open(baseline_path) as f:
+        baseline = {(r['history'], r['tickers'], r['stage']): r['median_ms'] for r in json.load(f)['results']}
+    for r in results:
+        before = baseline.get((r['history'], r['tickers'], r['stage']))
+        if before:
+            print(f"{r['history']:>4} {r['tickers']:>4} {r['stage']:<24} "
+                  f"{before:9.2f} -> {r['median_ms']:9.2f} ms  x{r['median_ms'] / before:5.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each stage of a terminal render on a fixture market")
+    parser.add_argument('--history', nargs='+', choices=list(HISTORY_LENGTHS), default=list(HISTORY_LENGTHS))
+    parser.add_argument('--tickers', nargs='+', type=int, default=list(TICKER_COUNTS))
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--output', help="write results as JSON")
+    parser.add_argument('--compare', help="results JSON from an earlier run to compare against")
+    args = parser.parse_args()
+
+    if not os.path.exists(FIXTURE_PATH):
+        write_fixture()
+    fixture = pd.read_csv(FIXTURE_PATH, index_col=0, parse_dates=True)
+
+    results = []
+    for tickers in args.tickers:
+        feed = FixtureFeed.from_frame(universe(fixture, tickers))
+        for history in args.history:
+            for stage, timings in bench_case(feed, HISTORY_LENGTHS[history], args.repeats).items():
+                row = {'history': history, 'tickers': tickers, 'stage': stage,
+                       'best_ms': min(timings), 'median_ms': float(np.median(timings))}
+                results.append(row)
+                print(f"{history:>4} {tickers:>4} {stage:<24} best {row['best_ms']:9.2f} ms"
+                      f"  median {row['median_ms']:9.2f} ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'commit': git_commit(),
+                'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'repeats': args.repeats,
+                'results': results
+            }, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
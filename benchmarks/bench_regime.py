@@ -0,0 +1,66 @@
+"""Time the regime model fit and the per-refresh cost of its online filter.
+
+Run from the repo root:  python benchmarks/bench_regime.py [--bars 250]
+
+The model is fitted to the fixture's 20 years of component scores. The last `--bars` sessions
+are then replayed one bar at a time through a snapshot-sized window, as the refresher
+publishes them, timing the filter step next to the scoring it rides on. The model is fitted
+through the last bar so no background refit competes with the timed steps.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alignment import align_prices
+from price_store import history_days
+from regime import REGIMES, RegimeEngine, fit_regimes, save_model
+from risk_engine import LOOKBACK_WINDOWS, compute_score_history, latest_metrics
+
+FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'market_20y.csv.gz')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regime fit time and online filter latency per bar")
+    parser.add_argument('--bars', type=int, default=250)
+    args = parser.parse_args()
+
+    prices = align_prices(pd.read_csv(FIXTURE, index_col=0, parse_dates=True)).prices
+    scores = compute_score_history(prices)
+    start = time.perf_counter()
+    model = fit_regimes(scores)
+    print(f"fit {model.sessions:,} sessions: {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'regime.npz')
+        save_model(model, path)
+        start = time.perf_counter()
+        engine = RegimeEngine(path, training_data=lambda: scores)
+        print(f"load cached model:   {(time.perf_counter() - start) * 1000:8.2f} ms")
+
+        window = pd.Timedelta(days=history_days(max(LOOKBACK_WINDOWS)))
+        step, scoring = [], []
+        for asof in prices.index[-args.bars:]:
+            snapshot = prices.loc[asof - window:asof]
+            start = time.perf_counter()
+            history = compute_score_history(snapshot)
+            latest_metrics(snapshot, history=history)
+            scoring.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            probabilities = engine.probabilities(history)
+            step.append(time.perf_counter() - start)
+
+    scoring_us, step_us = np.median(scoring) * 1e6, np.median(step) * 1e6
+    print(f"scoring per bar:     {scoring_us:8.0f} us (median)")
+    print(f"regime filter step:  {step_us:8.0f} us (median, {step_us / scoring_us:.1%} of scoring)")
+    print("latest: " + ", ".join(f"{r} {probabilities[r]:.0%}" for r in REGIMES))
+
+
+if __name__ == "__main__":
+    main()
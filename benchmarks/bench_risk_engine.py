@@ -0,0 +1,46 @@
+"""Time the vectorized risk score engine over a synthetic 10-year history.
+
+Run from the repo root:  python benchmarks/bench_risk_engine.py
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from risk_engine import TICKERS, compute_score_history, latest_metrics
+
+
+def synthetic_history(days, seed=0):
+    """Random-walk closes for the tracked tickers with a mean-reverting VIX"""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end='2024-12-31', periods=days)
+    returns = rng.normal(0, 0.012, (days, len(TICKERS)))
+    prices = pd.DataFrame(100 * np.exp(np.cumsum(returns, axis=0)), index=index, columns=TICKERS)
+    prices['^VIX'] = np.clip(18 + np.cumsum(rng.normal(0, 1.2, days)) * 0.3, 9, 80)
+    return prices
+
+
+def best_of(fn, repeats):
+    """Best wall-clock time of `repeats` calls, in milliseconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def main():
+    for years in (1, 10, 20):
+        history = synthetic_history(252 * years)
+        full_ms = best_of(lambda: compute_score_history(history), 20)
+        latest_ms = best_of(lambda: latest_metrics(history), 20)
+        print(f"{years:>2}y ({len(history):>5} rows)  score history: {full_ms:7.2f} ms  latest: {latest_ms:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
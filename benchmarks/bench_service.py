@@ -0,0 +1,51 @@
+"""Load-test a running scoring API with keep-alive connections.
+
+Run from the repo root, against `python api.py` started in another shell:
+    python benchmarks/bench_service.py [--port 8502] [--connections 32] [--seconds 5]
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+PATHS = ('/score', '/hedge?dollar_beta=1000000', '/history')
+
+
+async def client(host, port, path, deadline, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode()
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        writer.write(request)
+        head = await reader.readuntil(b'\r\n\r\n')
+        length = next(int(line.split(b':')[1]) for line in head.split(b'\r\n')
+                      if line.lower().startswith(b'content-length'))
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+
+async def run(host, port, path, connections, seconds):
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    await asyncio.gather(*(client(host, port, path, deadline, latencies) for _ in range(connections)))
+    return np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Requests per second and latency of each API route")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    parser.add_argument('--connections', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=5.0)
+    args = parser.parse_args()
+
+    for path in PATHS:
+        latencies = asyncio.run(run(args.host, args.port, path, args.connections, args.seconds))
+        p50, p99 = np.quantile(latencies, (0.5, 0.99)) * 1000
+        print(f"{path:<30} {len(latencies) / args.seconds:>9,.0f} req/s   p50 {p50:6.2f} ms   p99 {p99:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Import time and time-to-first-score from process launch, with a regression budget.
+
+Run from the repo root:  python benchmarks/bench_startup.py [--repeats 5] [--budget 1.0]
+
+Every measurement is a fresh interpreter, so nothing is warm in sys.modules. Prices come
+from the frozen fixture into a temporary store: the cold start syncs it from scratch, the
+warm start reads it offline, as a restarted server would. Exits with status 1 when the
+median time-to-first-score of either start exceeds the budget.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE = os.path.join(ROOT, 'benchmarks', 'fixtures', 'market_20y.csv.gz')
+
+IMPORTS = {
+    'core': 'import core',
+    'api': 'import api',
+    'dashboard modules': 'import streamlit, core, hedging, montecarlo, positions, scenarios, universe',
+    'yfinance (deferred)': 'import yfinance',
+    'plotly.subplots (deferred)': 'import plotly.graph_objects, plotly.subplots',
+}
+
+DASHBOARD_RUN = """
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file('dashboard.py', default_timeout=120).run()
+assert not at.exception, at.exception
+"""
+
+
+def _launch(args, env):
+    """Wall seconds from launching a Python process to its exit"""
+    start = time.perf_counter()
+    subprocess.run([sys.executable, *args], cwd=ROOT, env=env, check=True, capture_output=True)
+    return time.perf_counter() - start
+
+
+def import_seconds(statement, env, repeats):
+    code = f"import time; t = time.perf_counter(); {statement}; print(time.perf_counter() - t)"
+    return [float(subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=env, check=True,
+                                 capture_output=True, text=True).stdout) for _ in range(repeats)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time imports and time-to-first-score from a cold process")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=1.0, help="seconds allowed to the first score")
+    parser.add_argument('--dashboard', action='store_true', help="also time a full dashboard run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, JAMS_PRICE_FIXTURE=FIXTURE, JAMS_PRICE_STORE=os.path.join(tmp, 'prices'),
+                   JAMS_SCORE_STORE=os.path.join(tmp, 'scores.sqlite'),
+                   JAMS_ALERT_LOG=os.path.join(tmp, 'alerts.jsonl'), JAMS_REGIME_MODEL=os.path.join(tmp, 'regime.npz'))
+
+        for name, statement in IMPORTS.items():
+            print(f"import {name:<28} {np.median(import_seconds(statement, env, args.repeats)) * 1000:8.1f} ms")
+
+        cold = [_launch(['core.py'], env)]
+        cold += [_launch(['core.py'], dict(env, JAMS_PRICE_STORE=os.path.join(tmp, f'prices_{i}')))
+                 for i in range(args.repeats - 1)]
+        warm = [_launch(['core.py'], dict(env, JAMS_OFFLINE='1')) for _ in range(args.repeats)]
+        results = {'first score, cold store': np.median(cold), 'first score, warm store': np.median(warm)}
+        if args.dashboard:
+            results['dashboard first run'] = np.median([_launch(['-c', DASHBOARD_RUN], dict(env, JAMS_OFFLINE='1'))
+                                                        for _ in range(args.repeats)])
+
+    failed = False
+    for name, seconds in results.items():
+        over = name.startswith('first score') and seconds > args.budget
+        failed |= over
+        print(f"{name:<35} {seconds * 1000:8.1f} ms" + (f"  OVER {args.budget:.1f}s BUDGET" if over else ""))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""Time the pair stress scan at 100, 250 and 500 tickers over a year of closes.
+
+Run from the repo root:  python benchmarks/bench_universe.py
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_risk_engine import best_of
+from universe import pair_stress
+
+
+def synthetic_universe(tickers, days=260, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end='2024-12-31', periods=days)
+    returns = rng.normal(0, 0.012, (days, tickers))
+    return pd.DataFrame(100 * np.exp(np.cumsum(returns, axis=0)), index=index,
+                        columns=[f'T{i:03d}' for i in range(tickers)])
+
+
+def main():
+    for tickers in (100, 250, 500):
+        prices = synthetic_universe(tickers)
+        pairs = tickers * (tickers - 1) // 2
+        print(f"{tickers:>4} tickers ({pairs:>7,} pairs): {best_of(lambda: pair_stress(prices), 10):7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
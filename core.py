@@ -0,0 +1,397 @@
+"""Scoring core shared by the Streamlit terminal and the headless API; nothing here imports a UI.
+
+RiskAnalytics turns a market snapshot into the risk score, signals, outlook and hedge
+recommendation. The process-wide registry below owns one market data refresher per bar
+interval, one snapshot log and one regime model, so every client in the process - dashboard sessions and
+API requests alike - reads the same snapshot and the same numbers.
+"""
+import threading
+from collections import OrderedDict
+
+from alignment import align_prices, latest_age, stale_tickers
+from alerts import SCOPES, AlertDispatcher, AlertEngine, default_sinks, load_rules
+from instrumentation import count, timed, timer
+from market_data import REFRESH_INTERVAL, MarketDataService, load_market_data
+from price_store import DEFAULT_INTERVAL, OFFLINE, PRICE_FIXTURE, FixtureFeed, PriceStore, history_days
+from pricing import instrument_prices, shares
+from regime import ENABLED as REGIME_ENABLED, RegimeEngine
+from risk_engine import (
+    LOOKBACK_WINDOWS, TICKERS, compute_score_history, hedge_percentage, latest_metrics, metric_data_age
+)
+from score_store import ScoreStore
+
+# Snapshot versions whose scores are kept per interval
+SCORE_CACHE_VERSIONS = 8
+
+
+def _sh_leg(allocation, sh_price, rationale):
+    """SH buy leg for a dollar allocation; unsized, with no cost, when SH has no price"""
+    if not sh_price > 0:
+        return {'instrument': 'SH (Inverse S&P ETF)', 'action': 'BUY', 'amount': 'N/A', 'cost': 'N/A',
+                'rationale': 'SH price unavailable; size this leg once SH is quoted'}
+    return {
+        'instrument': 'SH (Inverse S&P ETF)',
+        'action': 'BUY',
+        'amount': f"{shares(allocation, sh_price):,} shares",
+        'cost': f"${allocation:,.0f}",
+        'rationale': rationale
+    }
+
+
+class RiskAnalytics:
+    """Risk score, narrative and hedge sizing for one market snapshot"""
+
+    @timed('calculate_risk_metrics')
+    def calculate_risk_metrics(self, current_data, historical_data):
+        """Calculate comprehensive forward-looking risk metrics; errors propagate to the caller"""
+        if not current_data or historical_data.empty:
+            return 0, {}
+            
+        # Scores for the latest date come from the vectorized whole-history engine
+        history = compute_score_history(historical_data)
+        risk_score, metrics = latest_metrics(historical_data, history=history)
+        vix_percentile = metrics['vix_percentile']
+        vix_5d_change = metrics['vix_5d_change']
+        
+        # VIX Outlook
+        vix_outlook = self.generate_vix_outlook(current_data['vix_price'], vix_percentile, vix_5d_change, risk_score)
+        
+        # Hedge Recommendation
+        hedge_pct = self.calculate_hedge_percentage(risk_score, vix_percentile, current_data['vix_price'])
+        
+        detailed_metrics = dict(metrics)
+        detailed_metrics['vix_outlook'] = vix_outlook
+        detailed_metrics['hedge_percentage'] = hedge_pct
+        
+        # Regime probabilities next to the score, filtered forward from the last completed bar
+        if REGIME_ENABLED:
+            probabilities = regime_engine().probabilities(history)
+            detailed_metrics['regime'] = max(probabilities, key=probabilities.get) if probabilities else None
+            detailed_metrics['regime_probabilities'] = probabilities
+        
+        # Sessions since the oldest close behind each metric; snapshots carry their ticker ages,
+        # other callers get them from the history they pass in
+        ticker_ages = current_data.get('data_age')
+        if ticker_ages is None:
+            ticker_ages = latest_age(align_prices(historical_data[TICKERS])).to_dict()
+        data_age = metric_data_age(ticker_ages)
+        data_age['vix_outlook'] = data_age['hedge_percentage'] = data_age['regime'] = data_age['risk_score']
+        detailed_metrics['data_age'] = data_age
+        detailed_metrics['stale_tickers'] = stale_tickers({t: ticker_ages.get(t) for t in TICKERS})
+        
+        return risk_score, detailed_metrics
+    
+    def generate_market_summary(self, risk_score, detailed_metrics, current_data):
+        """Generate comprehensive market summary paragraph"""
+        
+        # Risk assessment
+        if risk_score >= 8:
+            risk_assessment = "EXTREME RISK ENVIRONMENT with multiple stress indicators flashing red"
+        elif risk_score >= 6:
+            risk_assessment = "ELEVATED RISK CONDITIONS with significant market stress building"
+        elif risk_score >= 4:
+            risk_assessment = "MODERATE RISK LEVELS with selective pressure points emerging"
+        else:
+            risk_assessment = "LOW RISK ENVIRONMENT with markets showing resilience"
+        
+        # Credit analysis
+        credit_change = detailed_metrics.get('hyg_tlt_change', 0)
+        if credit_change < -2:
+            credit_status = "credit spreads widening aggressively indicating institutional stress"
+        elif credit_change < -1:
+            credit_status = "credit markets showing initial signs of stress"
+        else:
+            credit_status = "credit conditions remain stable"
+        
+        # Currency analysis
+        jpy_change = detailed_metrics.get('fxy_change', 0)
+        if jpy_change > 2:
+            currency_status = "strong JPY appreciation signaling flight-to-quality flows"
+        elif jpy_change > 1:
+            currency_status = "moderate JPY strength suggesting risk-off sentiment"
+        else:
+            currency_status = "currency markets showing normal risk appetite"
+        
+        # Breadth analysis
+        breadth_change = detailed_metrics.get('rsp_spy_change', 0)
+        small_cap_change = detailed_metrics.get('iwm_spy_change', 0)
+        if breadth_change < -1 and small_cap_change < -2:
+            breadth_status = "market breadth deteriorating with small caps severely underperforming"
+        elif breadth_change < -1 or small_cap_change < -2:
+            breadth_status = "market breadth showing signs of weakness"
+        else:
+            breadth_status = "broad market participation remains healthy"
+        
+        # VIX analysis
+        vix_level = current_data['vix_price']
+        vix_percentile = detailed_metrics.get('vix_percentile', 50)
+        if vix_level > 30:
+            vix_status = f"VIX elevated at {vix_level:.1f} suggesting high fear levels"
+        elif vix_level < 15:
+            vix_status = f"VIX compressed at {vix_level:.1f} indicating complacency"
+        else:
+            vix_status = f"VIX at {vix_level:.1f} within normal ranges"
+        
+        # Hedge recommendation
+        hedge_pct = detailed_metrics.get('hedge_percentage', 0)
+        if hedge_pct > 70:
+            hedge_rec = f"IMMEDIATE AGGRESSIVE HEDGING REQUIRED at {hedge_pct:.0f}% of dollar beta"
+        elif hedge_pct > 40:
+            hedge_rec = f"SIGNIFICANT HEDGE POSITION WARRANTED at {hedge_pct:.0f}% of dollar beta"
+        elif hedge_pct > 20:
+            hedge_rec = f"MODERATE HEDGING APPROPRIATE at {hedge_pct:.0f}% of dollar beta"
+        else:
+            hedge_rec = f"MINIMAL HEDGE REQUIRED at {hedge_pct:.0f}% of dollar beta"
+        
+        summary = f"""MARKET ANALYSIS: {risk_assessment}. Current assessment shows {credit_status}, while {currency_status}. Market internals indicate {breadth_status}. Volatility measures show {vix_status} ({vix_percentile:.0f}th percentile). Forward-looking risk indicators suggest {hedge_rec}. Risk score of {risk_score}/10 reflects confluence of credit stress ({detailed_metrics.get('credit_score', 0)}/4), currency flows ({detailed_metrics.get('currency_score', 0)}/3), and breadth deterioration ({detailed_metrics.get('breadth_score', 0)}/3). Immediate action required for risk management positioning."""
+        
+        return summary
+    
+    def generate_vix_outlook(self, current_vix, percentile, change_5d, risk_score):
+        """Generate VIX outlook"""
+        if risk_score >= 8 and current_vix < 25:
+            return "DIVERGENCE ALERT: High risk score with low VIX suggests imminent spike to 25-35 range"
+        elif risk_score >= 6 and current_vix < 20:
+            return "BUILDING PRESSURE: Risk indicators elevated, expect VIX advance to 20-25 range"
+        elif current_vix > 30 and risk_score < 4:
+            return "MEAN REVERSION: High VIX with improving fundamentals suggests decline to 15-20 range"
+        elif percentile > 80:
+            return "ELEVATED REGIME: VIX in top quintile, monitor for reversal signals"
+        elif percentile < 20:
+            return "COMPLACENCY WARNING: Low volatility environment vulnerable to sudden spikes"
+        else:
+            return "NEUTRAL ENVIRONMENT: VIX in normal range, monitor risk score for early warnings"
+    
+    def calculate_hedge_percentage(self, risk_score, vix_percentile, current_vix):
+        """Calculate recommended hedge percentage"""
+        return float(hedge_percentage(risk_score, vix_percentile, current_vix))
+    
+    @timed('generate_hedge_strategy')
+    def generate_hedge_strategy(self, portfolio_dollar_beta, hedge_percentage, current_vix, risk_score, prices):
+        """Generate specific hedge strategy recommendations.
+        
+        Units are sized with the live SH price and Black-Scholes premiums in `prices`
+        (pricing.instrument_prices).
+        """
+        
+        if portfolio_dollar_beta <= 0:
+            return "Please enter a valid portfolio dollar beta amount."
+        
+        hedge_amount = portfolio_dollar_beta * (hedge_percentage / 100)
+        put_contract = f"{prices.expiry_days}D ${prices.put_strike:,.0f} strike @ ${prices.put_premium:,.0f}"
+        call_contract = f"{prices.expiry_days}D ${prices.call_strike:,.0f} strike @ ${prices.call_premium:,.0f}"
+        
+        strategies = []
+        
+        # Determine optimal hedge strategy based on risk level and VIX
+        if risk_score <= 3:
+            # Low risk - minimal hedging
+            if hedge_amount > 0:
+                strategies.append(_sh_leg(hedge_amount, prices.sh_price, 'Low cost hedge for minimal risk environment'))
+            else:
+                strategies.append({
+                    'instrument': 'NO HEDGE REQUIRED',
+                    'action': 'HOLD CASH',
+                    'amount': 'N/A',
+                    'cost': '$0',
+                    'rationale': 'Risk environment does not warrant hedging costs'
+                })
+                
+        elif risk_score <= 6:
+            # Moderate risk - SH primary with small put position
+            sh_allocation = hedge_amount * 0.75
+            put_allocation = hedge_amount * 0.25
+            
+            put_contracts = shares(put_allocation, prices.put_premium)
+            
+            strategies.append(_sh_leg(sh_allocation, prices.sh_price, 'Primary hedge via inverse ETF for cost efficiency'))
+            
+            if put_contracts > 0:
+                strategies.append({
+                    'instrument': 'SPY Put Options',
+                    'action': 'BUY',
+                    'amount': f"{put_contracts} contracts ({put_contract})",
+                    'cost': f"${put_allocation:,.0f}",
+                    'rationale': 'Put options for convexity in moderate stress scenario'
+                })
+                
+        else:
+            # High risk - Aggressive hedging with puts primary
+            if current_vix > 25:
+                # VIX already high - use SH + sell calls
+                sh_allocation = hedge_amount * 0.6
+                call_allocation = hedge_amount * 0.4
+                
+                call_contracts = shares(call_allocation, prices.call_premium)
+                
+                strategies.append(_sh_leg(sh_allocation, prices.sh_price, 'Inverse ETF when vol already elevated'))
+                
+                strategies.append({
+                    'instrument': 'SPY Call Options',
+                    'action': 'SELL',
+                    'amount': f"{call_contracts} contracts ({call_contract})",
+                    'cost': f"+${call_allocation:,.0f} premium",
+                    'rationale': 'Sell calls for additional premium when VIX high'
+                })
+            else:
+                # VIX still low with high risk score - use puts for gamma
+                put_allocation = hedge_amount * 0.7
+                sh_allocation = hedge_amount * 0.3
+                
+                put_contracts = shares(put_allocation, prices.put_premium)
+                
+                strategies.append({
+                    'instrument': 'SPY Put Options',
+                    'action': 'BUY',
+                    'amount': f"{put_contracts} contracts ({put_contract})",
+                    'cost': f"${put_allocation:,.0f}",
+                    'rationale': 'Put options for gamma exposure before VIX spike'
+                })
+                
+                strategies.append(_sh_leg(sh_allocation, prices.sh_price, 'Base hedge via inverse ETF'))
+        
+        return strategies
+
+
+def hedge_recommendation(portfolio_dollar_beta, risk_score, detailed_metrics, current_data):
+    """Hedge percentage, dollar amount, instrument prices and strategy legs for one portfolio"""
+    prices = instrument_prices(current_data)
+    hedge_pct = detailed_metrics.get('hedge_percentage', 0)
+    strategies = RiskAnalytics().generate_hedge_strategy(portfolio_dollar_beta, hedge_pct, current_data['vix_price'],
+                                                         risk_score, prices)
+    return {
+        'dollar_beta': portfolio_dollar_beta,
+        'hedge_percentage': hedge_pct,
+        'hedge_amount': portfolio_dollar_beta * (hedge_pct / 100),
+        'prices': prices._asdict(),
+        'strategies': strategies if isinstance(strategies, list) else [],
+    }
+
+
+def price_feed():
+    """Bulk close downloader: the local fixture when JAMS_PRICE_FIXTURE is set, else yfinance"""
+    if PRICE_FIXTURE:
+        return FixtureFeed(PRICE_FIXTURE).download
+    import yfinance as yf
+    return yf.download
+
+
+_registry_lock = threading.Lock()
+_services = {}
+_score_store = None
+_scores = {}  # interval -> OrderedDict((version, regime generation) -> (risk_score, detailed_metrics))
+_alert_engines = {}
+_evaluated_scans = {}  # scope -> scan time of the newest scan evaluated
+_regime_engine = None
+
+
+def score_store():
+    """Snapshot log shared by the refreshers and every client"""
+    global _score_store
+    with _registry_lock:
+        if _score_store is None:
+            _score_store = ScoreStore()
+        return _score_store
+
+
+def alert_engine(scope='market'):
+    """Compiled alert rules of a scope; every scope shares one dispatcher and its sinks"""
+    with _registry_lock:
+        if not _alert_engines:
+            rules = load_rules()
+            dispatcher = AlertDispatcher(default_sinks())
+            _alert_engines.update({s: AlertEngine(rules, s, dispatcher) for s in SCOPES})
+        return _alert_engines[scope]
+
+
+def evaluate_scan(scope, frame, scanned_at):
+    """Evaluate a scan against a scope's rules once, however many times it is read from a cache"""
+    with _registry_lock:
+        last = _evaluated_scans.get(scope)
+        if last is not None and scanned_at <= last:
+            return []
+        _evaluated_scans[scope] = scanned_at
+    return alert_engine(scope).evaluate(frame, at=scanned_at)
+
+
+def regime_engine():
+    """Regime model and forward filter shared by every interval; the model is fitted to daily scores"""
+    global _regime_engine
+    with _registry_lock:
+        if _regime_engine is None:
+            _regime_engine = RegimeEngine()
+        return _regime_engine
+
+
+def regime_generation():
+    """Generation of the fitted regime model; part of every cache key holding scored metrics"""
+    return regime_engine().generation if REGIME_ENABLED else 0
+
+
+def snapshot_scores(interval, snapshot):
+    """Risk score and metrics of a published snapshot, computed once per version and regime model"""
+    # Read before scoring: a fit finishing mid-way leaves these scores under the older key
+    key = (snapshot.version, regime_generation())
+    with _registry_lock:
+        cached = _scores.setdefault(interval, OrderedDict())
+        count('cache_requests', cache='snapshot_scores')
+        if key in cached:
+            return cached[key]
+    count('cache_misses', cache='snapshot_scores')
+    scores = RiskAnalytics().calculate_risk_metrics(snapshot.current_data, snapshot.historical_data)
+    with _registry_lock:
+        cached[key] = scores
+        while len(cached) > SCORE_CACHE_VERSIONS:
+            cached.popitem(last=False)
+    return scores
+
+
+def record_snapshot(store, interval, snapshot):
+    """Score a newly published snapshot, check it against the alert rules and append it to the log"""
+    risk_score, detailed_metrics = snapshot_scores(interval, snapshot)
+    values = dict(snapshot.current_data, **detailed_metrics, risk_score=risk_score)
+    alert_engine('market').evaluate_one(interval, values, at=snapshot.fetched_at)
+    store.backfill(interval, snapshot.historical_data)
+    with timer('score_store_append'):
+        store.record(interval, snapshot.fetched_at, snapshot.historical_data.index[-1],
+                     snapshot.current_data, risk_score, detailed_metrics)
+
+
+def market_service(interval=DEFAULT_INTERVAL):
+    """The running market data refresher for a bar interval, started on first use"""
+    store = score_store()
+    with _registry_lock:
+        service = _services.get(interval)
+        if service is None:
+            daily_store = PriceStore.for_interval('1d')
+            intraday_store = None if interval == '1d' else PriceStore.for_interval(interval)
+            download = price_feed()
+            service = _services[interval] = MarketDataService(
+                lambda: load_market_data(daily_store, download, offline=OFFLINE, intraday_store=intraday_store,
+                                         days=history_days(max(LOOKBACK_WINDOWS))),
+                interval=REFRESH_INTERVAL,
+                on_publish=lambda snapshot: record_snapshot(store, interval, snapshot)
+            )
+    return service.start()
+
+
+def main():
+    import argparse
+    from price_store import INTERVALS
+
+    parser = argparse.ArgumentParser(description="Print the latest risk score without starting the terminal")
+    parser.add_argument('--interval', choices=list(INTERVALS), default=DEFAULT_INTERVAL)
+    args = parser.parse_args()
+
+    service = market_service(args.interval)
+    snapshot = service.snapshot()
+    if snapshot is None:
+        raise SystemExit(f"no market data: {service.last_error}")
+    service.stop()
+    risk_score, detailed_metrics = snapshot_scores(args.interval, snapshot)
+    print(f"risk score {risk_score}/10, hedge {detailed_metrics['hedge_percentage']:.1f}% "
+          f"({args.interval}, as of {snapshot.historical_data.index[-1]:%Y-%m-%d})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,32 @@
+import json
+import os
 import streamlit as st
+import streamlit.components.v1 as components
 import pandas as pd
-import yfinance as yf
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import numpy as np
 from datetime import datetime, timedelta
-import time
+
+from alignment import FILL_SESSIONS, align_prices
+from core import (
+    RiskAnalytics, alert_engine, evaluate_scan, market_service, price_feed, score_store, snapshot_scores
+)
+from decimation import MAX_CHART_POINTS, decimate
+from hedging import batch_hedge, read_portfolios, write_portfolios
+from instrumentation import ENABLED as INSTRUMENTATION_ENABLED, METRICS, count, timed, timer
+from market_data import REFRESH_INTERVAL
+from montecarlo import MC_DAYS, MC_PATHS, tail_risk, tail_risk_table
+from positions import BetaEstimator, dollar_beta, read_positions
+from price_store import DEFAULT_INTERVAL, INTERVALS, OFFLINE, PriceStore
+from pricing import PROTECTION_MOVE, instrument_prices, put_ladder
+from risk_engine import (
+    LOOKBACK_SERIES, LOOKBACK_WINDOWS, TICKERS, _hedge_surface, compute_score_history, hedge_percentage, hedge_surface,
+    lookback_metrics
+)
+from scenarios import HORIZON_DAYS, hedge_package, package_greeks, scenario_pnl
+from universe import load_universe, pair_subjects, scan_universe
+
+# Bundled theme, injected into the page head once per session
+STYLESHEET = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static', 'terminal.css')
 
 # Set page config
 st.set_page_config(
@@ -15,755 +36,112 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-# Professional Bloomberg CSS
-st.markdown("""
-<style>
-@import url('https://fonts.googleapis.com/css2?family=IBM+Plex+Mono:wght@400;500;600;700&display=swap');
-
-/* Global styling */
-.main, .stApp, [data-testid="stAppViewContainer"], [data-testid="stHeader"], 
-[data-testid="stToolbar"], [data-testid="stDecoration"], [data-testid="stStatusWidget"],
-.block-container {
-    background-color: #000000 !important;
-    font-family: 'IBM Plex Mono', monospace !important;
-    padding: 0.5rem !important;
-}
-
-/* Headers only in Bloomberg orange */
-h1, h2, h3 {
-    color: #FF9500 !important;
-    font-family: 'IBM Plex Mono', monospace !important;
-    font-weight: 600 !important;
-    margin: 15px 0 10px 0 !important;
-}
-
-h1 {
-    text-align: center;
-    font-size: 2.2rem !important;
-    font-weight: 700 !important;
-    letter-spacing: 2px;
-}
-
-/* All other text in white */
-p, div, span, label, td, th, 
-.stMarkdown, .stMarkdown p, .stMarkdown div, .stMarkdown span {
-    color: #FFFFFF !important;
-    font-family: 'IBM Plex Mono', monospace !important;
-    font-weight: 400 !important;
-}
-
-/* Data tables */
-.dataframe {
-    background-color: #000000 !important;
-    border: 1px solid #333333 !important;
-    font-family: 'IBM Plex Mono', monospace !important;
-    font-size: 0.85rem !important;
-}
-
-.dataframe th {
-    background-color: #1a1a1a !important;
-    color: #FF9500 !important;
-    font-weight: 600 !important;
-    text-align: center !important;
-    padding: 6px !important;
-    border: 1px solid #333333 !important;
-}
-
-.dataframe td {
-    color: #FFFFFF !important;
-    background-color: #000000 !important;
-    text-align: center !important;
-    padding: 6px !important;
-    border: 1px solid #333333 !important;
-    font-weight: 400 !important;
-}
-
-/* Buttons */
-.stButton button {
-    background-color: #FF9500 !important;
-    color: #000000 !important;
-    font-weight: 600 !important;
-    border: none !important;
-    font-family: 'IBM Plex Mono', monospace !important;
-    text-transform: uppercase;
-}
-
-/* Risk score display */
-.risk-score-large {
-    font-size: 6rem !important;
-    font-weight: 700 !important;
-    text-align: center;
-    margin: 20px 0 !important;
-    color: #FFFFFF !important;
-}
-
-/* Terminal text */
-.terminal-line {
-    font-family: 'IBM Plex Mono', monospace !important;
-    color: #FFFFFF !important;
-    font-size: 0.9rem !important;
-    line-height: 1.4 !important;
-    margin: 3px 0 !important;
-}
-
-/* Professional sensitivity table styling */
-.sensitivity-table {
-    border-collapse: collapse !important;
-    width: 100% !important;
-    margin: 10px 0 !important;
-    font-family: 'IBM Plex Mono', monospace !important;
-    font-size: 0.85rem !important;
-}
-
-.sensitivity-table th {
-    border: 1px solid #FF9500 !important;
-    padding: 8px 12px !important;
-    text-align: center !important;
-    color: #FF9500 !important;
-    background-color: #1a1a1a !important;
-    font-weight: 600 !important;
-}
-
-.sensitivity-table td {
-    border: 1px solid #FF9500 !important;
-    padding: 8px 12px !important;
-    text-align: center !important;
-    color: #FFFFFF !important;
-    background-color: #000000 !important;
-    font-weight: 400 !important;
-}
-
-.sensitivity-table td.highlighted {
-    border: 2px solid #FFFFFF !important;
-    background-color: #1a1a1a !important;
-}
-
-/* Compact layout */
-.main .block-container {
-    padding-top: 0.5rem !important;
-    padding-bottom: 0.5rem !important;
-    max-width: 100% !important;
-}
-
-/* Hide Streamlit elements */
-#MainMenu {visibility: hidden;}
-footer {visibility: hidden;}
-header {visibility: hidden;}
-.stDeployButton {visibility: hidden;}
-
-/* Tooltip styling */
-.tooltip {
-    position: relative;
-    display: inline-block;
-    cursor: pointer;
-}
-
-.tooltip .tooltiptext {
-    visibility: hidden;
-    width: 450px;
-    background-color: #1a1a1a;
-    color: #FFFFFF;
-    text-align: left;
-    border-radius: 6px;
-    padding: 15px;
-    position: absolute;
-    z-index: 1000;
-    top: 25px;
-    left: -200px;
-    opacity: 0;
-    transition: opacity 0.3s;
-    border: 2px solid #FF9500;
-    font-size: 0.8rem;
-    line-height: 1.4;
-    max-height: 400px;
-    overflow-y: auto;
-}
-
-.tooltip .tooltiptext::before {
-    content: "";
-    position: absolute;
-    top: -7px;
-    left: 220px;
-    border-width: 0 7px 7px 7px;
-    border-style: solid;
-    border-color: transparent transparent #FF9500 transparent;
-}
-
-.tooltip:hover .tooltiptext {
-    visibility: visible;
-    opacity: 1;
-}
-
-.info-icon {
-    background-color: #FF9500;
-    color: #000000;
-    border-radius: 50%;
-    width: 20px;
-    height: 20px;
-    display: inline-flex;
-    align-items: center;
-    justify-content: center;
-    font-size: 12px;
-    font-weight: bold;
-    cursor: pointer;
-}
-
-/* Portfolio input styling */
-.portfolio-input {
-    background-color: #1a1a1a !important;
-    border: 2px solid #FF9500 !important;
-    color: #FFFFFF !important;
-    padding: 10px !important;
-    border-radius: 5px !important;
-    font-family: 'IBM Plex Mono', monospace !important;
-    font-size: 1rem !important;
-}
-
-.hedge-recommendation {
-    background-color: #1a1a1a;
-    border: 2px solid #FF9500;
-    border-radius: 8px;
-    padding: 15px;
-    margin: 10px 0;
-}
-
-.hedge-strategy {
-    background-color: #000000;
-    border: 1px solid #333333;
-    border-radius: 5px;
-    padding: 10px;
-    margin: 5px 0;
-}
-
-/* Input field styling */
-.stNumberInput input {
-    background-color: #1a1a1a !important;
-    border: 2px solid #FF9500 !important;
-    color: #FFFFFF !important;
-    font-family: 'IBM Plex Mono', monospace !important;
-}
-
-.stNumberInput label {
-    color: #FF9500 !important;
-    font-family: 'IBM Plex Mono', monospace !important;
-    font-weight: 600 !important;
-}
-</style>
-""", unsafe_allow_html=True)
-
-class MarketRiskDashboard:
-    def __init__(self):
+@st.cache_resource
+def stylesheet():
+    """Terminal CSS, read from disk once per server process"""
+    with open(STYLESHEET) as f:
+        return f.read()
+
+def inject_stylesheet():
+    """Add the terminal CSS to the page head once per session.
+
+    Elements a rerun does not emit are cleared, so st.html would have to resend the whole
+    stylesheet on every rerun; a style tag in the parent document's head outlives them.
+    """
+    if st.session_state.get('stylesheet_injected'):
+        return
+    components.html(f"""<script>
+        const doc = window.parent.document;
+        let style = doc.getElementById('jams-terminal-theme');
+        if (!style) {{
+            style = doc.createElement('style');
+            style.id = 'jams-terminal-theme';
+            doc.head.appendChild(style);
+        }}
+        style.textContent = {json.dumps(stylesheet())};
+    </script>""", height=0)
+    st.session_state['stylesheet_injected'] = True
+
+inject_stylesheet()
+
+@st.cache_resource
+def get_beta_estimator():
+    """Rolling beta state shared by every session, so each new bar is processed once"""
+    return BetaEstimator()
+
+def get_score_store():
+    """Snapshot log shared by the refreshers, every session and the API"""
+    return score_store()
+
+def get_market_service(interval=DEFAULT_INTERVAL):
+    """One market data refresher per bar interval, shared by every session and the API in this process"""
+    return market_service(interval)
+
+class MarketRiskDashboard(RiskAnalytics):
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
         self.current_data = {}
         self.historical_data = pd.DataFrame()
         self.risk_score = 0
         self.detailed_metrics = {}
-
-    @st.cache_data(ttl=30)
-    def fetch_market_data(_self):
-        """Fetch real-time market data"""
-        try:
-            tickers = ['HYG', 'TLT', 'UUP', 'FXY', 'RSP', 'SPY', 'IWM', '^VIX', 'XLU', 'XLK']
-            data = yf.download(tickers, period='90d', interval='1d', progress=False)['Close']
-            
-            if data is not None and not data.empty:
-                latest = data.iloc[-1]
-                
-                current_data = {
-                    'hyg_price': latest['HYG'],
-                    'tlt_price': latest['TLT'],
-                    'uup_price': latest['UUP'],
-                    'fxy_price': latest['FXY'],
-                    'rsp_price': latest['RSP'],
-                    'spy_price': latest['SPY'],
-                    'iwm_price': latest['IWM'],
-                    'vix_price': latest['^VIX'],
-                    'xlu_price': latest['XLU'],
-                    'xlk_price': latest['XLK'],
-                    'timestamp': datetime.now()
-                }
-                
-                return current_data, data
-        except Exception as e:
-            st.error(f"DATA FEED ERROR: {e}")
+        self.snapshot_version = None
+        self.snapshot = None
+
+    @timed('fetch_market_data')
+    def fetch_market_data(self):
+        """Read the latest shared market snapshot"""
+        service = get_market_service(self.interval)
+        snapshot = service.snapshot()
+        if snapshot is None:
+            st.error(f"DATA FEED ERROR: {service.last_error}")
             return None, None
+        
+        self.snapshot = snapshot
+        self.snapshot_version = snapshot.version
+        return snapshot.current_data, snapshot.historical_data
 
     def calculate_risk_metrics(self, current_data, historical_data):
-        """Calculate comprehensive forward-looking risk metrics"""
-        if not current_data or historical_data.empty:
-            return 0, {}
-            
+        """Risk metrics from the shared core, reporting a failure on the page instead of raising"""
         try:
-            # Enhanced Credit Risk Score (0-4) - More sensitive to changes
-            credit_score = 0
-            hyg_tlt_ratio = current_data['hyg_price'] / current_data['tlt_price']
-            hyg_tlt_5d_change = (hyg_tlt_ratio / (historical_data['HYG'].iloc[-6] / historical_data['TLT'].iloc[-6]) - 1) * 100
-            hyg_tlt_10d_change = (hyg_tlt_ratio / (historical_data['HYG'].iloc[-11] / historical_data['TLT'].iloc[-11]) - 1) * 100
-            
-            # More granular credit scoring
-            if hyg_tlt_5d_change < -2.5:
-                credit_score += 4
-            elif hyg_tlt_5d_change < -1.5:
-                credit_score += 3
-            elif hyg_tlt_5d_change < -0.8:
-                credit_score += 2
-            elif hyg_tlt_5d_change < -0.3:
-                credit_score += 1
-            
-            # Add 10-day trend component
-            if hyg_tlt_10d_change < -3:
-                credit_score += 1
-                
-            # Enhanced Currency Stress Score (0-4) - More weight to JPY moves
-            currency_score = 0
-            fxy_5d_change = (current_data['fxy_price'] / historical_data['FXY'].iloc[-6] - 1) * 100
-            uup_5d_change = (current_data['uup_price'] / historical_data['UUP'].iloc[-6] - 1) * 100
-            
-            # JPY strength is key risk-off indicator
-            if fxy_5d_change > 3.5:
-                currency_score += 4
-            elif fxy_5d_change > 2.5:
-                currency_score += 3
-            elif fxy_5d_change > 1.5:
-                currency_score += 2
-            elif fxy_5d_change > 0.8:
-                currency_score += 1
-                
-            # USD strength can also indicate stress in some contexts
-            if uup_5d_change > 4:
-                currency_score += 1
-            elif uup_5d_change > 2.5:
-                currency_score += 0.5
-                
-            # Enhanced Market Breadth Score (0-4) - More comprehensive
-            breadth_score = 0
-            rsp_spy_ratio = current_data['rsp_price'] / current_data['spy_price']
-            rsp_spy_5d_ago = historical_data['RSP'].iloc[-6] / historical_data['SPY'].iloc[-6]
-            rsp_spy_change = (rsp_spy_ratio / rsp_spy_5d_ago - 1) * 100
-            
-            iwm_spy_change = ((current_data['iwm_price'] / historical_data['IWM'].iloc[-6]) / 
-                             (current_data['spy_price'] / historical_data['SPY'].iloc[-6]) - 1) * 100
-            
-            # Defensive rotation (Utilities vs Tech)
-            xlu_xlk_ratio = current_data['xlu_price'] / current_data['xlk_price']
-            xlu_xlk_5d_ago = historical_data['XLU'].iloc[-6] / historical_data['XLK'].iloc[-6]
-            defensive_rotation = (xlu_xlk_ratio / xlu_xlk_5d_ago - 1) * 100
-            
-            # More sensitive breadth scoring
-            if rsp_spy_change < -2.5:
-                breadth_score += 2
-            elif rsp_spy_change < -1.2:
-                breadth_score += 1.5
-            elif rsp_spy_change < -0.6:
-                breadth_score += 1
-            
-            if iwm_spy_change < -4:
-                breadth_score += 2
-            elif iwm_spy_change < -2.5:
-                breadth_score += 1.5
-            elif iwm_spy_change < -1.2:
-                breadth_score += 1
-            
-            if defensive_rotation > 3:
-                breadth_score += 1.5
-            elif defensive_rotation > 1.5:
-                breadth_score += 1
-            elif defensive_rotation > 0.8:
-                breadth_score += 0.5
-                
-            # VIX momentum component
-            vix_30d = historical_data['^VIX'].iloc[-30:]
-            vix_percentile = (vix_30d < current_data['vix_price']).sum() / len(vix_30d) * 100
-            vix_5d_change = (current_data['vix_price'] / historical_data['^VIX'].iloc[-6] - 1) * 100
-            
-            # Add VIX momentum score (0-2)
-            vix_momentum_score = 0
-            if current_data['vix_price'] < 15 and (credit_score > 2 or currency_score > 2):
-                vix_momentum_score += 2  # Divergence penalty
-            elif vix_5d_change > 25:
-                vix_momentum_score += 1
-            elif vix_5d_change > 15:
-                vix_momentum_score += 0.5
-                
-            # Total Risk Score (0-10) with weighted components
-            total_score = (credit_score * 1.0) + (currency_score * 1.0) + (breadth_score * 0.8) + (vix_momentum_score * 1.0)
-            risk_score = min(10, max(0, round(total_score * 0.8)))  # Scale to 0-10
-            
-            # VIX Outlook
-            vix_outlook = self.generate_vix_outlook(current_data['vix_price'], vix_percentile, vix_5d_change, risk_score)
-            
-            # Hedge Recommendation
-            hedge_pct = self.calculate_hedge_percentage(risk_score, vix_percentile, current_data['vix_price'])
-            
-            detailed_metrics = {
-                'hyg_tlt_change': hyg_tlt_5d_change,
-                'hyg_tlt_10d_change': hyg_tlt_10d_change,
-                'fxy_change': fxy_5d_change,
-                'uup_change': uup_5d_change,
-                'rsp_spy_change': rsp_spy_change,
-                'iwm_spy_change': iwm_spy_change,
-                'defensive_rotation': defensive_rotation,
-                'credit_score': credit_score,
-                'currency_score': currency_score,
-                'breadth_score': breadth_score,
-                'vix_momentum_score': vix_momentum_score,
-                'vix_percentile': vix_percentile,
-                'vix_5d_change': vix_5d_change,
-                'vix_outlook': vix_outlook,
-                'hedge_percentage': hedge_pct
-            }
-            
-            return risk_score, detailed_metrics
-            
+            return super().calculate_risk_metrics(current_data, historical_data)
         except Exception as e:
             st.error(f"CALCULATION ERROR: {e}")
             return 0, {}
     
-    def generate_market_summary(self, risk_score, detailed_metrics, current_data):
-        """Generate comprehensive market summary paragraph"""
-        
-        # Risk assessment
-        if risk_score >= 8:
-            risk_assessment = "EXTREME RISK ENVIRONMENT with multiple stress indicators flashing red"
-        elif risk_score >= 6:
-            risk_assessment = "ELEVATED RISK CONDITIONS with significant market stress building"
-        elif risk_score >= 4:
-            risk_assessment = "MODERATE RISK LEVELS with selective pressure points emerging"
-        else:
-            risk_assessment = "LOW RISK ENVIRONMENT with markets showing resilience"
-        
-        # Credit analysis
-        credit_change = detailed_metrics.get('hyg_tlt_change', 0)
-        if credit_change < -2:
-            credit_status = "credit spreads widening aggressively indicating institutional stress"
-        elif credit_change < -1:
-            credit_status = "credit markets showing initial signs of stress"
-        else:
-            credit_status = "credit conditions remain stable"
-        
-        # Currency analysis
-        jpy_change = detailed_metrics.get('fxy_change', 0)
-        if jpy_change > 2:
-            currency_status = "strong JPY appreciation signaling flight-to-quality flows"
-        elif jpy_change > 1:
-            currency_status = "moderate JPY strength suggesting risk-off sentiment"
-        else:
-            currency_status = "currency markets showing normal risk appetite"
-        
-        # Breadth analysis
-        breadth_change = detailed_metrics.get('rsp_spy_change', 0)
-        small_cap_change = detailed_metrics.get('iwm_spy_change', 0)
-        if breadth_change < -1 and small_cap_change < -2:
-            breadth_status = "market breadth deteriorating with small caps severely underperforming"
-        elif breadth_change < -1 or small_cap_change < -2:
-            breadth_status = "market breadth showing signs of weakness"
-        else:
-            breadth_status = "broad market participation remains healthy"
-        
-        # VIX analysis
-        vix_level = current_data['vix_price']
-        vix_percentile = detailed_metrics.get('vix_percentile', 50)
-        if vix_level > 30:
-            vix_status = f"VIX elevated at {vix_level:.1f} suggesting high fear levels"
-        elif vix_level < 15:
-            vix_status = f"VIX compressed at {vix_level:.1f} indicating complacency"
-        else:
-            vix_status = f"VIX at {vix_level:.1f} within normal ranges"
-        
-        # Hedge recommendation
-        hedge_pct = detailed_metrics.get('hedge_percentage', 0)
-        if hedge_pct > 70:
-            hedge_rec = f"IMMEDIATE AGGRESSIVE HEDGING REQUIRED at {hedge_pct:.0f}% of dollar beta"
-        elif hedge_pct > 40:
-            hedge_rec = f"SIGNIFICANT HEDGE POSITION WARRANTED at {hedge_pct:.0f}% of dollar beta"
-        elif hedge_pct > 20:
-            hedge_rec = f"MODERATE HEDGING APPROPRIATE at {hedge_pct:.0f}% of dollar beta"
-        else:
-            hedge_rec = f"MINIMAL HEDGE REQUIRED at {hedge_pct:.0f}% of dollar beta"
-        
-        summary = f"""MARKET ANALYSIS: {risk_assessment}. Current assessment shows {credit_status}, while {currency_status}. Market internals indicate {breadth_status}. Volatility measures show {vix_status} ({vix_percentile:.0f}th percentile). Forward-looking risk indicators suggest {hedge_rec}. Risk score of {risk_score}/10 reflects confluence of credit stress ({detailed_metrics.get('credit_score', 0)}/4), currency flows ({detailed_metrics.get('currency_score', 0)}/3), and breadth deterioration ({detailed_metrics.get('breadth_score', 0)}/3). Immediate action required for risk management positioning."""
-        
-        return summary
-    
-    def generate_vix_outlook(self, current_vix, percentile, change_5d, risk_score):
-        """Generate VIX outlook"""
-        if risk_score >= 8 and current_vix < 25:
-            return "DIVERGENCE ALERT: High risk score with low VIX suggests imminent spike to 25-35 range"
-        elif risk_score >= 6 and current_vix < 20:
-            return "BUILDING PRESSURE: Risk indicators elevated, expect VIX advance to 20-25 range"
-        elif current_vix > 30 and risk_score < 4:
-            return "MEAN REVERSION: High VIX with improving fundamentals suggests decline to 15-20 range"
-        elif percentile > 80:
-            return "ELEVATED REGIME: VIX in top quintile, monitor for reversal signals"
-        elif percentile < 20:
-            return "COMPLACENCY WARNING: Low volatility environment vulnerable to sudden spikes"
-        else:
-            return "NEUTRAL ENVIRONMENT: VIX in normal range, monitor risk score for early warnings"
-    
-    def generate_hedge_strategy(self, portfolio_dollar_beta, hedge_percentage, current_vix, risk_score):
-        """Generate specific hedge strategy recommendations"""
-        
-        if portfolio_dollar_beta <= 0:
-            return "Please enter a valid portfolio dollar beta amount."
-        
-        hedge_amount = portfolio_dollar_beta * (hedge_percentage / 100)
-        
-        strategies = []
-        
-        # Determine optimal hedge strategy based on risk level and VIX
-        if risk_score <= 3:
-            # Low risk - minimal hedging
-            if hedge_amount > 0:
-                sh_shares = int(hedge_amount / 27.34)  # Assuming SH price ~$27.34
-                strategies.append({
-                    'instrument': 'SH (Inverse S&P ETF)',
-                    'action': 'BUY',
-                    'amount': f"{sh_shares:,} shares",
-                    'cost': f"${hedge_amount:,.0f}",
-                    'rationale': 'Low cost hedge for minimal risk environment'
-                })
-            else:
-                strategies.append({
-                    'instrument': 'NO HEDGE REQUIRED',
-                    'action': 'HOLD CASH',
-                    'amount': 'N/A',
-                    'cost': '$0',
-                    'rationale': 'Risk environment does not warrant hedging costs'
-                })
-                
-        elif risk_score <= 6:
-            # Moderate risk - SH primary with small put position
-            sh_allocation = hedge_amount * 0.75
-            put_allocation = hedge_amount * 0.25
-            
-            sh_shares = int(sh_allocation / 27.34)
-            put_contracts = int(put_allocation / 500)  # Assuming $500 per SPY put
-            
-            strategies.append({
-                'instrument': 'SH (Inverse S&P ETF)',
-                'action': 'BUY',
-                'amount': f"{sh_shares:,} shares",
-                'cost': f"${sh_allocation:,.0f}",
-                'rationale': 'Primary hedge via inverse ETF for cost efficiency'
-            })
-            
-            if put_contracts > 0:
-                strategies.append({
-                    'instrument': 'SPY Put Options',
-                    'action': 'BUY',
-                    'amount': f"{put_contracts} contracts",
-                    'cost': f"${put_allocation:,.0f}",
-                    'rationale': 'Put options for convexity in moderate stress scenario'
-                })
-                
-        else:
-            # High risk - Aggressive hedging with puts primary
-            if current_vix > 25:
-                # VIX already high - use SH + sell calls
-                sh_allocation = hedge_amount * 0.6
-                call_allocation = hedge_amount * 0.4
-                
-                sh_shares = int(sh_allocation / 27.34)
-                call_contracts = int(call_allocation / 800)  # Assuming $800 premium per call
-                
-                strategies.append({
-                    'instrument': 'SH (Inverse S&P ETF)',
-                    'action': 'BUY',
-                    'amount': f"{sh_shares:,} shares",
-                    'cost': f"${sh_allocation:,.0f}",
-                    'rationale': 'Inverse ETF when vol already elevated'
-                })
-                
-                strategies.append({
-                    'instrument': 'SPY Call Options',
-                    'action': 'SELL',
-                    'amount': f"{call_contracts} contracts",
-                    'cost': f"+${call_allocation:,.0f} premium",
-                    'rationale': 'Sell calls for additional premium when VIX high'
-                })
-            else:
-                # VIX still low with high risk score - use puts for gamma
-                put_allocation = hedge_amount * 0.7
-                sh_allocation = hedge_amount * 0.3
-                
-                put_contracts = int(put_allocation / 500)
-                sh_shares = int(sh_allocation / 27.34)
-                
-                strategies.append({
-                    'instrument': 'SPY Put Options',
-                    'action': 'BUY',
-                    'amount': f"{put_contracts} contracts",
-                    'cost': f"${put_allocation:,.0f}",
-                    'rationale': 'Put options for gamma exposure before VIX spike'
-                })
-                
-                strategies.append({
-                    'instrument': 'SH (Inverse S&P ETF)',
-                    'action': 'BUY',
-                    'amount': f"{sh_shares:,} shares",
-                    'cost': f"${sh_allocation:,.0f}",
-                    'rationale': 'Base hedge via inverse ETF'
-                })
-        
-    def calculate_hedge_percentage(self, risk_score, vix_percentile, current_vix):
-        """Calculate recommended hedge percentage"""
-        base_hedge = min(risk_score * 8.75, 87.5)  # Max 87.5% hedge
-        
-        # VIX adjustments
-        if current_vix > 35:
-            base_hedge = max(base_hedge - 15, 0)
-        elif current_vix > 25:
-            base_hedge = max(base_hedge - 10, 0)
-        elif current_vix < 12:
-            base_hedge += 12.5
-            
-        # Percentile adjustments
-        if vix_percentile > 90:
-            base_hedge = max(base_hedge - 12.5, 0)
-        elif vix_percentile < 10:
-            base_hedge += 12.5
-            
-        return min(max(base_hedge, 0), 87.5)
+    def snapshot_scores(self):
+        """Risk metrics of the fetched snapshot from the process-wide cache the API also reads"""
+        try:
+            return snapshot_scores(self.interval, self.snapshot)
+        except Exception as e:
+            st.error(f"CALCULATION ERROR: {e}")
+            return 0, {}
     
-    def generate_hedge_strategy(self, portfolio_dollar_beta, hedge_percentage, current_vix, risk_score):
-        """Generate specific hedge strategy recommendations"""
+    @timed('create_charts')
+    def create_charts(self, historical_data, current_data, risk_score, sessions=60, max_points=MAX_CHART_POINTS,
+                      score_history=None):
+        """Create professional Bloomberg-style charts with info tooltips.
         
-        if portfolio_dollar_beta <= 0:
-            return "Please enter a valid portfolio dollar beta amount."
+        Plots the last `sessions` rows (all when None) as WebGL traces, decimated
+        server-side to about `max_points` points each. score_history is the stored
+        risk score by date; without it every date is scored here.
+        """
         
-        hedge_amount = portfolio_dollar_beta * (hedge_percentage / 100)
+        def visible(series, method='lttb'):
+            return decimate(series if sessions is None else series.iloc[-sessions:], max_points, method)
         
-        strategies = []
-        
-        # Determine optimal hedge strategy based on risk level and VIX
-        if risk_score <= 3:
-            # Low risk - minimal hedging
-            if hedge_amount > 0:
-                sh_shares = int(hedge_amount / 27.34)  # Assuming SH price ~$27.34
-                strategies.append({
-                    'instrument': 'SH (Inverse S&P ETF)',
-                    'action': 'BUY',
-                    'amount': f"{sh_shares:,} shares",
-                    'cost': f"${hedge_amount:,.0f}",
-                    'rationale': 'Low cost hedge for minimal risk environment'
-                })
-            else:
-                strategies.append({
-                    'instrument': 'NO HEDGE REQUIRED',
-                    'action': 'HOLD CASH',
-                    'amount': 'N/A',
-                    'cost': '$0',
-                    'rationale': 'Risk environment does not warrant hedging costs'
-                })
-                
-        elif risk_score <= 6:
-            # Moderate risk - SH primary with small put position
-            sh_allocation = hedge_amount * 0.75
-            put_allocation = hedge_amount * 0.25
-            
-            sh_shares = int(sh_allocation / 27.34)
-            put_contracts = int(put_allocation / 500)  # Assuming $500 per SPY put
-            
-            strategies.append({
-                'instrument': 'SH (Inverse S&P ETF)',
-                'action': 'BUY',
-                'amount': f"{sh_shares:,} shares",
-                'cost': f"${sh_allocation:,.0f}",
-                'rationale': 'Primary hedge via inverse ETF for cost efficiency'
-            })
-            
-            if put_contracts > 0:
-                strategies.append({
-                    'instrument': 'SPY Put Options',
-                    'action': 'BUY',
-                    'amount': f"{put_contracts} contracts",
-                    'cost': f"${put_allocation:,.0f}",
-                    'rationale': 'Put options for convexity in moderate stress scenario'
-                })
-                
-        else:
-            # High risk - Aggressive hedging with puts primary
-            if current_vix > 25:
-                # VIX already high - use SH + sell calls
-                sh_allocation = hedge_amount * 0.6
-                call_allocation = hedge_amount * 0.4
-                
-                sh_shares = int(sh_allocation / 27.34)
-                call_contracts = int(call_allocation / 800)  # Assuming $800 premium per call
-                
-                strategies.append({
-                    'instrument': 'SH (Inverse S&P ETF)',
-                    'action': 'BUY',
-                    'amount': f"{sh_shares:,} shares",
-                    'cost': f"${sh_allocation:,.0f}",
-                    'rationale': 'Inverse ETF when vol already elevated'
-                })
-                
-                strategies.append({
-                    'instrument': 'SPY Call Options',
-                    'action': 'SELL',
-                    'amount': f"{call_contracts} contracts",
-                    'cost': f"+${call_allocation:,.0f} premium",
-                    'rationale': 'Sell calls for additional premium when VIX high'
-                })
-            else:
-                # VIX still low with high risk score - use puts for gamma
-                put_allocation = hedge_amount * 0.7
-                sh_allocation = hedge_amount * 0.3
-                
-                put_contracts = int(put_allocation / 500)
-                sh_shares = int(sh_allocation / 27.34)
-                
-                strategies.append({
-                    'instrument': 'SPY Put Options',
-                    'action': 'BUY',
-                    'amount': f"{put_contracts} contracts",
-                    'cost': f"${put_allocation:,.0f}",
-                    'rationale': 'Put options for gamma exposure before VIX spike'
-                })
-                
-                strategies.append({
-                    'instrument': 'SH (Inverse S&P ETF)',
-                    'action': 'BUY',
-                    'amount': f"{sh_shares:,} shares",
-                    'cost': f"${sh_allocation:,.0f}",
-                    'rationale': 'Base hedge via inverse ETF'
-                })
-        
-        return strategies
-    
-    def create_charts(self, historical_data, current_data, risk_score):
-        """Create professional Bloomberg-style charts with info tooltips"""
-        
-        # Generate actual risk score history based on historical data
-        risk_history = []
-        dates = historical_data.index[-60:]
-        
-        for i in range(len(dates)):
-            try:
-                # Calculate historical risk score for each day
-                if i >= 10:  # Need at least 10 days for calculations
-                    hist_data = historical_data.iloc[:len(historical_data) - (59 - i)]
-                    hist_current = {
-                        'hyg_price': hist_data['HYG'].iloc[-1],
-                        'tlt_price': hist_data['TLT'].iloc[-1],
-                        'fxy_price': hist_data['FXY'].iloc[-1],
-                        'uup_price': hist_data['UUP'].iloc[-1],
-                        'rsp_price': hist_data['RSP'].iloc[-1],
-                        'spy_price': hist_data['SPY'].iloc[-1],
-                        'iwm_price': hist_data['IWM'].iloc[-1],
-                        'vix_price': hist_data['^VIX'].iloc[-1],
-                        'xlu_price': hist_data['XLU'].iloc[-1],
-                        'xlk_price': hist_data['XLK'].iloc[-1],
-                    }
-                    hist_score, _ = self.calculate_risk_metrics(hist_current, hist_data)
-                    risk_history.append(hist_score)
-                else:
-                    risk_history.append(np.random.randint(0, 4))  # Placeholder for early days
-            except:
-                risk_history.append(np.random.randint(0, 4))
+        if score_history is None:
+            score_history = compute_score_history(historical_data)['risk_score']
+        score_history = score_history.reindex(historical_data.index)
         
         # Ensure current score is correct
-        risk_history[-1] = risk_score
+        score_history.iloc[-1] = risk_score
+        score_history = visible(score_history, 'minmax')
+        dates = score_history.index
+        risk_history = score_history.to_numpy()
+        
+        # Plotly's figure factories load on the first chart, not at startup
+        import plotly.graph_objects as go
+        from plotly.subplots import make_subplots
         
         fig = make_subplots(
             rows=3, cols=2,
@@ -778,7 +156,7 @@ class MarketRiskDashboard:
         fig.update_layout(
             plot_bgcolor='#000000',
             paper_bgcolor='#000000',
-            font=dict(color='#FFFFFF', family='IBM Plex Mono', size=10),
+            font=dict(color='#FFFFFF', family='IBM Plex Mono, Source Code Pro, ui-monospace, Menlo, Consolas, monospace', size=10),
             height=700,
             showlegend=False,
             margin=dict(l=40, r=40, t=80, b=40)
@@ -786,7 +164,7 @@ class MarketRiskDashboard:
         
         # 1. Risk Score Chart with actual calculated history
         fig.add_trace(
-            go.Scatter(x=dates, y=risk_history, 
+            go.Scattergl(x=dates, y=risk_history, 
                       mode='lines+markers', 
                       line=dict(color='#FF9500', width=3),
                       marker=dict(size=4, color='#FF9500'),
@@ -798,32 +176,33 @@ class MarketRiskDashboard:
         fig.add_hline(y=8, line_dash="solid", line_color="#FF0000", row=1, col=1)
         
         # 2. Credit Spreads
-        hyg_tlt_ratio = historical_data['HYG'] / historical_data['TLT']
+        hyg_tlt_ratio = visible(historical_data['HYG'] / historical_data['TLT'])
         fig.add_trace(
-            go.Scatter(x=hyg_tlt_ratio.index[-60:], y=hyg_tlt_ratio.iloc[-60:],
+            go.Scattergl(x=hyg_tlt_ratio.index, y=hyg_tlt_ratio,
                       mode='lines', line=dict(color='#FF9500', width=2)),
             row=1, col=2
         )
         
         # 3. Currency Stress
-        usd_jpy_proxy = historical_data['UUP'] / historical_data['FXY']
+        usd_jpy_proxy = visible(historical_data['UUP'] / historical_data['FXY'])
         fig.add_trace(
-            go.Scatter(x=usd_jpy_proxy.index[-60:], y=usd_jpy_proxy.iloc[-60:],
+            go.Scattergl(x=usd_jpy_proxy.index, y=usd_jpy_proxy,
                       mode='lines', line=dict(color='#FF9500', width=2)),
             row=2, col=1
         )
         
         # 4. Market Breadth
-        rsp_spy_ratio = historical_data['RSP'] / historical_data['SPY']
+        rsp_spy_ratio = visible(historical_data['RSP'] / historical_data['SPY'])
         fig.add_trace(
-            go.Scatter(x=rsp_spy_ratio.index[-60:], y=rsp_spy_ratio.iloc[-60:],
+            go.Scattergl(x=rsp_spy_ratio.index, y=rsp_spy_ratio,
                       mode='lines', line=dict(color='#FF9500', width=2)),
             row=2, col=2
         )
         
         # 5. VIX Level
+        vix = visible(historical_data['^VIX'], 'minmax')
         fig.add_trace(
-            go.Scatter(x=historical_data['^VIX'].index[-60:], y=historical_data['^VIX'].iloc[-60:],
+            go.Scattergl(x=vix.index, y=vix,
                       mode='lines', line=dict(color='#FF9500', width=2)),
             row=3, col=1
         )
@@ -831,9 +210,9 @@ class MarketRiskDashboard:
         fig.add_hline(y=30, line_dash="dash", line_color="#FF0000", row=3, col=1)
         
         # 6. Defensive Rotation
-        defensive_ratio = historical_data['XLU'] / historical_data['XLK']
+        defensive_ratio = visible(historical_data['XLU'] / historical_data['XLK'])
         fig.add_trace(
-            go.Scatter(x=defensive_ratio.index[-60:], y=defensive_ratio.iloc[-60:],
+            go.Scattergl(x=defensive_ratio.index, y=defensive_ratio,
                       mode='lines', line=dict(color='#FF9500', width=2)),
             row=3, col=2
         )
@@ -848,30 +227,431 @@ class MarketRiskDashboard:
         
         return fig
 
+# Sessions plotted for each chart range; MAX is everything in the daily store
+CHART_RANGES = {'60D': 60, '1Y': 252, '5Y': 1260, 'MAX': None}
+
+@st.cache_resource(max_entries=16)
+def chart_figure(interval, version, chart_range, risk_score, _historical_data, _current_data):
+    """Decimated chart figure, built once per snapshot version and range and shared by every session"""
+    count('cache_misses', cache='chart_figure')
+    sessions = CHART_RANGES[chart_range]
+    data = _historical_data
+    if sessions is None or sessions > len(data):
+        # Ranges past the snapshot window read the longer daily history kept in the store
+        stored = align_prices(PriceStore.for_interval('1d').read(TICKERS)).prices
+        if len(stored) > len(data):
+            data = stored
+    # Scores come from the snapshot log; dates it has never seen are scored into it once
+    score_store = get_score_store()
+    score_store.backfill(interval, data)
+    with timer('score_store_read'):
+        score_history = score_store.history(interval, data.index[0])['risk_score']
+    return MarketRiskDashboard(interval).create_charts(data, _current_data, risk_score, sessions,
+                                                       score_history=score_history)
+
+@st.cache_data(max_entries=8)
+def lookback_snapshot(interval, version, _historical_data):
+    """Latest change and percentile of every look-back series over every window, as a display table"""
+    latest = lookback_metrics(_historical_data).iloc[-1]
+    rows = []
+    for series in LOOKBACK_SERIES:
+        row = {'SIGNAL': series}
+        for window in LOOKBACK_WINDOWS:
+            change = latest[(series, 'change', window)]
+            row[f'{window}D %'] = f"{change:+.2f}" if np.isfinite(change) else "N/A"
+        percentile = latest[(series, 'percentile', LOOKBACK_WINDOWS[-1])]
+        row[f'{LOOKBACK_WINDOWS[-1]}D PCTL'] = f"{percentile:.0f}" if np.isfinite(percentile) else "N/A"
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+@st.cache_data
+def put_ladder_table(spot, vix):
+    """Ranked SPY put ladder for one SPY/VIX print, shared by every session"""
+    count('cache_misses', cache='put_ladder')
+    return put_ladder(spot, vix)
+
+@st.cache_data(max_entries=16)
+def tail_risk_snapshot(interval, version, dollar_beta, risk_score, vix_percentile, prices, _historical_data):
+    """Monte Carlo VaR / ES table for one snapshot and portfolio, shared by every session"""
+    with timer('monte_carlo'):
+        risk = tail_risk(_historical_data, dollar_beta, risk_score, vix_percentile, prices)
+    return tail_risk_table(risk), risk.effective_days
+
+@st.fragment
+def portfolio_panel(dashboard, current_data, historical_data, risk_score, detailed_metrics):
+    """Portfolio input and hedge execution; editing the input reruns only this panel"""
+    st.markdown("## PORTFOLIO HEDGING STRATEGY")
+    prices = instrument_prices(current_data)
+    
+    col1, col2 = st.columns([1, 2])
+    
+    with col1:
+        st.markdown("### PORTFOLIO INPUT")
+        positions_file = st.file_uploader(
+            "Positions File (optional)",
+            type=['csv', 'parquet'],
+            help="ticker and quantity columns; dollar beta is computed from rolling betas against SPY"
+        )
+        if positions_file is None:
+            portfolio_dollar_beta = st.number_input(
+                "Enter Portfolio Dollar Beta ($)",
+                min_value=0.0,
+                value=100000.0,
+                step=10000.0,
+                format="%.0f",
+                help="Total dollar beta exposure of your portfolio (sum of position size × beta for each holding)"
+            )
+        else:
+            try:
+                positions = read_positions(positions_file.getvalue(), positions_file.name)
+                with timer('dollar_beta'):
+                    position_table, portfolio_dollar_beta = dollar_beta(
+                        positions, get_beta_estimator(), price_feed(), offline=OFFLINE
+                    )
+            except Exception as e:
+                st.error(f"POSITIONS FILE ERROR: {str(e)}")
+                portfolio_dollar_beta = 0.0
+            else:
+                missing = int(position_table['beta'].isna().sum())
+                st.write(f"**POSITIONS:** {len(position_table):,}" + (f" ({missing} WITHOUT BETA)" if missing else ""))
+                with st.expander("POSITION BETAS", expanded=False):
+                    st.dataframe(position_table, use_container_width=True, hide_index=True)
+        
+        if portfolio_dollar_beta > 0:
+            hedge_amount = portfolio_dollar_beta * (detailed_metrics.get('hedge_percentage', 0) / 100)
+            st.markdown(f"**Portfolio Dollar Beta:** ${portfolio_dollar_beta:,.0f}")
+            st.markdown(f"**Recommended Hedge %:** {detailed_metrics.get('hedge_percentage', 0):.1f}%")
+            st.markdown(f"**Dollar Amount to Hedge:** ${hedge_amount:,.0f}")
+        
+        if prices.sh_price > 0:
+            st.markdown(f"**SH:** ${prices.sh_price:,.2f}")
+        else:
+            st.warning("SH PRICE UNAVAILABLE - SH LEGS ARE NOT SIZED")
+        st.markdown(f"**SPY {prices.expiry_days}D ${prices.put_strike:,.0f} PUT:** ${prices.put_premium:,.0f} / contract")
+        st.markdown(f"**SPY {prices.expiry_days}D ${prices.call_strike:,.0f} CALL:** ${prices.call_premium:,.0f} / contract")
+    
+    with col2:
+        st.markdown("### HEDGE EXECUTION STRATEGY")
+        
+        if portfolio_dollar_beta > 0:
+            hedge_strategies = dashboard.generate_hedge_strategy(
+                portfolio_dollar_beta, 
+                detailed_metrics.get('hedge_percentage', 0), 
+                current_data['vix_price'], 
+                risk_score,
+                prices
+            )
+            
+            if isinstance(hedge_strategies, str):
+                st.write(hedge_strategies)
+            else:
+                for i, strategy in enumerate(hedge_strategies):
+                    st.markdown(f"""
+                    <div class="hedge-strategy">
+                        <strong>STRATEGY {i+1}: {strategy['instrument']}</strong><br/>
+                        <strong>ACTION:</strong> {strategy['action']}<br/>
+                        <strong>AMOUNT:</strong> {strategy['amount']}<br/>
+                        <strong>COST:</strong> {strategy['cost']}<br/>
+                        <strong>RATIONALE:</strong> {strategy['rationale']}
+                    </div>
+                    """, unsafe_allow_html=True)
+                
+                # Add execution notes
+                st.markdown("""
+                <div class="hedge-recommendation">
+                    <strong>EXECUTION NOTES:</strong><br/>
+                    • Execute hedges in order of priority during market hours<br/>
+                    • Monitor risk score changes for dynamic adjustments<br/>
+                    • Consider liquidity and bid-ask spreads for options<br/>
+                    • Scale into positions over 2-3 trading sessions for large amounts
+                </div>
+                """, unsafe_allow_html=True)
+        else:
+            st.write("Enter your portfolio dollar beta to see specific hedge recommendations.")
+        
+        if portfolio_dollar_beta > 0:
+            with st.expander("SCENARIO P&L", expanded=False):
+                package = hedge_package(portfolio_dollar_beta, risk_score, detailed_metrics.get('vix_percentile', 50),
+                                        prices.vix, prices)
+                greeks = package_greeks(package, prices)
+                st.write(f"**HEDGED DOLLAR DELTA:** ${greeks.dollar_delta:,.0f} | "
+                         f"**GAMMA (PER 1%):** ${greeks.dollar_gamma:,.0f} | "
+                         f"**VEGA (PER VIX PT):** ${greeks.vega:,.0f} | **THETA (PER DAY):** ${greeks.theta:,.0f}")
+                count('cache_requests', cache='scenario_chart')
+                st.plotly_chart(scenario_chart(prices, risk_score, detailed_metrics.get('vix_percentile', 50),
+                                               portfolio_dollar_beta), use_container_width=True)
+        
+        with st.expander("PUT STRIKE LADDER", expanded=False):
+            st.write(f"*Black-Scholes premiums at VIX {prices.vix:.1f} implied vol, ranked by premium per dollar "
+                     f"of payoff if SPY falls {PROTECTION_MOVE:.0%} by expiry*")
+            count('cache_requests', cache='put_ladder')
+            st.dataframe(put_ladder_table(prices.spy_price, prices.vix), use_container_width=True, hide_index=True)
+    
+    with st.expander("MONTE CARLO TAIL RISK", expanded=False):
+        st.write(f"*{MC_PATHS:,} bootstrapped {MC_DAYS}-session paths of the tracked tickers, weighted toward days "
+                 f"with a risk score near {risk_score}; losses in dollars*")
+        if portfolio_dollar_beta > 0 and st.checkbox("RUN SIMULATION", value=False):
+            try:
+                table, effective_days = tail_risk_snapshot(
+                    dashboard.interval, dashboard.snapshot_version, portfolio_dollar_beta, risk_score,
+                    detailed_metrics.get('vix_percentile', 50), prices, historical_data
+                )
+            except Exception as e:
+                st.error(f"SIMULATION ERROR: {str(e)}")
+            else:
+                st.write(f"**EFFECTIVE SAMPLE:** {effective_days:,.0f} SESSIONS")
+                st.dataframe(table.map(lambda v: f"${v:,.0f}"), use_container_width=True)
+    
+    with st.expander("BATCH PORTFOLIOS", expanded=False):
+        st.write("*Upload a CSV or Parquet file with portfolio_id, dollar_beta and an optional hedge_cap (%) column*")
+        upload = st.file_uploader("PORTFOLIO FILE", type=['csv', 'parquet'], label_visibility="collapsed")
+        if upload is not None:
+            try:
+                portfolios = read_portfolios(upload.getvalue(), upload.name)
+                with timer('batch_hedge'):
+                    results = batch_hedge(portfolios, risk_score, detailed_metrics.get('vix_percentile', 50),
+                                          current_data['vix_price'], prices)
+            except Exception as e:
+                st.error(f"BATCH FILE ERROR: {str(e)}")
+                return
+            
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                st.write(f"**PORTFOLIOS:** {len(results):,}")
+            with col2:
+                st.write(f"**TOTAL DOLLAR BETA:** ${results['dollar_beta'].sum():,.0f}")
+            with col3:
+                st.write(f"**TOTAL TO HEDGE:** ${results['hedge_amount'].sum():,.0f}")
+            st.dataframe(results.head(1000), use_container_width=True, hide_index=True)
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                st.download_button("DOWNLOAD CSV", write_portfolios(results, 'csv'),
+                                   file_name="hedge_batch.csv", mime="text/csv")
+            with col2:
+                st.download_button("DOWNLOAD PARQUET", write_portfolios(results, 'parquet'),
+                                   file_name="hedge_batch.parquet", mime="application/octet-stream")
+
+@st.fragment(run_every=REFRESH_INTERVAL)
+def snapshot_watch(interval, rendered_version):
+    """Poll the shared snapshot and rerun the page only when a new version is published"""
+    snapshot = get_market_service(interval).snapshot()
+    if snapshot is not None and snapshot.version != rendered_version:
+        st.rerun()
+
+# Sensitivity grid shown in the tables, and the dense grid behind the surface heatmap
+SENSITIVITY_VIX_LEVELS = (10, 12, 15, 18, 20, 25, 30, 35, 40, 50)
+SENSITIVITY_SCORES = (0, 2, 4, 6, 8, 10)
+SURFACE_VIX_LEVELS = tuple(np.arange(5, 80.5, 0.5))
+SURFACE_SCORES = tuple(np.arange(0, 10.5, 0.5))
+
+SENSITIVITY_HEADER = """
+            <table class="sensitivity-table">
+                <tr>
+                    <th rowspan="2">VIX</th>
+                    <th colspan="6">RISK SCORE</th>
+                </tr>
+                <tr>
+                    <th>0</th><th>2</th><th>4</th><th>6</th><th>8</th><th>10</th>
+                </tr>
+            """
+
+@st.cache_data(max_entries=64)
+def _sensitivity_html(near_rows, highlight):
+    """Table HTML for one highlight position; near_rows are the rows within 3 VIX points"""
+    count('cache_misses', cache='sensitivity_table')
+    cells = [[f"{value:.1f}" for value in row] for row in hedge_surface(SENSITIVITY_VIX_LEVELS, SENSITIVITY_SCORES)]
+    html = SENSITIVITY_HEADER
+    for row, vix in enumerate(SENSITIVITY_VIX_LEVELS):
+        html += f"<tr><td>{vix}</td>"
+        for col, cell in enumerate(cells[row]):
+            if row in near_rows and col == highlight:
+                html += f"<td class='highlighted'>{cell}</td>"
+            else:
+                html += f"<td>{cell}</td>"
+        html += "</tr>"
+    return html + "</table>"
+
+@timed('sensitivity_table')
+def sensitivity_table(current_vix, risk_score):
+    """Hedge percentage table with the current VIX and score highlighted.
+
+    Cell values come from the memoized surfaces and the HTML is cached per highlight
+    position, so a render is a single cache lookup.
+    """
+    count('cache_requests', cache='sensitivity_table')
+    highlight = SENSITIVITY_SCORES.index(risk_score) if risk_score in SENSITIVITY_SCORES else None
+    near_rows = tuple(row for row, vix in enumerate(SENSITIVITY_VIX_LEVELS) if abs(vix - current_vix) < 3)
+    return _sensitivity_html(near_rows if highlight is not None else (), highlight)
+
+@st.cache_resource
+def hedge_surface_chart():
+    """Heatmap of the hedge percentage over a dense VIX x risk score grid, built once per process"""
+    import plotly.graph_objects as go
+    fig = go.Figure(go.Heatmap(
+        z=hedge_surface(SURFACE_VIX_LEVELS, SURFACE_SCORES),
+        x=SURFACE_SCORES,
+        y=SURFACE_VIX_LEVELS,
+        colorscale=[[0, '#003300'], [0.5, '#FF9500'], [1, '#FF0000']],
+        colorbar=dict(title='HEDGE %'),
+        hovertemplate='SCORE %{x}<br>VIX %{y}<br>HEDGE %{z:.1f}%<extra></extra>'
+    ))
+    fig.update_layout(
+        title="HEDGE PERCENTAGE SURFACE",
+        height=500,
+        paper_bgcolor='#000000',
+        plot_bgcolor='#000000',
+        font=dict(color='#FFFFFF', family='IBM Plex Mono, Source Code Pro, ui-monospace, Menlo, Consolas, monospace'),
+        xaxis_title="RISK SCORE",
+        yaxis_title="VIX"
+    )
+    return fig
+
+@st.cache_resource(max_entries=32)
+def scenario_chart(prices, risk_score, vix_percentile, dollar_beta=None):
+    """Heatmap of hedged P&L over SPY moves x VIX shocks for the recommended package.
+
+    With a dollar beta the package is sized in whole units and P&L is in dollars; without
+    one it is fractional and P&L is a percentage of the portfolio dollar beta.
+    """
+    count('cache_misses', cache='scenario_chart')
+    if dollar_beta is None:
+        package = hedge_package(1.0, risk_score, vix_percentile, prices.vix, prices, whole=False)
+        scale, label, number = 100, 'NET P&L %', '%{z:.2f}%'
+    else:
+        package = hedge_package(dollar_beta, risk_score, vix_percentile, prices.vix, prices)
+        scale, label, number = 1, 'NET P&L $', '$%{z:,.0f}'
+    scenarios = scenario_pnl(package, prices)
+    import plotly.graph_objects as go
+    fig = go.Figure(go.Heatmap(
+        z=scenarios.net * scale,
+        x=scenarios.moves * 100,
+        y=scenarios.shocks,
+        zmid=0,
+        colorscale=[[0, '#FF0000'], [0.5, '#000000'], [1, '#00FF00']],
+        colorbar=dict(title=label),
+        hovertemplate=f'SPY %{{x:+.0f}}%<br>VIX %{{y:+.0f}} PTS<br>{label} {number}<extra></extra>'
+    ))
+    fig.update_layout(
+        title=f"HEDGED P&L AFTER {HORIZON_DAYS} DAYS",
+        height=450,
+        paper_bgcolor='#000000',
+        plot_bgcolor='#000000',
+        font=dict(color='#FFFFFF', family='IBM Plex Mono, Source Code Pro, ui-monospace, Menlo, Consolas, monospace'),
+        xaxis_title="SPY MOVE (%)",
+        yaxis_title="VIX SHOCK (PTS)"
+    )
+    return fig
+
+METRICS.register_cache('hedge_surface', _hedge_surface.cache_info)
+
+@st.cache_resource(ttl=REFRESH_INTERVAL, max_entries=4)
+def universe_scan(tickers):
+    """Every scored pair of a ticker universe, synced in one bulk request and shared by every session.
+
+    Returns (stress table, as-of date, scan time); the table is ranked, weak leg first.
+    """
+    table, asof = scan_universe(list(tickers), price_feed(), offline=OFFLINE, top=None)
+    return table, asof, datetime.now()
+
+def universe_panel():
+    """On-demand stress scan over every pair in the configured universe"""
+    with st.expander("UNIVERSE STRESS SCAN", expanded=False):
+        tickers = tuple(load_universe())
+        st.write(f"*Ratio momentum across {len(tickers)} tickers ({len(tickers) * (len(tickers) - 1) // 2:,} pairs), weak leg first*")
+        if st.checkbox("RUN SCAN", value=False):
+            try:
+                table, asof, scanned_at = universe_scan(tickers)
+            except Exception as e:
+                st.error(f"UNIVERSE SCAN ERROR: {str(e)}")
+                return
+            # Each fresh scan is one alert tick over every pair, named by its sorted legs so a
+            # pair leaving the top rows or swapping its weak leg still clears
+            evaluate_scan('universe', pair_subjects(table), scanned_at)
+            table = table.head(50)
+            st.write(f"AS OF: {asof.strftime('%Y-%m-%d')}")
+            st.dataframe(pd.DataFrame({
+                'PAIR': table.index,
+                '5D CHANGE %': table['change_5d'].map(lambda v: f"{v:.2f}"),
+                '10D CHANGE %': table['change_10d'].map(lambda v: f"{v:.2f}"),
+                'Z-SCORE': table['zscore'].map(lambda v: f"{v:.2f}"),
+            }), use_container_width=True, hide_index=True)
+
+def alerts_panel():
+    """Alerts raised and cleared by the rule engine in this server process, newest first"""
+    engines = [alert_engine(scope) for scope in ('market', 'universe')]
+    active = sum(len(engine.active()) for engine in engines)
+    with st.expander(f"ALERTS ({active} ACTIVE)", expanded=False):
+        recent = sorted((a for engine in engines for a in engine.recent), key=lambda a: a.at, reverse=True)
+        if recent:
+            st.dataframe(pd.DataFrame([
+                {'TIME': a.at.strftime('%Y-%m-%d %H:%M:%S'), 'SEVERITY': a.severity.upper(), 'RULE': a.rule,
+                 'STATE': a.state.upper(), 'SUBJECT': f"{a.scope} {a.subject}",
+                 'CONDITION': f"{a.metric} {a.value if isinstance(a.value, str) else f'{a.value:.2f}'} {a.op} {a.threshold}"}
+                for a in recent
+            ]), use_container_width=True, hide_index=True)
+        else:
+            st.write("No alerts raised yet.")
+
+def diagnostics_panel():
+    """Rolling stage latencies and counters for this server process"""
+    with st.expander("DIAGNOSTICS", expanded=False):
+        stages = METRICS.stages()
+        if stages:
+            st.dataframe(pd.DataFrame([
+                {'STAGE': stage.upper(), 'CALLS': s['count'], 'P50 MS': f"{s['p50_ms']:.2f}",
+                 'P95 MS': f"{s['p95_ms']:.2f}", 'P99 MS': f"{s['p99_ms']:.2f}"}
+                for stage, s in stages.items()
+            ]), use_container_width=True, hide_index=True)
+        elif not INSTRUMENTATION_ENABLED:
+            st.write("Instrumentation is disabled (JAMS_INSTRUMENTATION=0).")
+        else:
+            st.write("No stages timed yet.")
+        
+        counters = METRICS.counters()
+        if counters:
+            st.dataframe(pd.DataFrame([
+                {'COUNTER': name.upper(), 'LABELS': ', '.join(f"{k}={v}" for k, v in labels), 'VALUE': f"{value:,.0f}"}
+                for (name, labels), value in sorted(counters.items())
+            ]), use_container_width=True, hide_index=True)
+        
+        st.download_button("EXPORT METRICS", METRICS.prometheus_text(), file_name="jams_metrics.prom", mime="text/plain")
+
+def data_age_label(age):
+    """Sessions since a ticker's last close, as shown next to stale tickers"""
+    if age is None or np.isnan(age):
+        return "NO DATA"
+    return f"{int(age)} SESSION{'S' if age != 1 else ''} OLD"
+
 def main():
     # Header
     st.markdown("# JAMS CAPITAL MARKET RISK TERMINAL")
     
     # Control panel
     col1, col2, col3, col4 = st.columns(4)
+    with col2:
+        auto_refresh = st.checkbox("AUTO REFRESH", value=True)
+        interval = st.selectbox("INTERVAL", INTERVALS, index=INTERVALS.index(DEFAULT_INTERVAL))
     with col1:
         if st.button("REFRESH DATA"):
+            # Joins any refresh already in flight rather than starting a second download
+            get_market_service(interval).refresh()
             st.rerun()
-    with col2:
-        auto_refresh = st.checkbox("AUTO REFRESH", value=True)
     with col3:
         st.write(f"LAST UPDATE: {datetime.now().strftime('%H:%M:%S')}")
     with col4:
         st.write("FEED STATUS: LIVE")
+        cost = get_market_service(interval).refresh_cost()
+        st.write(f"REFRESH COST: {cost['last_ms']:.0f}MS (AVG {cost['mean_ms']:.0f}MS)")
     
     st.markdown("---")
     
     # Initialize and fetch data
-    dashboard = MarketRiskDashboard()
+    dashboard = MarketRiskDashboard(interval)
     current_data, historical_data = dashboard.fetch_market_data()
     
     if current_data and historical_data is not None:
-        risk_score, detailed_metrics = dashboard.calculate_risk_metrics(current_data, historical_data)
+        risk_score, detailed_metrics = dashboard.snapshot_scores()
         
         # Market summary at the top
         summary = dashboard.generate_market_summary(risk_score, detailed_metrics, current_data)
@@ -881,64 +661,7 @@ def main():
         st.markdown("---")
         
         # Portfolio Input and Hedge Strategy
-        st.markdown("## PORTFOLIO HEDGING STRATEGY")
-        
-        col1, col2 = st.columns([1, 2])
-        
-        with col1:
-            st.markdown("### PORTFOLIO INPUT")
-            portfolio_dollar_beta = st.number_input(
-                "Enter Portfolio Dollar Beta ($)",
-                min_value=0.0,
-                value=100000.0,
-                step=10000.0,
-                format="%.0f",
-                help="Total dollar beta exposure of your portfolio (sum of position size × beta for each holding)"
-            )
-            
-            if portfolio_dollar_beta > 0:
-                hedge_amount = portfolio_dollar_beta * (detailed_metrics.get('hedge_percentage', 0) / 100)
-                st.markdown(f"**Portfolio Dollar Beta:** ${portfolio_dollar_beta:,.0f}")
-                st.markdown(f"**Recommended Hedge %:** {detailed_metrics.get('hedge_percentage', 0):.1f}%")
-                st.markdown(f"**Dollar Amount to Hedge:** ${hedge_amount:,.0f}")
-        
-        with col2:
-            st.markdown("### HEDGE EXECUTION STRATEGY")
-            
-            if portfolio_dollar_beta > 0:
-                hedge_strategies = dashboard.generate_hedge_strategy(
-                    portfolio_dollar_beta, 
-                    detailed_metrics.get('hedge_percentage', 0), 
-                    current_data['vix_price'], 
-                    risk_score
-                )
-                
-                if isinstance(hedge_strategies, str):
-                    st.write(hedge_strategies)
-                else:
-                    for i, strategy in enumerate(hedge_strategies):
-                        st.markdown(f"""
-                        <div class="hedge-strategy">
-                            <strong>STRATEGY {i+1}: {strategy['instrument']}</strong><br/>
-                            <strong>ACTION:</strong> {strategy['action']}<br/>
-                            <strong>AMOUNT:</strong> {strategy['amount']}<br/>
-                            <strong>COST:</strong> {strategy['cost']}<br/>
-                            <strong>RATIONALE:</strong> {strategy['rationale']}
-                        </div>
-                        """, unsafe_allow_html=True)
-                    
-                    # Add execution notes
-                    st.markdown("""
-                    <div class="hedge-recommendation">
-                        <strong>EXECUTION NOTES:</strong><br/>
-                        • Execute hedges in order of priority during market hours<br/>
-                        • Monitor risk score changes for dynamic adjustments<br/>
-                        • Consider liquidity and bid-ask spreads for options<br/>
-                        • Scale into positions over 2-3 trading sessions for large amounts
-                    </div>
-                    """, unsafe_allow_html=True)
-            else:
-                st.write("Enter your portfolio dollar beta to see specific hedge recommendations.")
+        portfolio_panel(dashboard, current_data, historical_data, risk_score, detailed_metrics)
         
         st.markdown("---")
         
@@ -964,6 +687,13 @@ def main():
             st.markdown(f'<div class="risk-score-large" style="color: {risk_color};">{risk_score}</div>', unsafe_allow_html=True)
             st.markdown(f"**STATUS:** {risk_level}")
             st.markdown(f"**RECOMMENDED HEDGE:** {detailed_metrics.get('hedge_percentage', 0):.1f}%")
+            probabilities = detailed_metrics.get('regime_probabilities')
+            if probabilities:
+                regime = detailed_metrics['regime']
+                st.markdown(f"**REGIME:** {regime.replace('_', '-').upper()} ({probabilities[regime]:.0%})")
+                st.caption(" | ".join(f"{r.replace('_', '-').upper()} {p:.0%}" for r, p in probabilities.items()))
+            elif 'regime' in detailed_metrics:
+                st.markdown("**REGIME:** FITTING MODEL...")
         
         with col2:
             st.markdown("### CREDIT RISK")
@@ -989,6 +719,12 @@ def main():
             st.markdown(f"**PERCENTILE:** {detailed_metrics.get('vix_percentile', 0):.0f}th")
             st.markdown(f"**5D CHANGE:** {detailed_metrics.get('vix_5d_change', 0):.1f}%")
         
+        stale = detailed_metrics.get('stale_tickers', [])
+        if stale:
+            ages = current_data.get('data_age', {})
+            st.warning("STALE DATA: " + ", ".join(f"{t} {data_age_label(ages.get(t))}" for t in stale)
+                       + f" - last closes carried up to {FILL_SESSIONS} sessions; older gaps leave signals unscored")
+        
         st.markdown("---")
         
         # VIX Outlook
@@ -999,6 +735,7 @@ def main():
         
         # Charts with analysis
         st.markdown("## MARKET ANALYSIS CHARTS")
+        chart_range = st.radio("CHART RANGE", list(CHART_RANGES), horizontal=True, label_visibility="collapsed")
         
         # Add info tooltips before the chart
         st.markdown("""
@@ -1019,8 +756,10 @@ def main():
         </div>
         """, unsafe_allow_html=True)
         
-        chart_fig = dashboard.create_charts(historical_data, current_data, risk_score)
-        st.plotly_chart(chart_fig, use_container_width=True)
+        count('cache_requests', cache='chart_figure')
+        chart_fig = chart_figure(interval, dashboard.snapshot_version, chart_range, risk_score, historical_data, current_data)
+        with timer('plotly_chart'):
+            st.plotly_chart(chart_fig, use_container_width=True)
         
         # Chart analysis summaries
         col1, col2 = st.columns(2)
@@ -1045,61 +784,26 @@ def main():
             st.markdown("### HEDGE PERCENTAGE MATRIX")
             st.write("*Recommended hedge percentage by VIX level and Risk Score*")
             
-            # Create professional table HTML
-            hedge_html = """
-            <table class="sensitivity-table">
-                <tr>
-                    <th rowspan="2">VIX</th>
-                    <th colspan="6">RISK SCORE</th>
-                </tr>
-                <tr>
-                    <th>0</th><th>2</th><th>4</th><th>6</th><th>8</th><th>10</th>
-                </tr>
-            """
-            
-            vix_levels = [10, 12, 15, 18, 20, 25, 30, 35, 40, 50]
-            for vix in vix_levels:
-                hedge_html += f"<tr><td>{vix}</td>"
-                for score in [0, 2, 4, 6, 8, 10]:
-                    hedge = dashboard.calculate_hedge_percentage(score, 50, vix)
-                    if abs(vix - current_data['vix_price']) < 3 and score == risk_score:
-                        hedge_html += f"<td class='highlighted'>{hedge:.1f}</td>"
-                    else:
-                        hedge_html += f"<td>{hedge:.1f}</td>"
-                hedge_html += "</tr>"
-            
-            hedge_html += "</table>"
-            st.markdown(hedge_html, unsafe_allow_html=True)
+            st.markdown(sensitivity_table(current_data['vix_price'], risk_score), unsafe_allow_html=True)
         
         with col2:
             st.markdown("### PORTFOLIO IMPACT ANALYSIS")
-            st.write("*Expected net portfolio impact percentage after hedging*")
-            
-            impact_html = """
-            <table class="sensitivity-table">
-                <tr>
-                    <th rowspan="2">VIX</th>
-                    <th colspan="6">RISK SCORE</th>
-                </tr>
-                <tr>
-                    <th>0</th><th>2</th><th>4</th><th>6</th><th>8</th><th>10</th>
-                </tr>
-            """
-            
-            for vix in vix_levels:
-                impact_html += f"<tr><td>{vix}</td>"
-                for score in [0, 2, 4, 6, 8, 10]:
-                    hedge = dashboard.calculate_hedge_percentage(score, 50, vix) / 100
-                    expected_decline = -(vix * 0.4)
-                    net_impact = expected_decline * (1 - hedge)
-                    if abs(vix - current_data['vix_price']) < 3 and score == risk_score:
-                        impact_html += f"<td class='highlighted'>{net_impact:.2f}</td>"
-                    else:
-                        impact_html += f"<td>{net_impact:.2f}</td>"
-                impact_html += "</tr>"
+            st.write("*Net P&L (% of portfolio dollar beta) with the recommended hedge package, by SPY move and VIX shock*")
             
-            impact_html += "</table>"
-            st.markdown(impact_html, unsafe_allow_html=True)
+            count('cache_requests', cache='scenario_chart')
+            st.plotly_chart(scenario_chart(instrument_prices(current_data), risk_score,
+                                           detailed_metrics.get('vix_percentile', 50)), use_container_width=True)
+        
+        if st.checkbox("SHOW FULL HEDGE SURFACE", value=False):
+            st.plotly_chart(hedge_surface_chart(), use_container_width=True)
+        
+        st.markdown("---")
+        
+        # Look-back windows
+        st.markdown("## LOOK-BACK WINDOWS")
+        st.write("*Percent change and percentile rank of each signal over every configured look-back (sessions)*")
+        st.dataframe(lookback_snapshot(interval, dashboard.snapshot_version, historical_data),
+                     use_container_width=True, hide_index=True)
         
         st.markdown("---")
         
@@ -1142,13 +846,17 @@ def main():
             st.markdown("**CURRENCIES**")
             st.dataframe(currency_data, use_container_width=True, hide_index=True)
         
-        # Auto-refresh
+        # Auto-refresh: re-render only when the shared refresher publishes a new snapshot
         if auto_refresh:
-            time.sleep(30)
-            st.rerun()
+            snapshot_watch(interval, dashboard.snapshot_version)
             
     else:
         st.error("DATA FEED OFFLINE - Unable to connect to market data sources")
+    
+    st.markdown("---")
+    universe_panel()
+    alerts_panel()
+    diagnostics_panel()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,61 @@
+import numpy as np
+
+# Points per trace above which chart series are decimated server-side
+MAX_CHART_POINTS = 500
+
+
+def min_max_indices(values, buckets):
+    """Positions of the min and max of each of `buckets` equal slices, in order.
+
+    Keeps every spike, so it suits series read for their extremes (VIX, the risk score).
+    """
+    n = len(values)
+    if n <= 2 * buckets:
+        return np.arange(n)
+    size = -(-n // buckets)
+    padded = np.full(size * buckets, np.nan)
+    padded[:n] = values
+    grid = padded.reshape(buckets, size)
+    filled = ~np.isnan(grid).all(axis=1)
+    starts = np.arange(buckets)[filled] * size
+    lo = starts + np.nanargmin(grid[filled], axis=1)
+    hi = starts + np.nanargmax(grid[filled], axis=1)
+    return np.unique(np.concatenate([[0, n - 1], lo, hi]))
+
+
+def lttb_indices(values, threshold):
+    """Largest-Triangle-Three-Buckets: `threshold` positions that preserve the visual shape"""
+    n = len(values)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    y = np.asarray(values, dtype=float)
+    x = np.arange(n, dtype=float)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    # Average point of every bucket, used as the third corner of the triangle
+    counts = np.diff(edges)
+    avg_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts
+    avg_y = np.add.reduceat(np.nan_to_num(y[1:n - 1]), edges[:-1] - 1) / counts
+    avg_x = np.append(avg_x[1:], n - 1)
+    avg_y = np.append(avg_y[1:], y[-1])
+
+    selected = np.empty(threshold, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for b in range(threshold - 2):
+        lo, hi = edges[b], edges[b + 1]
+        area = np.abs((x[a] - avg_x[b]) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y[b] - y[a]))
+        a = lo + int(np.nanargmax(area)) if not np.isnan(area).all() else lo
+        selected[b + 1] = a
+    return selected
+
+
+def decimate(series, max_points=MAX_CHART_POINTS, method='lttb'):
+    """Series reduced to about `max_points` points with LTTB or per-bucket min/max"""
+    if len(series) <= max_points:
+        return series
+    values = series.to_numpy(dtype=float)
+    if method == 'minmax':
+        positions = min_max_indices(values, max_points // 2)
+    else:
+        positions = lttb_indices(values, max_points)
+    return series.iloc[positions]
@@ -0,0 +1,113 @@
+import io
+import os
+
+import numpy as np
+import pandas as pd
+
+from pricing import shares
+from risk_engine import hedge_percentage
+
+BATCH_COLUMNS = [
+    'portfolio_id', 'dollar_beta', 'hedge_cap', 'hedge_pct', 'hedge_amount', 'strategy',
+    'sh_shares', 'sh_cost', 'put_contracts', 'put_cost', 'call_contracts', 'call_premium'
+]
+
+# Accepted spellings of the input columns
+_ALIASES = {'id': 'portfolio_id', 'portfolio': 'portfolio_id', 'beta': 'dollar_beta',
+            'portfolio_dollar_beta': 'dollar_beta', 'cap': 'hedge_cap', 'max_hedge_pct': 'hedge_cap'}
+
+
+def read_table(data, name, aliases=None):
+    """CSV or Parquet bytes (chosen by file name) as a DataFrame with lower-case, aliased columns"""
+    buffer = io.BytesIO(data)
+    if os.path.splitext(name)[1].lower() in ('.parquet', '.pq'):
+        frame = pd.read_parquet(buffer)
+    else:
+        frame = pd.read_csv(buffer)
+    aliases = aliases or {}
+    frame.columns = [aliases.get(str(c).strip().lower(), str(c).strip().lower()) for c in frame.columns]
+    return frame
+
+
+def read_portfolios(data, name):
+    """Portfolio table from CSV or Parquet bytes with normalized columns"""
+    frame = read_table(data, name, _ALIASES)
+    if 'dollar_beta' not in frame.columns:
+        raise ValueError("portfolio file needs a dollar_beta column")
+    if 'portfolio_id' not in frame.columns:
+        frame['portfolio_id'] = np.arange(1, len(frame) + 1)
+    return frame
+
+
+def write_portfolios(frame, fmt='csv'):
+    """Batch results as CSV or Parquet bytes"""
+    if fmt == 'parquet':
+        buffer = io.BytesIO()
+        frame.to_parquet(buffer, index=False)
+        return buffer.getvalue()
+    return frame.to_csv(index=False).encode()
+
+
+def batch_hedge(portfolios, risk_score, vix_percentile, current_vix, prices):
+    """Hedge sizing for every portfolio in one vectorized pass.
+
+    portfolios needs portfolio_id and dollar_beta columns; an optional hedge_cap column
+    caps each portfolio's hedge percentage and must lie in 0-100 where set. Instrument splits follow generate_hedge_strategy:
+    - score <= 3: all SH
+    - score <= 6: 75% SH, 25% puts
+    - higher with VIX > 25: 60% SH and calls sold against 40%
+    - higher otherwise: 70% puts, 30% SH
+    Units are sized with the SH price and modelled option premiums in `prices`
+    (pricing.instrument_prices).
+    """
+    dollar_beta = pd.to_numeric(portfolios['dollar_beta'], errors='coerce').to_numpy(dtype=float)
+    hedge_pct = np.broadcast_to(hedge_percentage(risk_score, vix_percentile, current_vix), dollar_beta.shape)
+    if 'hedge_cap' in portfolios:
+        cap = pd.to_numeric(portfolios['hedge_cap'], errors='coerce').to_numpy(dtype=float)
+        out_of_range = (cap < 0) | (cap > 100)
+        if out_of_range.any():
+            ids = ', '.join(str(i) for i in portfolios['portfolio_id'].to_numpy()[out_of_range][:5])
+            raise ValueError(f"hedge_cap must be between 0 and 100 (portfolio {ids})")
+        hedge_pct = np.where(np.isnan(cap), hedge_pct, np.minimum(hedge_pct, cap))
+    else:
+        cap = np.full(dollar_beta.shape, np.nan)
+    valid = dollar_beta > 0
+    hedge_amount = np.where(valid, dollar_beta * (hedge_pct / 100), 0.0)
+
+    risk_score = np.broadcast_to(np.asarray(risk_score, dtype=float), dollar_beta.shape)
+    current_vix = np.broadcast_to(np.asarray(current_vix, dtype=float), dollar_beta.shape)
+    low = risk_score <= 3
+    moderate = ~low & (risk_score <= 6)
+    high_vix = ~low & ~moderate & (current_vix > 25)
+    sh_share = np.select([low, moderate, high_vix], [1.0, 0.75, 0.6], 0.3)
+    put_share = np.select([low, moderate, high_vix], [0.0, 0.25, 0.0], 0.7)
+    call_share = np.where(high_vix, 0.4, 0.0)
+
+    sh_cost = hedge_amount * sh_share
+    put_allocation = hedge_amount * put_share
+    call_premium = hedge_amount * call_share
+    sh_shares = shares(sh_cost, prices.sh_price)
+    put_contracts = shares(put_allocation, prices.put_premium)
+    call_contracts = shares(call_premium, prices.call_premium)
+    # The moderate tier drops a put leg too small for one contract, as the single-portfolio strategy does
+    put_cost = np.where(moderate & (put_contracts == 0), 0.0, put_allocation)
+
+    strategy = np.select(
+        [~valid, hedge_amount <= 0, low, moderate, high_vix],
+        ['INVALID DOLLAR BETA', 'NO HEDGE', 'SH', 'SH + PUTS', 'SH + SHORT CALLS'],
+        'PUTS + SH'
+    )
+    return pd.DataFrame({
+        'portfolio_id': portfolios['portfolio_id'].to_numpy(),
+        'dollar_beta': dollar_beta,
+        'hedge_cap': cap,
+        'hedge_pct': np.where(valid, hedge_pct, 0.0),
+        'hedge_amount': hedge_amount,
+        'strategy': strategy,
+        'sh_shares': sh_shares,
+        'sh_cost': sh_cost,
+        'put_contracts': put_contracts,
+        'put_cost': put_cost,
+        'call_contracts': call_contracts,
+        'call_premium': call_premium,
+    }, columns=BATCH_COLUMNS)
@@ -0,0 +1,162 @@
+"""Per-stage latency and counters for the terminal, exportable as Prometheus text.
+
+JAMS_INSTRUMENTATION=0 turns every hook into a no-op: `timed` hands back the undecorated
+function and `timer` a shared null context, so disabled instrumentation costs one flag check.
+"""
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import nullcontext
+from functools import wraps
+
+import numpy as np
+
+ENABLED = os.environ.get('JAMS_INSTRUMENTATION', '1') != '0'
+
+# JAMS_METRICS_FILE=<path> rewrites a Prometheus text file after every background refresh
+METRICS_FILE = os.environ.get('JAMS_METRICS_FILE')
+
+# Latency samples kept per stage for the rolling percentiles
+WINDOW = 1024
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+_NULL = nullcontext()
+
+
+class Metrics:
+    """Rolling stage latencies and monotonic counters, safe to share between threads"""
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._totals = defaultdict(lambda: [0, 0.0])  # stage -> [count, seconds]
+        self._counters = defaultdict(float)
+        self._caches = {}
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            self._samples[stage].append(seconds)
+            total = self._totals[stage]
+            total[0] += 1
+            total[1] += seconds
+
+    def count(self, name, value=1, **labels):
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] += value
+
+    def register_cache(self, name, cache_info):
+        """Report hits and misses of an lru_cache-style cache_info() callable"""
+        self._caches[name] = cache_info
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+            self._counters.clear()
+
+    def stages(self):
+        """{stage: {'count', 'p50_ms', 'p95_ms', 'p99_ms'}} over the rolling window"""
+        with self._lock:
+            samples = {stage: np.array(values) for stage, values in self._samples.items()}
+            totals = {stage: tuple(total) for stage, total in self._totals.items()}
+        summary = {}
+        for stage, values in sorted(samples.items()):
+            p50, p95, p99 = np.quantile(values, QUANTILES) * 1000
+            summary[stage] = {'count': totals[stage][0], 'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99}
+        return summary
+
+    def counters(self):
+        """{(name, labels): value}, including hits and misses of registered caches"""
+        with self._lock:
+            counters = dict(self._counters)
+        # Caches counted by hand record requests and misses; hits are the difference
+        for (name, labels), value in list(counters.items()):
+            if name == 'cache_requests':
+                counters[('cache_hits', labels)] = value - counters.get(('cache_misses', labels), 0)
+        for cache, cache_info in self._caches.items():
+            info = cache_info()
+            counters[('cache_hits', (('cache', cache),))] = info.hits
+            counters[('cache_misses', (('cache', cache),))] = info.misses
+        return counters
+
+    def prometheus_text(self, prefix='jams'):
+        """Latency summaries and counters in the Prometheus text exposition format"""
+        with self._lock:
+            samples = {stage: np.array(values) for stage, values in self._samples.items()}
+            totals = {stage: tuple(total) for stage, total in self._totals.items()}
+        lines = [f'# TYPE {prefix}_stage_seconds summary']
+        for stage, values in sorted(samples.items()):
+            for q, value in zip(QUANTILES, np.quantile(values, QUANTILES)):
+                lines.append(f'{prefix}_stage_seconds{{stage="{stage}",quantile="{q}"}} {value:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {totals[stage][0]}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {totals[stage][1]:.6f}')
+
+        typed = set()
+        for (name, labels), value in sorted(self.counters().items()):
+            if name not in typed:
+                lines.append(f'# TYPE {prefix}_{name}_total counter')
+                typed.add(name)
+            label_text = ','.join(f'{k}="{v}"' for k, v in labels)
+            lines.append(f'{prefix}_{name}_total{{{label_text}}} {value:g}' if label_text
+                         else f'{prefix}_{name}_total {value:g}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Atomically rewrite a text file for a node-exporter style textfile collector"""
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp, path)
+
+
+METRICS = Metrics()
+
+
+class _Timer:
+    __slots__ = ('stage', 'start')
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        METRICS.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+def timer(stage):
+    """Context manager recording the wall-clock time of a block under `stage`"""
+    return _Timer(stage) if ENABLED else _NULL
+
+
+def timed(stage):
+    """Decorator recording every call's wall-clock time under `stage`"""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                METRICS.observe(stage, time.perf_counter() - start)
+        return wrapper
+    return decorate
+
+
+def observe(stage, seconds):
+    if ENABLED:
+        METRICS.observe(stage, seconds)
+
+
+def count(name, value=1, **labels):
+    if ENABLED:
+        METRICS.count(name, value, **labels)
@@ -0,0 +1,163 @@
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from types import MappingProxyType
+
+import instrumentation
+from alignment import align_prices, latest_age
+from price_store import HISTORY_DAYS, INTRADAY_SESSIONS, daily_bars, recent_history, sync_prices
+from pricing import INSTRUMENT_TICKERS
+from risk_engine import TICKERS
+
+# Seconds between background refreshes and between session polls for a new snapshot
+REFRESH_INTERVAL = float(os.environ.get('JAMS_REFRESH_SECONDS', 30))
+
+# Immutable view of the market shared by every session; version only moves when the data changes
+MarketSnapshot = namedtuple('MarketSnapshot', ['version', 'current_data', 'historical_data', 'fetched_at'])
+
+# Risk tickers and hedge instruments share one bulk request per refresh
+SYNC_TICKERS = TICKERS + INSTRUMENT_TICKERS
+
+PRICE_KEYS = {t: f"{t.lstrip('^').lower()}_price" for t in SYNC_TICKERS}
+
+
+def load_market_data(store, download, offline=False, intraday_store=None, days=HISTORY_DAYS):
+    """Sync the price store and build (current_data, historical_data) from `days` of daily bars"""
+    if intraday_store is None:
+        daily = sync_prices(store, SYNC_TICKERS, download, offline=offline, days=days)
+    else:
+        # Intraday mode: recent sessions are resampled from intraday bars instead of
+        # being downloaded again at daily resolution
+        intraday = sync_prices(intraday_store, SYNC_TICKERS, download, offline=offline).dropna(how='all')
+        stored = store.read(TICKERS).dropna(how='all')
+        if (intraday.empty or stored.empty or stored.index[-1] < intraday.index[0].normalize()
+                or store.history_days() < days):
+            # Daily history has a gap before the intraday window or is too short; close it once
+            sync_prices(store, SYNC_TICKERS, download, offline=offline, days=days)
+        # Only the sessions from the daily store's last close on can still change
+        last = store.last_timestamp(SYNC_TICKERS)
+        store.append(daily_bars(intraday if last is None else intraday[intraday.index >= last]))
+        daily = store.read(SYNC_TICKERS)
+        # Older intraday bars are already in the daily store as closes
+        sessions = intraday.index.normalize().unique()
+        if len(sessions) > INTRADAY_SESSIONS:
+            intraday_store.drop_before(sessions[-INTRADAY_SESSIONS])
+
+    data = recent_history(daily, days)
+    if data is None or data.empty:
+        raise ValueError("no market data available")
+
+    # One session calendar for every ticker; a late or missing print is carried a few sessions
+    aligned = align_prices(data[SYNC_TICKERS])
+    data = aligned.prices
+    latest = data.iloc[-1]
+    current_data = {PRICE_KEYS[t]: latest[t] for t in SYNC_TICKERS}
+    current_data['data_age'] = latest_age(aligned).to_dict()
+    current_data['last_valid'] = aligned.last_valid.to_dict()
+    current_data['timestamp'] = datetime.now()
+    return current_data, data
+
+
+class MarketDataService:
+    """Background refresher publishing one shared market snapshot per process"""
+
+    def __init__(self, fetch, interval=REFRESH_INTERVAL, on_publish=None):
+        self._fetch = fetch
+        self._on_publish = on_publish
+        self.interval = interval
+        self.last_error = None
+        self.last_refresh_seconds = None
+        self.refresh_count = 0
+        self.total_refresh_seconds = 0.0
+        self._snapshot = None
+        self._refreshing = False
+        self._generation = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start the refresher thread if it is not already running"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='market-data-refresher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh()
+            self._stop.wait(self.interval)
+
+    def snapshot(self):
+        """Latest snapshot, fetching synchronously only if nothing has been published yet"""
+        snapshot = self._snapshot
+        return snapshot if snapshot is not None else self.refresh()
+
+    def refresh(self):
+        """Fetch now; callers arriving while a fetch is in flight wait for it instead of starting another"""
+        with self._cond:
+            if self._refreshing:
+                generation = self._generation
+                while self._generation == generation:
+                    self._cond.wait()
+                return self._snapshot
+            self._refreshing = True
+
+        start = time.perf_counter()
+        try:
+            current_data, historical_data = self._fetch()
+            error = None
+        except Exception as e:
+            error = e
+
+        with self._cond:
+            previous = self._snapshot
+            if error is None:
+                self._publish(current_data, historical_data)
+            self.last_error = error
+            self.last_refresh_seconds = time.perf_counter() - start
+            self.refresh_count += 1
+            self.total_refresh_seconds += self.last_refresh_seconds
+            instrumentation.observe('refresh', self.last_refresh_seconds)
+            if error is not None:
+                instrumentation.count('refresh_errors')
+            self._refreshing = False
+            self._generation += 1
+            self._cond.notify_all()
+            snapshot = self._snapshot
+        if snapshot is not previous and self._on_publish is not None:
+            # Outside the lock: waiting sessions are already released with the new snapshot
+            try:
+                self._on_publish(snapshot)
+            except Exception:
+                instrumentation.count('publish_errors')
+        if instrumentation.ENABLED and instrumentation.METRICS_FILE:
+            instrumentation.METRICS.write_prometheus(instrumentation.METRICS_FILE)
+        return snapshot
+
+    def refresh_cost(self):
+        """Server-side cost of background refreshes, in milliseconds"""
+        count = self.refresh_count
+        return {
+            'refreshes': count,
+            'last_ms': (self.last_refresh_seconds or 0.0) * 1000,
+            'mean_ms': (self.total_refresh_seconds / count * 1000) if count else 0.0,
+            'version': self._snapshot.version if self._snapshot is not None else 0
+        }
+
+    def _publish(self, current_data, historical_data):
+        previous = self._snapshot
+        if previous is not None and previous.historical_data.equals(historical_data):
+            return
+        self._snapshot = MarketSnapshot(
+            version=(previous.version + 1) if previous is not None else 1,
+            current_data=MappingProxyType(dict(current_data)),
+            historical_data=historical_data,
+            fetched_at=datetime.now()
+        )
@@ -0,0 +1,170 @@
+"""Monte Carlo tail risk of the portfolio with and without the recommended hedge.
+
+Usage:  python montecarlo.py [--paths 100000] [--days 20] [--workers 4] [--seed 0] [--dollar-beta 1000000]
+
+Paths are a regime-conditioned bootstrap of whole historical sessions: every sampled day
+carries the daily log returns of all ten tracked tickers together, so their correlation is
+kept. Days are drawn with a Gaussian kernel weight on how close that day's risk score was
+to the current one, so a stressed tape resamples stressed history. Paths are simulated in
+fixed-size chunks, each seeded from its own child of one SeedSequence, which makes results
+identical for any worker count.
+"""
+import argparse
+import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from price_store import daily_bars
+from risk_engine import TICKERS, compute_score_history
+from scenarios import hedge_package, option_pnl, sh_value
+
+MC_PATHS = int(os.environ.get('JAMS_MC_PATHS', 100_000))
+MC_DAYS = 20
+MC_SEED = 0
+
+# Paths per chunk; also the unit of work handed to each pool worker
+CHUNK_PATHS = 10_000
+
+# Width of the risk score kernel, in score points
+REGIME_BANDWIDTH = 1.5
+
+CONFIDENCE_LEVELS = (0.95, 0.99)
+
+# Horizon totals per path: (paths, tickers) log returns plus the SH growth factor
+Paths = namedtuple('Paths', ['tickers', 'log_returns', 'sh_growth'])
+
+# Loss measures in dollars (losses positive) for each confidence level
+TailRisk = namedtuple('TailRisk', ['paths', 'days', 'effective_days', 'unhedged', 'hedged'])
+
+
+def regime_weights(scores, current_score, bandwidth=REGIME_BANDWIDTH):
+    """Sampling probability of each day from its risk score's distance to the current score"""
+    scores = np.asarray(scores, dtype=float)
+    weights = np.exp(-0.5 * ((scores - current_score) / bandwidth) ** 2)
+    weights[np.isnan(weights)] = 0.0
+    if weights.sum() == 0:
+        weights[:] = 1.0
+    return weights / weights.sum()
+
+
+def session_returns(historical_data):
+    """Daily log returns of the tracked tickers and the risk score known before each day"""
+    closes = daily_bars(historical_data[TICKERS])
+    scores = compute_score_history(historical_data)['risk_score']
+    scores = scores.groupby(scores.index.normalize()).last().reindex(closes.index)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = np.diff(np.log(closes.to_numpy(dtype=float)), axis=0)
+    usable = ~np.isnan(returns).any(axis=1)
+    return returns[usable], scores.to_numpy(dtype=float)[:-1][usable]
+
+
+def _simulate_chunk(returns, sh_log_growth, probabilities, paths, days, seed):
+    rng = np.random.default_rng(seed)
+    draws = rng.choice(len(returns), size=(paths, days), p=probabilities)
+    return returns[draws].sum(axis=1), np.exp(sh_log_growth[draws].sum(axis=1))
+
+
+def simulate_paths(returns, probabilities, paths=MC_PATHS, days=MC_DAYS, seed=MC_SEED, workers=None,
+                   spy_column=TICKERS.index('SPY')):
+    """Bootstrap `paths` paths of `days` sessions; returns horizon totals per path.
+
+    workers > 1 farms the chunks out to a process pool; the output does not depend on it.
+    """
+    spy = np.expm1(returns[:, spy_column])
+    # SH resets daily to minus the SPY return, so its growth compounds along the path
+    sh_log_growth = np.log1p(-spy)
+    sizes = [CHUNK_PATHS] * (paths // CHUNK_PATHS) + ([paths % CHUNK_PATHS] if paths % CHUNK_PATHS else [])
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    jobs = [(returns, sh_log_growth, probabilities, size, days, child) for size, child in zip(sizes, seeds)]
+    if workers and workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            chunks = list(pool.map(_simulate_chunk, *zip(*jobs)))
+    else:
+        chunks = [_simulate_chunk(*job) for job in jobs]
+    return Paths(list(TICKERS), np.concatenate([c[0] for c in chunks]), np.concatenate([c[1] for c in chunks]))
+
+
+def var_es(pnl, levels=CONFIDENCE_LEVELS):
+    """{level: (VaR, expected shortfall)} of a P&L sample, as positive losses"""
+    losses = np.sort(-np.asarray(pnl, dtype=float))
+    result = {}
+    for level in levels:
+        cut = int(np.floor(level * len(losses)))
+        result[level] = (float(losses[min(cut, len(losses) - 1)]), float(losses[cut:].mean()))
+    return result
+
+
+def tail_risk(historical_data, dollar_beta, risk_score, vix_percentile, prices, paths=MC_PATHS, days=MC_DAYS,
+              seed=MC_SEED, workers=None):
+    """VaR and expected shortfall of the portfolio over `days` sessions, unhedged and hedged.
+
+    The portfolio moves with its dollar beta on SPY. The hedge is the whole-unit package
+    generate_hedge_strategy recommends: SH compounds along each path and the options are
+    repriced at the path's final SPY and VIX.
+    """
+    returns, scores = session_returns(historical_data)
+    if len(returns) < 2:
+        raise ValueError("not enough history to simulate")
+    probabilities = regime_weights(scores, risk_score)
+    simulated = simulate_paths(returns, probabilities, paths, days, seed, workers)
+
+    spy_growth = np.exp(simulated.log_returns[:, TICKERS.index('SPY')])
+    vix = prices.vix * np.exp(simulated.log_returns[:, TICKERS.index('^VIX')])
+    unhedged = dollar_beta * (spy_growth - 1)
+
+    package = hedge_package(dollar_beta, risk_score, vix_percentile, prices.vix, prices)
+    horizon_days = days * 365 / 252
+    hedge = (sh_value(package, prices) * (simulated.sh_growth - 1)
+             + option_pnl(package, prices, prices.spy_price * spy_growth, vix, horizon_days))
+    return TailRisk(paths, days, 1 / float((probabilities ** 2).sum()), var_es(unhedged), var_es(unhedged + hedge))
+
+
+def tail_risk_table(risk):
+    """Rows per book with VaR and expected shortfall columns for each confidence level"""
+    rows = {}
+    for book in ('unhedged', 'hedged'):
+        row = {}
+        for level, (var, es) in getattr(risk, book).items():
+            row[f'VaR {level:.0%}'] = var
+            row[f'ES {level:.0%}'] = es
+        rows[book.upper()] = row
+    return pd.DataFrame.from_dict(rows, orient='index')
+
+
+def main():
+    from market_data import load_market_data
+    from price_store import OFFLINE, PRICE_FIXTURE, FixtureFeed, PriceStore, history_days
+    from pricing import instrument_prices
+    from risk_engine import LOOKBACK_WINDOWS, hedge_percentage, latest_metrics
+
+    parser = argparse.ArgumentParser(description="Monte Carlo VaR and expected shortfall, hedged and unhedged")
+    parser.add_argument('--paths', type=int, default=MC_PATHS)
+    parser.add_argument('--days', type=int, default=MC_DAYS)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=MC_SEED)
+    parser.add_argument('--dollar-beta', type=float, default=1_000_000)
+    parser.add_argument('--offline', action='store_true', default=OFFLINE)
+    args = parser.parse_args()
+
+    if PRICE_FIXTURE:
+        download = FixtureFeed(PRICE_FIXTURE).download
+    else:
+        import yfinance as yf
+        download = yf.download
+    current_data, historical_data = load_market_data(PriceStore.for_interval('1d'), download, offline=args.offline,
+                                                     days=history_days(max(LOOKBACK_WINDOWS)))
+    risk_score, metrics = latest_metrics(historical_data)
+    percentile = metrics['vix_percentile']
+    prices = instrument_prices(current_data)
+    risk = tail_risk(historical_data, args.dollar_beta, risk_score, percentile, prices, args.paths, args.days,
+                     args.seed, args.workers)
+    print(f"risk score {risk_score}, hedge {hedge_percentage(risk_score, percentile, prices.vix):.1f}%, "
+          f"{risk.paths:,} paths x {risk.days} sessions, {risk.effective_days:.0f} effective days")
+    print(tail_risk_table(risk).to_string(float_format=lambda v: f"{v:14,.0f}"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""Grid and random search over the risk score parameters, evaluated by backtest.
+
+Usage:  python optimizer.py prices.csv results.jsonl [--mode random] [--samples 2000] [--seed 0]
+
+Results are appended to a JSON-lines file as they complete. Re-running with the same
+file skips every parameter set already recorded, so an interrupted sweep resumes.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backtest import load_prices, run_backtest
+from risk_engine import DEFAULT_PARAMETERS, TICKERS, RiskParameters, compute_signals, score_signals
+
+BUCKET_FIELDS = [f for f in RiskParameters._fields if f.endswith('_buckets')]
+
+# Parameter sets submitted to the pool at a time; bounds memory for very large searches
+BATCH_SIZE = 256
+
+
+def scaled_buckets(buckets, factor):
+    """Bucket thresholds multiplied by `factor`, with the bucket scores unchanged"""
+    return tuple((round(threshold * factor, 6), score) for threshold, score in buckets)
+
+
+def default_space():
+    """Each bucket set scaled 0.6x-1.4x, plus the breadth weight and final scale"""
+    factors = (0.6, 0.8, 1.0, 1.2, 1.4)
+    space = {f: [scaled_buckets(getattr(DEFAULT_PARAMETERS, f), k) for k in factors] for f in BUCKET_FIELDS}
+    space['breadth_weight'] = [0.6, 0.8, 1.0]
+    space['final_scale'] = [0.6, 0.7, 0.8, 0.9, 1.0]
+    return space
+
+
+def grid_candidates(space):
+    """Every combination of the values in the search space"""
+    keys = list(space)
+    for combo in itertools.product(*(space[k] for k in keys)):
+        yield DEFAULT_PARAMETERS._replace(**dict(zip(keys, combo)))
+
+
+def random_candidates(space, samples, seed=0):
+    """`samples` parameter sets drawn from the search space, reproducible for a given seed"""
+    rng = random.Random(seed)
+    for _ in range(samples):
+        yield DEFAULT_PARAMETERS._replace(**{k: rng.choice(v) for k, v in space.items()})
+
+
+def parameter_key(params):
+    return json.dumps(params._asdict(), sort_keys=True)
+
+
+def parameters_from_json(data):
+    """Rebuild RiskParameters from a results row, restoring the bucket tuples"""
+    return RiskParameters(**{
+        k: tuple(tuple(b) for b in v) if k in BUCKET_FIELDS else v for k, v in data.items()
+    })
+
+
+class SharedPrices:
+    """Price matrix and dates copied into shared memory once for every pool worker to attach to"""
+
+    def __init__(self, prices):
+        values = prices[TICKERS].to_numpy(dtype=float)
+        dates = prices.index.to_numpy(dtype='datetime64[ns]').view('int64')
+        self._blocks = []
+        self.spec = (self._share(values), values.shape, self._share(dates), dates.shape)
+
+    def _share(self, array):
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+        self._blocks.append(block)
+        return block.name
+
+    def close(self):
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+
+
+_worker = {}
+
+
+def _init_worker(spec, settings):
+    values_name, values_shape, dates_name, dates_shape = spec
+    # Pool workers share the parent's resource tracker, so attaching does not take ownership
+    values_block = shared_memory.SharedMemory(name=values_name)
+    dates_block = shared_memory.SharedMemory(name=dates_name)
+    values = np.ndarray(values_shape, dtype=float, buffer=values_block.buf)
+    dates = np.ndarray(dates_shape, dtype='int64', buffer=dates_block.buf)
+    prices = pd.DataFrame(values, index=pd.DatetimeIndex(dates.view('datetime64[ns]')), columns=TICKERS, copy=False)
+    # Signals do not depend on the parameters, so each worker computes them once
+    _worker.update(blocks=(values_block, dates_block), prices=prices,
+                   signals=compute_signals(prices), settings=settings)
+
+
+def _evaluate(params):
+    scores = score_signals(_worker['signals'], params)
+    summary = run_backtest(_worker['prices'], scores=scores, **_worker['settings']).summary
+    summary = {k: str(v) if isinstance(v, pd.Timestamp) else v for k, v in summary.items()}
+    return {'key': parameter_key(params), 'params': params._asdict(), **summary}
+
+
+def read_results(path):
+    """Rows recorded in a results file, skipping any line that is not a complete result"""
+    if not os.path.exists(path):
+        return
+    with open(path) as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue  # a line cut short when a previous run was killed
+            if isinstance(row, dict) and 'key' in row:
+                yield row
+
+
+def completed_keys(path):
+    """Keys of parameter sets already recorded in a results file"""
+    return {row['key'] for row in read_results(path)}
+
+
+def drop_partial_line(path):
+    """Cut a trailing line left without its newline by a killed run, so appends start on a fresh line"""
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb+') as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            step = min(4096, position)
+            f.seek(position - step)
+            chunk = f.read(step)
+            if position == end and chunk.endswith(b'\n'):
+                return
+            newline = chunk.rfind(b'\n')
+            if newline >= 0:
+                f.truncate(position - step + newline + 1)
+                return
+            position -= step
+        f.truncate(0)
+
+
+def optimize(prices, candidates, results_path, max_workers=None, **settings):
+    """Evaluate candidate parameter sets across a process pool, appending results as they finish.
+
+    Extra keyword arguments are passed to run_backtest for every candidate. Returns the
+    number of parameter sets evaluated in this run.
+    """
+    done = completed_keys(results_path)
+    drop_partial_line(results_path)
+
+    def pending():
+        for params in candidates:
+            key = parameter_key(params)
+            if key not in done:
+                done.add(key)  # random search can draw the same set twice
+                yield params
+
+    pending = pending()
+    shared = SharedPrices(prices)
+    evaluated = 0
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 initargs=(shared.spec, settings)) as pool, open(results_path, 'a') as out:
+            while True:
+                batch = list(itertools.islice(pending, BATCH_SIZE))
+                if not batch:
+                    break
+                for future in as_completed([pool.submit(_evaluate, p) for p in batch]):
+                    out.write(json.dumps(future.result()) + '\n')
+                    out.flush()
+                    evaluated += 1
+    finally:
+        shared.close()
+    return evaluated
+
+
+def load_results(path, objective='hedged_calmar'):
+    """Results file as a DataFrame, best objective first"""
+    return pd.DataFrame(list(read_results(path))).sort_values(objective, ascending=False, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search score thresholds and weights against history")
+    parser.add_argument('prices', help="CSV of daily closes or a price store directory")
+    parser.add_argument('results', help="JSON-lines results file; existing entries are skipped")
+    parser.add_argument('--mode', choices=['grid', 'random'], default='random')
+    parser.add_argument('--samples', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--start')
+    parser.add_argument('--end')
+    parser.add_argument('--objective', default='hedged_calmar')
+    args = parser.parse_args()
+
+    space = default_space()
+    candidates = grid_candidates(space) if args.mode == 'grid' else random_candidates(space, args.samples, args.seed)
+    evaluated = optimize(load_prices(args.prices), candidates, args.results, args.workers,
+                         start=args.start, end=args.end)
+    best = load_results(args.results, args.objective).iloc[0]
+    print(f"evaluated {evaluated} new parameter sets; best {args.objective}: {best[args.objective]:.4f}")
+    print(json.dumps(best['params'], indent=2))
+
+
+if __name__ == "__main__":
+    main()
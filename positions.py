@@ -0,0 +1,153 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from hedging import read_table
+from price_store import DEFAULT_STORE_PATH, PriceStore, history_days, sync_prices
+
+# Daily returns in each rolling beta regression, and the market the betas are measured against
+BETA_WINDOW = 252
+BETA_MARKET = 'SPY'
+
+# As-of dates kept in the beta cache
+CACHE_DATES = 30
+
+_POSITION_ALIASES = {'symbol': 'ticker', 'qty': 'quantity', 'shares': 'quantity', 'position': 'quantity'}
+
+
+def read_positions(data, name):
+    """Positions from CSV or Parquet bytes, one row per ticker with quantities summed"""
+    frame = read_table(data, name, _POSITION_ALIASES)
+    if not {'ticker', 'quantity'} <= set(frame.columns):
+        raise ValueError("positions file needs ticker and quantity columns")
+    frame['ticker'] = frame['ticker'].astype(str).str.strip().str.upper()
+    frame['quantity'] = pd.to_numeric(frame['quantity'], errors='coerce')
+    return frame.groupby('ticker', sort=False, as_index=False)['quantity'].sum()
+
+
+class BetaEstimator:
+    """Rolling OLS betas of every ticker against the market, updated bar by bar.
+
+    The regression is kept as running window sums per ticker (x, m, xm, mm and the
+    observation count over rows where both returns exist), so a new bar adds one row and
+    drops the oldest for all tickers at once instead of refitting. A full refit from the
+    price history happens when tickers are added or after `window` incremental bars, which
+    also clears accumulated rounding.
+    """
+
+    def __init__(self, window=BETA_WINDOW, market=BETA_MARKET):
+        self.window = window
+        self.market = market
+        self.tickers = []
+        self.asof = None
+        self.cache = OrderedDict()  # (window, asof) -> betas by ticker
+        self._since_fit = 0
+        self._lock = threading.Lock()
+
+    def _fit(self, closes, market):
+        returns = closes[1:] / closes[:-1] - 1
+        market_returns = market[1:] / market[:-1] - 1
+        self._x = np.full((self.window, closes.shape[1]), np.nan)
+        self._m = np.full(self.window, np.nan)
+        tail = min(self.window, len(returns))
+        if tail:
+            self._x[-tail:] = returns[-tail:]
+            self._m[-tail:] = market_returns[-tail:]
+        self._head = 0  # ring position of the oldest row
+        present, x, m = self._terms(self._x, self._m[:, None])
+        self._sums = np.stack([x.sum(0), m.sum(0), (x * m).sum(0), (m * m).sum(0), present.sum(0)])
+        self._since_fit = 0
+
+    @staticmethod
+    def _terms(x, m):
+        present = ~np.isnan(x) & ~np.isnan(m)
+        return present, np.where(present, x, 0.0), np.where(present, np.broadcast_to(m, x.shape), 0.0)
+
+    def _roll(self, x_row, m_value):
+        """Replace the oldest return row with a new one, adjusting the window sums"""
+        old_present, old_x, old_m = self._terms(self._x[self._head], self._m[self._head])
+        new_present, new_x, new_m = self._terms(x_row, m_value)
+        self._sums += (np.stack([new_x, new_m, new_x * new_m, new_m * new_m, new_present])
+                       - np.stack([old_x, old_m, old_x * old_m, old_m * old_m, old_present]))
+        self._x[self._head] = x_row
+        self._m[self._head] = m_value
+        self._head = (self._head + 1) % self.window
+        self._since_fit += 1
+
+    def update(self, prices):
+        """Bring the betas up to the last row of `prices` (dates x tickers, market included)"""
+        with self._lock:
+            return self._update(prices)
+
+    def _update(self, prices):
+        if self.market not in prices.columns or prices.empty:
+            raise ValueError(f"price history needs a {self.market} column")
+        tickers = [t for t in prices.columns if t != self.market]
+        asof = prices.index[-1]
+        new_rows = prices.index > self.asof if self.asof is not None else None
+
+        if (self.asof is None or tickers != self.tickers or self.asof not in prices.index
+                or self._since_fit + int(new_rows.sum()) >= self.window):
+            self.tickers = tickers
+            frame = prices[tickers]
+            self._fit(frame.to_numpy(dtype=float), prices[self.market].to_numpy(dtype=float))
+        else:
+            frame = prices.loc[prices.index >= self.asof]
+            closes = frame[self.tickers].to_numpy(dtype=float)
+            market = frame[self.market].to_numpy(dtype=float)
+            for row in range(1, len(closes)):
+                self._roll(closes[row] / closes[row - 1] - 1, market[row] / market[row - 1] - 1)
+
+        self.asof = asof
+        betas = pd.Series(self.betas(), index=self.tickers, name='beta')
+        self.cache[(self.window, asof)] = betas
+        self.cache.move_to_end((self.window, asof))
+        while len(self.cache) > CACHE_DATES:
+            self.cache.popitem(last=False)
+        return betas
+
+    def betas(self):
+        """Current beta of every tracked ticker; NaN with fewer than half a window of overlap"""
+        x, m, xm, mm, n = self._sums
+        with np.errstate(divide='ignore', invalid='ignore'):
+            beta = (xm - x * m / n) / (mm - m * m / n)
+        beta[n < self.window // 2] = np.nan
+        return beta
+
+    def beta(self, ticker, asof=None):
+        """Cached beta for (ticker, window, asof), latest as-of by default"""
+        betas = self.cache.get((self.window, self.asof if asof is None else asof))
+        return betas.get(ticker, np.nan) if betas is not None else np.nan
+
+
+def positions_store(root=DEFAULT_STORE_PATH):
+    return PriceStore(os.path.join(root, 'positions'))
+
+
+def dollar_beta(positions, estimator, download, store=None, offline=False):
+    """Per-position market value, beta and dollar beta, plus the portfolio total.
+
+    Closes for every position and the market are synced into the positions store in one
+    bulk request; the estimator only processes bars it has not seen. SPY's beta is 1 by
+    definition. Positions without a usable beta keep NaN and are left out of the total.
+    """
+    store = store or positions_store()
+    tickers = list(dict.fromkeys(list(positions['ticker']) + [estimator.market]))
+    prices = sync_prices(store, tickers, download, offline=offline, days=history_days(estimator.window))
+    # Every stored ticker is tracked, so a later book with a subset of names stays incremental
+    betas = estimator.update(store.read()).reindex(positions['ticker'])
+    betas[positions['ticker'].to_numpy() == estimator.market] = 1.0
+
+    price = prices[tickers].ffill().iloc[-1].reindex(positions['ticker']).to_numpy()
+    table = pd.DataFrame({
+        'ticker': positions['ticker'].to_numpy(),
+        'quantity': positions['quantity'].to_numpy(),
+        'price': price,
+        'market_value': positions['quantity'].to_numpy() * price,
+        'beta': betas.to_numpy(),
+    })
+    table['dollar_beta'] = table['market_value'] * table['beta']
+    return table, float(table['dollar_beta'].sum())
@@ -0,0 +1,290 @@
+import json
+import math
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: the in-process lock is all there is
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import count, timer
+
+DEFAULT_STORE_PATH = os.environ.get(
+    'JAMS_PRICE_STORE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'prices')
+)
+
+# JAMS_OFFLINE=1 reads the store without touching the network;
+# JAMS_PRICE_FIXTURE=<csv> replaces yfinance with a local fixture feed
+OFFLINE = os.environ.get('JAMS_OFFLINE', '') == '1'
+PRICE_FIXTURE = os.environ.get('JAMS_PRICE_FIXTURE')
+
+# Calendar days of history handed to the terminal, matching the old period='90d';
+# longer look-backs widen it through history_days
+HISTORY_DAYS = 90
+
+INTERVALS = ['1m', '5m', '15m', '1h', '1d']
+DEFAULT_INTERVAL = os.environ.get('JAMS_INTERVAL', '1d')
+
+# Sessions of intraday bars downloaded into, and kept in, an intraday store; older sessions
+# come from the daily store
+INTRADAY_SESSIONS = 5
+INTRADAY_PERIOD = f'{INTRADAY_SESSIONS}d'
+
+# One write lock per store directory, shared by every PriceStore pointing at it; writers in
+# other processes (the dashboard and the API server) are kept out by a lock file next to it
+_WRITE_LOCKS = {}
+
+
+class PriceStore:
+    """Closes on disk as one aligned (timestamp x ticker) float64 matrix, memory-mapped on read"""
+
+    def __init__(self, path=DEFAULT_STORE_PATH, interval='1d'):
+        self.path = path
+        self.interval = interval
+        self._lock = _WRITE_LOCKS.setdefault(os.path.abspath(path), threading.Lock())
+
+    @classmethod
+    def for_interval(cls, interval, root=DEFAULT_STORE_PATH):
+        """Store for one bar interval; daily bars live at the root, intraday in a subdirectory"""
+        return cls(root if interval == '1d' else os.path.join(root, interval), interval=interval)
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def exists(self):
+        return os.path.exists(self._file('tickers.json'))
+
+    def _load(self):
+        """Load (dates, tickers, closes) with the close matrix memory-mapped"""
+        for _ in range(3):
+            with open(self._file('tickers.json')) as f:
+                tickers = json.load(f)
+            dates = np.load(self._file('dates.npy'))
+            closes = np.load(self._file('close.npy'), mmap_mode='r')
+            # A writer may be mid-swap; retry until the three files agree
+            if closes.shape == (len(dates), len(tickers)):
+                return dates, tickers, closes
+        raise IOError(f"price store at {self.path} is inconsistent")
+
+    def read(self, tickers=None, start=None):
+        """Read stored closes as a DataFrame, optionally limited to tickers and dates >= start"""
+        if not self.exists():
+            return pd.DataFrame(columns=tickers or [], dtype=float)
+
+        dates, stored, closes = self._load()
+        row = 0 if start is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start), 'ns')))
+        columns = stored if tickers is None else [t for t in tickers if t in stored]
+        cols = [stored.index(t) for t in columns]
+        frame = pd.DataFrame(
+            np.array(closes[row:, cols]),
+            index=pd.DatetimeIndex(dates[row:], name='Date'),
+            columns=columns
+        )
+        return frame if tickers is None else frame.reindex(columns=tickers)
+
+    def last_timestamp(self, tickers=None):
+        """Latest date with a stored close for every requested ticker that has any, or None.
+
+        Tickers with no stored close (newly added, or never served by the feed) are left out,
+        so one of them does not force a full re-download of the others.
+        """
+        if not self.exists():
+            return None
+        frame = self.read(tickers).dropna(axis=1, how='all')
+        if frame.empty:
+            return None
+        return min(frame[t].last_valid_index() for t in frame.columns)
+
+    def short_tickers(self, tickers, days):
+        """Requested tickers holding less than `days` calendar days of closes (none at all included).
+
+        A ticker already downloaded with a window of `days` or more is not short, so one whose
+        feed history really is shorter (a recent listing) is not downloaded again every sync.
+        """
+        frame = self.read(tickers)
+        printed = frame.notna().to_numpy()
+        held = printed.any(axis=0)
+        first = frame.index[printed.argmax(axis=0)] if len(frame) else pd.DatetimeIndex([pd.NaT] * len(tickers))
+        last = frame.index[len(frame) - 1 - printed[::-1].argmax(axis=0)] if len(frame) else first
+        # A download of `days` starting on a weekend or holiday spans a few days less
+        span = np.where(held, (last - first).days, -1)
+        filled = self._history().get('filled', {})
+        return [t for t, d in zip(tickers, span) if d < days - 7 and filled.get(t, 0) < days]
+
+    def _history(self):
+        try:
+            with open(self._file('history.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _set_history(self, **values):
+        os.makedirs(self.path, exist_ok=True)
+        history = dict(self._history(), **values)
+        tmp = self._file('history.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(history, f)
+        os.replace(tmp, self._file('history.json'))
+
+    def history_days(self):
+        """Calendar days of history the store has been filled with, 0 if never recorded"""
+        return self._history().get('days', 0)
+
+    def set_history_days(self, days):
+        self._set_history(days=days)
+
+    def set_filled(self, tickers, days):
+        """Record that `tickers` were downloaded with a window of `days`"""
+        filled = self._history().get('filled', {})
+        filled.update({t: max(days, filled.get(t, 0)) for t in tickers})
+        self._set_history(filled=filled)
+
+    def append(self, frame):
+        """Merge new bars into the store; rows for dates already stored are overwritten"""
+        if frame is None or frame.empty:
+            return
+        frame = frame.copy()
+        # Intraday bars keep exchange wall-clock time so sessions group by local date
+        index = pd.DatetimeIndex(frame.index).tz_localize(None)
+        frame.index = index.normalize() if self.interval == '1d' else index
+        frame = frame[~frame.index.duplicated(keep='last')]
+
+        with self._lock, self._file_lock():
+            existing = self.read()
+            if existing.empty:
+                merged = frame.sort_index()
+            else:
+                merged = existing.reindex(
+                    index=existing.index.union(frame.index),
+                    columns=list(existing.columns) + [c for c in frame.columns if c not in existing.columns]
+                )
+                # New values win, but a missing value never erases a stored one
+                merged.update(frame)
+            self._write(merged)
+
+    @contextmanager
+    def _file_lock(self):
+        """Exclusive lock on the store directory across processes, held for a read-merge-write"""
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self.path, exist_ok=True)
+        with open(self._file('.lock'), 'w') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def drop_before(self, start):
+        """Delete the bars stored before `start`; returns the number of rows removed"""
+        with self._lock, self._file_lock():
+            if not self.exists():
+                return 0
+            dates = self._load()[0]
+            row = int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start), 'ns')))
+            if row:
+                self._write(self.read(start=start))
+            return row
+
+    def _write(self, frame):
+        os.makedirs(self.path, exist_ok=True)
+        dates = frame.index.to_numpy(dtype='datetime64[ns]')
+        closes = frame.to_numpy(dtype=float)
+        for name, save in (
+            ('close.npy', lambda f: np.save(f, closes)),
+            ('dates.npy', lambda f: np.save(f, dates)),
+            ('tickers.json', lambda f: f.write(json.dumps(list(frame.columns)).encode())),
+        ):
+            tmp = self._file(name + '.tmp')
+            with open(tmp, 'wb') as f:
+                save(f)
+            os.replace(tmp, self._file(name))
+
+
+class FixtureFeed:
+    """Offline stand-in for yf.download that serves closes from a local CSV"""
+
+    def __init__(self, path):
+        self.prices = pd.read_csv(path, index_col=0, parse_dates=True)
+
+    @classmethod
+    def from_frame(cls, prices):
+        """Feed serving an in-memory close frame instead of a CSV"""
+        feed = cls.__new__(cls)
+        feed.prices = prices
+        return feed
+
+    def download(self, tickers, start=None, period=None, **kwargs):
+        frame = self.prices.reindex(columns=tickers)
+        if start is not None:
+            frame = frame[frame.index >= pd.Timestamp(start)]
+        elif period is not None:
+            frame = frame[frame.index >= frame.index[-1] - pd.Timedelta(period)]
+        return pd.concat({'Close': frame}, axis=1)
+
+
+def history_days(sessions):
+    """Calendar days to download so the longest look-back of `sessions` trading sessions is warm"""
+    return max(HISTORY_DAYS, math.ceil(sessions * 365 / 252) + 14)
+
+
+def sync_prices(store, tickers, download, offline=False, days=HISTORY_DAYS):
+    """Bring the store up to date with only the bars after the last stored date.
+
+    A daily store holding less than `days` of history (an empty one, or one filled before a
+    longer look-back was configured) downloads the whole window once. So does every ticker
+    new to the store or holding less than the window, in its own request next to the
+    incremental one for the rest.
+    """
+    if offline:
+        return store.read(tickers)
+
+    interval = store.interval
+    period = f'{days}d' if interval == '1d' else INTRADAY_PERIOD
+    window = days if interval == '1d' else INTRADAY_SESSIONS
+    backfill = interval == '1d' and store.history_days() < days
+    short = tickers if backfill else store.short_tickers(tickers, window)
+    rest = [t for t in tickers if t not in short]
+    last = store.last_timestamp(rest) if rest else None
+    if last is None:
+        short, rest = tickers, []
+    frames = []
+    with timer('download'):
+        if short:
+            frames.append(download(short, period=period, interval=interval, progress=False)['Close'])
+        if rest:
+            # Re-request the last stored day too: its bars may still have been forming
+            frames.append(download(rest, start=last.strftime('%Y-%m-%d'), interval=interval,
+                                   progress=False)['Close'])
+    data = frames[0] if len(frames) == 1 else pd.concat(frames, axis=1)
+    # The feed does not expose wire bytes; count the decoded close matrix instead
+    count('bytes_downloaded', data.to_numpy().nbytes, interval=interval)
+    with timer('store_append'):
+        store.append(data)
+    if short:
+        store.set_filled(short, window)
+    if backfill:
+        store.set_history_days(days)
+    return store.read(tickers)
+
+
+def daily_bars(frame):
+    """Resample intraday closes into daily bars: each ticker's last print of every session"""
+    if frame.empty:
+        return frame
+    return frame.groupby(frame.index.normalize()).last()
+
+
+def recent_history(frame, days=HISTORY_DAYS):
+    """Trailing calendar-day window of a close frame, with rows missing every ticker dropped"""
+    frame = frame.dropna(how='all')
+    if frame.empty:
+        return frame
+    return frame[frame.index > frame.index[-1] - pd.Timedelta(days=days)]
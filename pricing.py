@@ -0,0 +1,153 @@
+"""Hedge instrument prices: SH from the market snapshot, SPY options from Black-Scholes.
+
+There is no option chain feed, so puts and calls are priced locally with the current VIX as
+a flat implied volatility (VIX is the market's 30-day implied vol of the S&P 500). Every
+function broadcasts over strikes and expiries, so a whole ladder is one numpy pass.
+"""
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Hedge instruments synced with the risk tickers in the same bulk request
+INSTRUMENT_TICKERS = ['SH']
+
+# Annual continuously compounded rate used to discount strikes; JAMS_RISK_FREE_RATE=0.04
+RISK_FREE_RATE = float(os.environ.get('JAMS_RISK_FREE_RATE', 0.04))
+
+CONTRACT_MULTIPLIER = 100
+
+# Contracts the hedge strategy trades: (calendar days to expiry, strike as a fraction of SPY)
+HEDGE_PUT = (30, 0.97)
+HEDGE_CALL = (30, 1.03)
+
+# Put ladder grid, and the SPY decline at expiry each strike's protection is measured at
+LADDER_EXPIRIES = (14, 30, 60, 90)
+LADDER_MONEYNESS = tuple(np.round(np.arange(0.90, 1.005, 0.01), 2))
+PROTECTION_MOVE = 0.10
+
+LADDER_COLUMNS = ['rank', 'expiry_days', 'strike', 'moneyness', 'premium', 'delta', 'protection',
+                  'cost_per_protection']
+
+# Per-share Black-Scholes value and sensitivities: vega per 1.00 of vol, theta per year
+Greeks = namedtuple('Greeks', ['price', 'delta', 'gamma', 'vega', 'theta'])
+
+# Per-share SH price and per-contract option premiums the strategy is sized with
+InstrumentPrices = namedtuple('InstrumentPrices', [
+    'sh_price', 'spy_price', 'vix', 'put_strike', 'put_premium', 'call_strike', 'call_premium', 'expiry_days'
+])
+
+
+def _erfc(x):
+    """Complementary error function, Chebyshev fit with fractional error below 1.2e-7"""
+    z = np.abs(x)
+    t = 1.0 / (1.0 + 0.5 * z)
+    poly = -z * z - 1.26551223 + t * (1.00002368 + t * (0.37409196 + t * (0.09678418 + t * (
+        -0.18628806 + t * (0.27886807 + t * (-1.13520398 + t * (1.48851587 + t * (
+            -0.82215223 + t * 0.17087277))))))))
+    result = t * np.exp(poly)
+    return np.where(x >= 0, result, 2.0 - result)
+
+
+def norm_cdf(x):
+    return 0.5 * _erfc(-np.asarray(x, dtype=float) / np.sqrt(2.0))
+
+
+def norm_pdf(x):
+    return np.exp(-0.5 * x * x) / np.sqrt(2 * np.pi)
+
+
+# Shortest time to expiry priced; an option at or past expiry is worth about its intrinsic value
+MIN_YEARS = 1 / (365 * 24)
+
+
+def black_scholes(spot, strike, years, vol, rate=RISK_FREE_RATE, call=False):
+    """European option Greeks per share; every argument broadcasts, `call` included.
+
+    Calls and puts share d1/d2 and are related by put-call parity, so a mixed book of legs
+    is priced in one pass.
+    """
+    spot, strike, years, vol, call = np.broadcast_arrays(
+        *(np.asarray(v, dtype=float) for v in (spot, strike, years, vol)), np.asarray(call, dtype=bool)
+    )
+    years = np.maximum(years, MIN_YEARS)
+    sqrt_t = np.sqrt(years)
+    vol_t = vol * sqrt_t
+    with np.errstate(divide='ignore', invalid='ignore'):
+        d1 = (np.log(spot / strike) + (rate + 0.5 * vol * vol) * years) / vol_t
+    d2 = d1 - vol_t
+    discounted = strike * np.exp(-rate * years)
+    n_d1, n_d2, pdf_d1 = norm_cdf(d1), norm_cdf(d2), norm_pdf(d1)
+
+    call_price = spot * n_d1 - discounted * n_d2
+    call_theta = -spot * pdf_d1 * vol / (2 * sqrt_t) - rate * discounted * n_d2
+    return Greeks(
+        price=np.where(call, call_price, call_price - spot + discounted),
+        delta=np.where(call, n_d1, n_d1 - 1.0),
+        gamma=pdf_d1 / (spot * vol_t),
+        vega=spot * pdf_d1 * sqrt_t,
+        theta=np.where(call, call_theta, call_theta + rate * discounted),
+    )
+
+
+def _strike(spot, moneyness):
+    """Nearest listed (whole-dollar) SPY strike"""
+    return np.round(spot * np.asarray(moneyness, dtype=float))
+
+
+def instrument_prices(current_data, put=HEDGE_PUT, call=HEDGE_CALL, rate=RISK_FREE_RATE):
+    """SH price and modelled premiums of the hedge put and call, per contract"""
+    spot = float(current_data['spy_price'])
+    vix = float(current_data['vix_price'])
+    (put_days, put_moneyness), (call_days, call_moneyness) = put, call
+    put_strike, call_strike = _strike(spot, put_moneyness), _strike(spot, call_moneyness)
+    put_premium = black_scholes(spot, put_strike, put_days / 365, vix / 100, rate).price
+    call_premium = black_scholes(spot, call_strike, call_days / 365, vix / 100, rate, call=True).price
+    return InstrumentPrices(
+        sh_price=float(current_data.get('sh_price', np.nan)),
+        spy_price=spot,
+        vix=vix,
+        put_strike=float(put_strike),
+        put_premium=float(put_premium) * CONTRACT_MULTIPLIER,
+        call_strike=float(call_strike),
+        call_premium=float(call_premium) * CONTRACT_MULTIPLIER,
+        expiry_days=put_days,
+    )
+
+
+def put_ladder(spot, vix, expiries=LADDER_EXPIRIES, moneyness=LADDER_MONEYNESS, move=PROTECTION_MOVE,
+               rate=RISK_FREE_RATE):
+    """SPY puts across strikes and expiries, ranked by premium per dollar of protection.
+
+    Protection is a contract's payoff if SPY is `move` lower at expiry; strikes that pay
+    nothing at that level have no cost per protection and rank last.
+    """
+    strikes = np.unique(_strike(spot, moneyness))
+    days = np.asarray(expiries, dtype=float)[:, None]
+    greeks = black_scholes(spot, strikes, days / 365, vix / 100, rate)
+    premium, delta = greeks.price * CONTRACT_MULTIPLIER, greeks.delta
+    protection = np.broadcast_to(np.maximum(strikes - spot * (1 - move), 0.0) * CONTRACT_MULTIPLIER, premium.shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.where(protection > 0, premium / protection, np.nan)
+
+    table = pd.DataFrame({
+        'expiry_days': np.broadcast_to(days, premium.shape).ravel().astype(int),
+        'strike': np.broadcast_to(strikes, premium.shape).ravel(),
+        'moneyness': np.broadcast_to(strikes / spot * 100, premium.shape).ravel(),
+        'premium': premium.ravel(),
+        'delta': delta.ravel(),
+        'protection': protection.ravel(),
+        'cost_per_protection': ratio.ravel(),
+    })
+    table = table.sort_values('cost_per_protection', kind='stable', na_position='last', ignore_index=True)
+    table.insert(0, 'rank', np.arange(1, len(table) + 1))
+    return table[LADDER_COLUMNS]
+
+
+def shares(allocation, price):
+    """Whole units an allocation buys, elementwise for an array; none when the price is unavailable"""
+    allocation = np.asarray(allocation, dtype=float)
+    units = np.trunc(allocation / price) if price > 0 else np.zeros(allocation.shape)
+    units = units.astype(np.int64)
+    return units if units.ndim else int(units)
@@ -0,0 +1,258 @@
+"""Market regimes read from the component scores with a three-state Gaussian hidden Markov model.
+
+Usage:  python regime.py [--refit]
+
+The risk score is a fixed weighted sum of the credit, currency, breadth and VIX momentum
+scores. The regime model reads the same four components as a sequence instead: a Gaussian
+HMM fitted to their daily history, whose states are labelled risk-on, transition and stress
+in order of their mean weighted score. Its filtered state probabilities are reported next to
+the score.
+
+Training is batch Baum-Welch over the whole daily store, with the recursions vectorized over
+states, and runs on a background thread. The fitted model is cached in an .npz file, so a
+restart loads it rather than refitting, and it is refitted once the data is RETRAIN_SESSIONS
+past the last training date. Inference is the forward filter: a new bar costs one
+(states x states) product from the last completed bar's probabilities, which are kept.
+"""
+import argparse
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from alignment import align_prices
+from instrumentation import count, timer
+from price_store import PriceStore
+from risk_engine import DEFAULT_PARAMETERS, TICKERS, compute_score_history
+
+# JAMS_REGIME=0 leaves the regime out of the metrics
+ENABLED = os.environ.get('JAMS_REGIME', '1') != '0'
+
+DEFAULT_MODEL_PATH = os.environ.get(
+    'JAMS_REGIME_MODEL',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'regime.npz')
+)
+
+REGIMES = ('risk_on', 'transition', 'stress')
+FEATURES = ('credit_score', 'currency_score', 'breadth_score', 'vix_momentum_score')
+
+# Weights of FEATURES in the risk score; states are ordered by their mean weighted score
+FEATURE_WEIGHTS = np.array([DEFAULT_PARAMETERS.credit_weight, DEFAULT_PARAMETERS.currency_weight,
+                            DEFAULT_PARAMETERS.breadth_weight, DEFAULT_PARAMETERS.vix_momentum_weight])
+
+# Sessions of new data after which the cached model is refitted
+RETRAIN_SESSIONS = 21
+
+# Baum-Welch stops after MAX_ITERATIONS or when the log-likelihood per session gains less than TOLERANCE
+MAX_ITERATIONS = 100
+TOLERANCE = 1e-5
+
+# Component scores move in steps of 0.5 to 1; the floor keeps a state from collapsing onto one
+# value and its probabilities from saturating on a single step
+VARIANCE_FLOOR = 0.25
+
+# Initial probability of staying in a state from one session to the next
+INITIAL_PERSISTENCE = 0.95
+
+RegimeModel = namedtuple('RegimeModel', ['means', 'variances', 'transition', 'initial', 'trained_through',
+                                         'sessions'])
+
+
+def _log_emission(model, x):
+    """Log density of every row of x under every state, 0 (uninformative) for unscored rows"""
+    diff = x[:, None, :] - model.means[None]
+    log_b = -0.5 * ((diff ** 2 / model.variances).sum(axis=2) + np.log(2 * np.pi * model.variances).sum(axis=1))
+    log_b[np.isnan(log_b).any(axis=1)] = 0.0
+    return log_b
+
+
+def _forward(model, log_b, prior):
+    """Scaled forward pass: filtered state probabilities per row and the log-likelihood"""
+    peak = log_b.max(axis=1, keepdims=True)
+    b = np.exp(log_b - peak)
+    alpha = np.empty_like(b)
+    scale = np.empty(len(b))
+    for t in range(len(b)):
+        a = prior * b[t]
+        scale[t] = a.sum()
+        alpha[t] = a / scale[t]
+        prior = alpha[t] @ model.transition
+    return alpha, b, scale, np.log(scale).sum() + peak.sum()
+
+
+def _order_states(model):
+    """Relabel states so they run from the lowest to the highest mean weighted score"""
+    order = np.argsort(model.means @ FEATURE_WEIGHTS, kind='stable')
+    return model._replace(means=model.means[order], variances=model.variances[order],
+                          transition=model.transition[np.ix_(order, order)], initial=model.initial[order])
+
+
+def fit_regimes(components, max_iterations=MAX_ITERATIONS, tolerance=TOLERANCE):
+    """Fit the regime HMM to a (sessions x FEATURES) component score frame; unscored rows are skipped"""
+    components = components[list(FEATURES)].dropna()
+    x = components.to_numpy(dtype=float)
+    k = len(REGIMES)
+    if len(x) < k * RETRAIN_SESSIONS:
+        raise ValueError(f"need at least {k * RETRAIN_SESSIONS} scored sessions to fit regimes")
+
+    # Start from terciles of the weighted score, with sticky transitions
+    groups = np.array_split(np.argsort(x @ FEATURE_WEIGHTS, kind='stable'), k)
+    transition = np.full((k, k), (1 - INITIAL_PERSISTENCE) / (k - 1))
+    np.fill_diagonal(transition, INITIAL_PERSISTENCE)
+    model = RegimeModel(
+        means=np.array([x[g].mean(axis=0) for g in groups]),
+        variances=np.maximum(np.array([x[g].var(axis=0) for g in groups]), VARIANCE_FLOOR),
+        transition=transition, initial=np.full(k, 1 / k),
+        trained_through=components.index[-1], sessions=len(x),
+    )
+
+    previous = -np.inf
+    for _ in range(max_iterations):
+        alpha, b, scale, log_likelihood = _forward(model, _log_emission(model, x), model.initial)
+
+        # Backward pass with the forward scales
+        beta = np.ones_like(alpha)
+        for t in range(len(x) - 2, -1, -1):
+            beta[t] = model.transition @ (b[t + 1] * beta[t + 1]) / scale[t + 1]
+        gamma = alpha * beta
+        gamma /= gamma.sum(axis=1, keepdims=True)
+        xi = (alpha[:-1].T @ (b[1:] * beta[1:] / scale[1:, None])) * model.transition
+
+        weight = gamma.sum(axis=0)[:, None]
+        means = gamma.T @ x / weight
+        model = model._replace(
+            means=means,
+            variances=np.maximum(gamma.T @ x ** 2 / weight - means ** 2, VARIANCE_FLOOR),
+            transition=xi / xi.sum(axis=1, keepdims=True),
+            initial=gamma[0],
+        )
+        if log_likelihood - previous < tolerance * len(x):
+            break
+        previous = log_likelihood
+    return _order_states(model)
+
+
+def save_model(model, path=DEFAULT_MODEL_PATH):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp.npz'
+    np.savez(tmp, means=model.means, variances=model.variances, transition=model.transition,
+             initial=model.initial, trained_through=np.datetime64(model.trained_through, 'ns'),
+             sessions=model.sessions, features=np.array(FEATURES))
+    os.replace(tmp, path)
+
+
+def load_model(path=DEFAULT_MODEL_PATH):
+    """Cached model, or None when there is none or it was fitted to other features"""
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as f:
+        if tuple(f['features']) != FEATURES:
+            return None
+        return RegimeModel(means=f['means'], variances=f['variances'], transition=f['transition'],
+                           initial=f['initial'], trained_through=pd.Timestamp(f['trained_through'][()]),
+                           sessions=int(f['sessions']))
+
+
+def training_components(store=None):
+    """Component scores of every session in the daily price store"""
+    store = store or PriceStore.for_interval('1d')
+    return compute_score_history(align_prices(store.read(TICKERS)).prices)[list(FEATURES)]
+
+
+class RegimeEngine:
+    """Cached regime model and its forward filter, refitted in the background as data arrives"""
+
+    def __init__(self, path=DEFAULT_MODEL_PATH, training_data=training_components):
+        self.path = path
+        self._training_data = training_data
+        self._model = load_model(path)
+        # Bumped on every model swap; scores cached per snapshot version key on it too
+        self.generation = 0
+        self._fitting = None
+        self._fit_for = None
+        self._asof = None
+        self._alpha = None
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        return self._model
+
+    def probabilities(self, history):
+        """{regime: probability} for the last row of a score history, None until a model is fitted.
+
+        Rows up to the second-to-last are filtered once and kept, since only the newest bar
+        can still be revised; a refresh then costs one filter step per bar that arrived.
+        """
+        with self._lock:
+            model = self._model
+            index = history.index
+            if index.empty:
+                return None
+            stale = model is None or len(index) - index.searchsorted(model.trained_through, 'right') >= RETRAIN_SESSIONS
+            if stale and self._fit_for != index[-1]:
+                # One attempt per new bar, so a failing fit is not retried on every refresh
+                self._fit_for = index[-1]
+                self._fit_in_background()
+            if model is None:
+                return None
+
+            with timer('regime_filter'):
+                # Resume after the last kept bar when it is still in the history, else from the start
+                start, prior = 0, model.initial
+                if self._asof is not None:
+                    kept = index.searchsorted(self._asof)
+                    if kept < len(index) - 1 and index[kept] == self._asof:
+                        start, prior = kept + 1, self._alpha @ model.transition
+                columns = history.columns.tolist()
+                x = history.to_numpy(dtype=float)[start:, [columns.index(f) for f in FEATURES]]
+                alpha = _forward(model, _log_emission(model, x), prior)[0]
+                if len(alpha) > 1:
+                    self._asof, self._alpha = index[-2], alpha[-2]
+            return dict(zip(REGIMES, alpha[-1].tolist()))
+
+    def _fit_in_background(self):
+        if self._fitting is None or not self._fitting.is_alive():
+            self._fitting = threading.Thread(target=self.fit, name='regime-fit', daemon=True)
+            self._fitting.start()
+
+    def fit(self):
+        """Refit on the training data, cache the model on disk and restart the filter with it"""
+        try:
+            with timer('regime_fit'):
+                model = fit_regimes(self._training_data())
+            save_model(model, self.path)
+        except Exception as e:
+            self.last_error = e
+            count('regime_fit_errors')
+            return None
+        with self._lock:
+            self._model = model
+            self._asof = self._alpha = None
+            self.generation += 1
+        self.last_error = None
+        return model
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit the regime model to the daily price store and cache it")
+    parser.add_argument('--refit', action='store_true', help="refit even if a cached model exists")
+    args = parser.parse_args()
+
+    engine = RegimeEngine()
+    if engine.model is None or args.refit:
+        if engine.fit() is None:
+            raise SystemExit(f"regime fit failed: {engine.last_error}")
+    model = engine.model
+    print(f"regime model through {model.trained_through:%Y-%m-%d} ({model.sessions} sessions) -> {engine.path}")
+    print(pd.DataFrame(model.means, index=REGIMES, columns=FEATURES).round(2).to_string())
+    history = training_components()
+    probabilities = engine.probabilities(history)
+    print(f"as of {history.index[-1]:%Y-%m-%d}: " + ", ".join(f"{r} {p:.0%}" for r, p in probabilities.items()))
+
+
+if __name__ == "__main__":
+    main()
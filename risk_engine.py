@@ -0,0 +1,380 @@
+import os
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+TICKERS = ['HYG', 'TLT', 'UUP', 'FXY', 'RSP', 'SPY', 'IWM', '^VIX', 'XLU', 'XLK']
+
+# Look-backs are in trading sessions, not rows, so intraday bars compare against
+# the close of the session N days earlier
+CHANGE_SESSIONS = 5
+TREND_SESSIONS = 10
+VIX_PERCENTILE_WINDOW = 30
+
+# Sessions needed before a date can be scored (the 10-session credit trend)
+MIN_HISTORY = TREND_SESSIONS + 1
+
+
+def _lookback_windows(text):
+    """Sorted distinct windows of a comma-separated list; empty entries are skipped"""
+    try:
+        windows = {int(w) for w in text.split(',') if w.strip()}
+    except ValueError:
+        windows = set()
+    if not windows or min(windows) < 1:
+        raise ValueError(f"JAMS_LOOKBACKS needs positive session counts, got {text!r}")
+    return tuple(sorted(windows))
+
+
+# Look-back windows (sessions) reported next to the score; JAMS_LOOKBACKS=5,10,20,60,252
+LOOKBACK_WINDOWS = _lookback_windows(os.environ.get('JAMS_LOOKBACKS', '5,10,20,60,252'))
+
+# Series reported for every look-back window: (numerator, denominator or None)
+LOOKBACK_SERIES = {
+    'HYG/TLT': ('HYG', 'TLT'),
+    'FXY': ('FXY', None),
+    'UUP': ('UUP', None),
+    'RSP/SPY': ('RSP', 'SPY'),
+    'IWM/SPY': ('IWM', 'SPY'),
+    'XLU/XLK': ('XLU', 'XLK'),
+    'SPY': ('SPY', None),
+    'VIX': ('^VIX', None),
+}
+
+# Every window of a rolling look-back: lagged closes, percent changes and trailing percentiles,
+# each shaped (rows, columns, windows)
+Lookbacks = namedtuple('Lookbacks', ['windows', 'lagged', 'change', 'percentile'])
+
+# Every threshold and weight in the score. Bucket lists are (threshold, score) pairs checked
+# in order like an if/elif chain; "above" buckets fire when the signal exceeds the threshold.
+RiskParameters = namedtuple('RiskParameters', [
+    'credit_buckets', 'credit_trend_buckets', 'jpy_buckets', 'usd_buckets',
+    'equal_weight_buckets', 'small_cap_buckets', 'defensive_buckets', 'vix_momentum_buckets',
+    'divergence_vix', 'divergence_component', 'divergence_score',
+    'credit_weight', 'currency_weight', 'breadth_weight', 'vix_momentum_weight', 'final_scale'
+], defaults=[
+    ((-2.5, 4), (-1.5, 3), (-0.8, 2), (-0.3, 1)),
+    ((-3, 1),),
+    ((3.5, 4), (2.5, 3), (1.5, 2), (0.8, 1)),
+    ((4, 1), (2.5, 0.5)),
+    ((-2.5, 2), (-1.2, 1.5), (-0.6, 1)),
+    ((-4, 2), (-2.5, 1.5), (-1.2, 1)),
+    ((3, 1.5), (1.5, 1), (0.8, 0.5)),
+    ((25, 1), (15, 0.5)),
+    15, 2, 2,
+    1.0, 1.0, 0.8, 1.0, 0.8
+])
+
+DEFAULT_PARAMETERS = RiskParameters()
+
+SIGNAL_COLUMNS = [
+    'hyg_tlt_change', 'hyg_tlt_10d_change', 'fxy_change', 'uup_change',
+    'rsp_spy_change', 'iwm_spy_change', 'defensive_rotation',
+    'vix', 'vix_percentile', 'vix_5d_change', 'session'
+]
+
+METRIC_COLUMNS = [
+    'hyg_tlt_change', 'hyg_tlt_10d_change', 'fxy_change', 'uup_change',
+    'rsp_spy_change', 'iwm_spy_change', 'defensive_rotation',
+    'credit_score', 'currency_score', 'breadth_score', 'vix_momentum_score',
+    'vix_percentile', 'vix_5d_change', 'risk_score'
+]
+
+# Tickers every metric is computed from; its data age is the oldest of their closes.
+# VIX momentum reads the credit and currency scores for its divergence check.
+METRIC_INPUTS = {
+    'hyg_tlt_change': ('HYG', 'TLT'),
+    'hyg_tlt_10d_change': ('HYG', 'TLT'),
+    'fxy_change': ('FXY',),
+    'uup_change': ('UUP',),
+    'rsp_spy_change': ('RSP', 'SPY'),
+    'iwm_spy_change': ('IWM', 'SPY'),
+    'defensive_rotation': ('XLU', 'XLK'),
+    'credit_score': ('HYG', 'TLT'),
+    'currency_score': ('FXY', 'UUP'),
+    'breadth_score': ('RSP', 'SPY', 'IWM', 'XLU', 'XLK'),
+    'vix_momentum_score': ('^VIX', 'HYG', 'TLT', 'FXY', 'UUP'),
+    'vix_percentile': ('^VIX',),
+    'vix_5d_change': ('^VIX',),
+    'risk_score': tuple(TICKERS),
+}
+
+
+def _sessions(index):
+    """Session number of every row and the row holding each session's close"""
+    days = pd.DatetimeIndex(index).normalize()
+    new_session = np.ones(len(days), dtype=bool)
+    new_session[1:] = days[1:] != days[:-1]
+    session_id = np.cumsum(new_session) - 1
+    close_row = np.append(np.flatnonzero(new_session)[1:] - 1, len(days) - 1)
+    return session_id, close_row
+
+
+def lookback_kernel(values, sessions, windows, percentiles=True):
+    """Every look-back window for every row in one pass.
+
+    values is (rows,) or (rows, columns); sessions comes from _sessions. For each window w:
+    - lagged: the close w sessions before the row's session, NaN where history is short
+    - change: percent change from that close
+    - percentile: percent of the prior w - 1 session closes below the row's value, over
+      the history available on early rows (None when percentiles is False)
+    """
+    values = np.asarray(values, dtype=float)
+    matrix = values.reshape(len(values), -1)
+    windows = np.asarray(windows, dtype=int)
+    session_id, close_row = sessions
+    session_close = matrix[close_row]
+
+    # Lag every row by every window with one gather
+    target = session_id[:, None] - windows[None, :]
+    lagged = session_close[np.maximum(target, 0)].transpose(0, 2, 1)
+    lagged[np.broadcast_to((target < 0)[:, None, :], lagged.shape)] = np.nan
+    change = (matrix[:, :, None] / lagged - 1) * 100
+    if not percentiles:
+        return _squeeze(Lookbacks(tuple(windows.tolist()), lagged, change, None), values.ndim)
+
+    # Count prior closes below the current value one session back at a time; the running
+    # count after k steps is the numerator for a window of k + 1
+    longest = int(windows.max()) - 1
+    padded = np.concatenate([np.full((longest, matrix.shape[1]), np.nan), session_close])
+    row = session_id + longest
+    slot = {int(w) - 1: i for i, w in enumerate(windows)}
+    counts = np.zeros(matrix.shape + (len(windows),))
+    below = np.zeros(matrix.shape)
+    for k in range(1, longest + 1):
+        below += padded[row - k] < matrix
+        if k in slot:
+            counts[:, :, slot[k]] = below
+    lengths = np.minimum(session_id[:, None], windows[None, :] - 1) + 1
+    percentile = counts / lengths[:, None, :] * 100
+
+    return _squeeze(Lookbacks(tuple(windows.tolist()), lagged, change, percentile), values.ndim)
+
+
+def _squeeze(lookbacks, ndim):
+    """Drop the column axis again for 1-D input"""
+    if ndim != 1:
+        return lookbacks
+    return lookbacks._replace(**{f: getattr(lookbacks, f)[:, 0] for f in ('lagged', 'change', 'percentile')
+                                 if getattr(lookbacks, f) is not None})
+
+
+def _bucket(values, buckets, above=False):
+    """Score of the first (threshold, score) bucket the value falls in, like an if/elif chain"""
+    if np.ndim(values) == 0:
+        # Scalar fast path for streaming updates; NaN matches no bucket
+        for threshold, score in buckets:
+            if (values > threshold) if above else (values < threshold):
+                return score
+        return 0
+    conditions = [(values > t) if above else (values < t) for t, _ in buckets]
+    return np.select(conditions, [score for _, score in buckets], 0)
+
+
+def credit_component(hyg_tlt_5d_change, hyg_tlt_10d_change, params=DEFAULT_PARAMETERS):
+    """Credit stress score from HYG/TLT ratio momentum"""
+    return (_bucket(hyg_tlt_5d_change, params.credit_buckets)
+            + _bucket(hyg_tlt_10d_change, params.credit_trend_buckets))
+
+
+def currency_component(fxy_5d_change, uup_5d_change, params=DEFAULT_PARAMETERS):
+    """Currency stress score: JPY strength primary, USD strength secondary"""
+    return (_bucket(fxy_5d_change, params.jpy_buckets, above=True)
+            + _bucket(uup_5d_change, params.usd_buckets, above=True))
+
+
+def breadth_component(rsp_spy_change, iwm_spy_change, defensive_rotation, params=DEFAULT_PARAMETERS):
+    """Breadth score from equal-weight, small-cap and defensive rotation signals"""
+    return (_bucket(rsp_spy_change, params.equal_weight_buckets)
+            + _bucket(iwm_spy_change, params.small_cap_buckets)
+            + _bucket(defensive_rotation, params.defensive_buckets, above=True))
+
+
+def vix_momentum_component(vix, vix_5d_change, credit_score, currency_score, params=DEFAULT_PARAMETERS):
+    """VIX momentum score, with a divergence penalty for low VIX under credit or currency stress"""
+    divergence = (vix < params.divergence_vix) & (
+        (credit_score > params.divergence_component) | (currency_score > params.divergence_component)
+    )
+    return np.where(divergence, params.divergence_score,
+                    _bucket(vix_5d_change, params.vix_momentum_buckets, above=True))
+
+
+def total_risk_score(credit_score, currency_score, breadth_score, vix_momentum_score, params=DEFAULT_PARAMETERS):
+    """Weighted 0-10 risk score from the component scores"""
+    total_score = ((credit_score * params.credit_weight) + (currency_score * params.currency_weight)
+                   + (breadth_score * params.breadth_weight) + (vix_momentum_score * params.vix_momentum_weight))
+    if np.ndim(total_score) == 0:
+        return min(10, max(0, round(total_score * params.final_scale)))
+    return np.clip(np.round(total_score * params.final_scale), 0, 10)
+
+
+def compute_signals(historical_data):
+    """Ratio changes and VIX percentile for every date; these do not depend on the score parameters"""
+    matrix = historical_data[TICKERS].to_numpy(dtype=float)
+    close = {t: matrix[:, i] for i, t in enumerate(TICKERS)}
+    sessions = _sessions(historical_data.index)
+    lagged = lookback_kernel(matrix, sessions, (CHANGE_SESSIONS, TREND_SESSIONS), percentiles=False).lagged
+
+    def change_ago(ticker, periods=CHANGE_SESSIONS):
+        return lagged[:, TICKERS.index(ticker), 0 if periods == CHANGE_SESSIONS else 1]
+
+    # Credit: HYG/TLT ratio momentum
+    hyg_tlt_ratio = close['HYG'] / close['TLT']
+    hyg_tlt_5d_change = (hyg_tlt_ratio / (change_ago('HYG') / change_ago('TLT')) - 1) * 100
+    hyg_tlt_10d_change = (hyg_tlt_ratio / (change_ago('HYG', TREND_SESSIONS) / change_ago('TLT', TREND_SESSIONS)) - 1) * 100
+
+    # Currency: JPY and USD 5-day moves
+    fxy_5d_change = (close['FXY'] / change_ago('FXY') - 1) * 100
+    uup_5d_change = (close['UUP'] / change_ago('UUP') - 1) * 100
+
+    # Breadth: equal-weight, small caps and defensive rotation
+    rsp_spy_ratio = close['RSP'] / close['SPY']
+    rsp_spy_change = (rsp_spy_ratio / (change_ago('RSP') / change_ago('SPY')) - 1) * 100
+    iwm_spy_change = ((close['IWM'] / change_ago('IWM')) /
+                      (close['SPY'] / change_ago('SPY')) - 1) * 100
+    xlu_xlk_ratio = close['XLU'] / close['XLK']
+    defensive_rotation = (xlu_xlk_ratio / (change_ago('XLU') / change_ago('XLK')) - 1) * 100
+
+    # VIX momentum
+    vix = close['^VIX']
+    vix_percentile = lookback_kernel(vix, sessions, (VIX_PERCENTILE_WINDOW,)).percentile[:, 0]
+    vix_5d_change = (vix / change_ago('^VIX') - 1) * 100
+
+    return pd.DataFrame({
+        'hyg_tlt_change': hyg_tlt_5d_change,
+        'hyg_tlt_10d_change': hyg_tlt_10d_change,
+        'fxy_change': fxy_5d_change,
+        'uup_change': uup_5d_change,
+        'rsp_spy_change': rsp_spy_change,
+        'iwm_spy_change': iwm_spy_change,
+        'defensive_rotation': defensive_rotation,
+        'vix': vix,
+        'vix_percentile': vix_percentile,
+        'vix_5d_change': vix_5d_change,
+        'session': sessions[0]
+    }, index=historical_data.index, columns=SIGNAL_COLUMNS)
+
+
+def score_signals(signals, params=DEFAULT_PARAMETERS):
+    """Bucket precomputed signals into component and total risk scores"""
+    col = {c: signals[c].to_numpy() for c in SIGNAL_COLUMNS}
+    credit_score = credit_component(col['hyg_tlt_change'], col['hyg_tlt_10d_change'], params)
+    currency_score = currency_component(col['fxy_change'], col['uup_change'], params)
+    breadth_score = breadth_component(col['rsp_spy_change'], col['iwm_spy_change'], col['defensive_rotation'], params)
+    vix_momentum_score = vix_momentum_component(col['vix'], col['vix_5d_change'], credit_score, currency_score, params)
+
+    risk_score = total_risk_score(credit_score, currency_score, breadth_score, vix_momentum_score, params)
+    risk_score[col['session'] < MIN_HISTORY - 1] = np.nan
+    # A signal left missing by a gap past the fill limit would bucket as calm; leave the date unscored
+    risk_score[np.isnan(signals[SIGNAL_COLUMNS[:-1]].to_numpy(dtype=float)).any(axis=1)] = np.nan
+
+    return pd.DataFrame({
+        'hyg_tlt_change': col['hyg_tlt_change'],
+        'hyg_tlt_10d_change': col['hyg_tlt_10d_change'],
+        'fxy_change': col['fxy_change'],
+        'uup_change': col['uup_change'],
+        'rsp_spy_change': col['rsp_spy_change'],
+        'iwm_spy_change': col['iwm_spy_change'],
+        'defensive_rotation': col['defensive_rotation'],
+        'credit_score': np.asarray(credit_score, dtype=float),
+        'currency_score': np.asarray(currency_score, dtype=float),
+        'breadth_score': np.asarray(breadth_score, dtype=float),
+        'vix_momentum_score': np.asarray(vix_momentum_score, dtype=float),
+        'vix_percentile': col['vix_percentile'],
+        'vix_5d_change': col['vix_5d_change'],
+        'risk_score': risk_score
+    }, index=signals.index, columns=METRIC_COLUMNS)
+
+
+def compute_score_history(historical_data, params=DEFAULT_PARAMETERS):
+    """Calculate component and total risk scores for every date at once"""
+    return score_signals(compute_signals(historical_data), params)
+
+
+def lookback_metrics(historical_data, windows=LOOKBACK_WINDOWS):
+    """Change and trailing percentile of every LOOKBACK_SERIES over every window, for every date.
+
+    Columns are a (series, 'change' | 'percentile', window) MultiIndex.
+    """
+    series = np.column_stack([
+        historical_data[a].to_numpy(dtype=float) / (historical_data[b].to_numpy(dtype=float) if b else 1.0)
+        for a, b in LOOKBACK_SERIES.values()
+    ])
+    lookbacks = lookback_kernel(series, _sessions(historical_data.index), windows)
+    rows = len(series)
+    columns = pd.MultiIndex.from_product([list(LOOKBACK_SERIES), ['change', 'percentile'], lookbacks.windows])
+    values = np.stack([lookbacks.change, lookbacks.percentile], axis=2).reshape(rows, -1)
+    return pd.DataFrame(values, index=historical_data.index, columns=columns)
+
+
+def _as_score(value):
+    """Render whole-number component scores as ints, matching the scalar scoring"""
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def latest_metrics(historical_data, params=DEFAULT_PARAMETERS, history=None):
+    """Return (risk_score, metrics) for the last row of the history, reusing its score history if given"""
+    if history is None:
+        history = compute_score_history(historical_data, params)
+    if history.empty or _sessions(history.index)[0][-1] < MIN_HISTORY - 1:
+        raise IndexError(f"need at least {MIN_HISTORY} sessions of history")
+
+    latest = history.iloc[-1]
+    if np.isnan(latest['risk_score']):
+        missing = [t for t in TICKERS if np.isnan(historical_data[t].iloc[-1])]
+        raise ValueError(f"no close within the fill limit for {', '.join(missing) or 'a look-back date'}")
+    metrics = {col: float(latest[col]) for col in METRIC_COLUMNS if col != 'risk_score'}
+    for col in ('credit_score', 'currency_score', 'breadth_score', 'vix_momentum_score'):
+        metrics[col] = _as_score(metrics[col])
+    return int(latest['risk_score']), metrics
+
+
+def metric_data_age(ticker_ages, inputs=METRIC_INPUTS):
+    """Sessions since the oldest close behind every metric; None where an input never printed"""
+    ages = {}
+    for metric, tickers in inputs.items():
+        age = np.array([ticker_ages.get(t, np.nan) for t in tickers], dtype=float)
+        ages[metric] = None if np.isnan(age).any() else int(age.max())
+    return ages
+
+
+def hedge_percentage(risk_score, vix_percentile, current_vix):
+    """Recommended hedge percentage (0-87.5), vectorized over any broadcastable inputs"""
+    risk_score, vix_percentile, current_vix = np.broadcast_arrays(
+        np.asarray(risk_score, dtype=float), np.asarray(vix_percentile, dtype=float), np.asarray(current_vix, dtype=float)
+    )
+    base_hedge = np.minimum(risk_score * 8.75, 87.5)  # Max 87.5% hedge
+
+    # VIX adjustments
+    base_hedge = np.where(current_vix > 35, np.maximum(base_hedge - 15, 0),
+                 np.where(current_vix > 25, np.maximum(base_hedge - 10, 0),
+                 np.where(current_vix < 12, base_hedge + 12.5, base_hedge)))
+
+    # Percentile adjustments
+    base_hedge = np.where(vix_percentile > 90, np.maximum(base_hedge - 12.5, 0),
+                 np.where(vix_percentile < 10, base_hedge + 12.5, base_hedge))
+
+    return np.clip(base_hedge, 0, 87.5)
+
+
+@lru_cache(maxsize=32)
+def _hedge_surface(vix_grid, score_grid, percentile):
+    surface = hedge_percentage(np.array(score_grid)[None, :], percentile, np.array(vix_grid)[:, None])
+    surface.flags.writeable = False  # shared by every caller of the memoized surface
+    return surface
+
+
+def hedge_surface(vix_grid, score_grid, percentile=50):
+    """Hedge percentage for every (VIX, score) pair: rows follow vix_grid, columns score_grid.
+
+    Surfaces are memoized by their grids and percentile and returned read-only.
+    """
+    return _hedge_surface(
+        tuple(np.asarray(vix_grid, dtype=float).tolist()),
+        tuple(np.asarray(score_grid, dtype=float).tolist()),
+        float(percentile)
+    )
@@ -0,0 +1,114 @@
+"""Scenario P&L of a hedged portfolio over a grid of SPY moves and VIX shocks.
+
+The recommended hedge package (SH, SPY puts bought, SPY calls sold) is revalued with
+Black-Scholes at every scenario instead of scaling a linear loss by the hedge ratio, so the
+puts' convexity and the short calls' cap show up in the surface. All scenarios and legs go
+through one broadcast black_scholes call.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from hedging import batch_hedge
+from pricing import CONTRACT_MULTIPLIER, RISK_FREE_RATE, black_scholes
+
+# Scenario grid: SPY move over the horizon (fraction) x change in VIX (points)
+SPY_MOVES = tuple(np.round(np.arange(-0.30, 0.1001, 0.01), 2))
+VIX_SHOCKS = tuple(np.arange(-10.0, 40.5, 1.0))
+
+# Calendar days between now and the revaluation; options lose that much time value
+HORIZON_DAYS = 7
+
+# Floor for a shocked VIX, in points
+MIN_VIX = 9.0
+
+# Book the fractional package is sized on, large enough that no leg falls under one contract
+REFERENCE_DOLLAR_BETA = 1e9
+
+# Units held of each hedge leg; call_contracts are sold. Fractional units are allowed.
+HedgePackage = namedtuple('HedgePackage', ['dollar_beta', 'sh_shares', 'put_contracts', 'call_contracts'])
+
+# P&L in dollars shaped (shocks, moves), split into the unhedged book and the hedge legs
+Scenarios = namedtuple('Scenarios', ['moves', 'shocks', 'portfolio', 'hedge', 'net'])
+
+# Package sensitivities in dollars: delta as P&L per 100% SPY move (comparable to dollar beta),
+# gamma as the change in dollar delta per 1% move, vega per VIX point, theta per calendar day
+PackageGreeks = namedtuple('PackageGreeks', ['dollar_delta', 'dollar_gamma', 'vega', 'theta'])
+
+
+def hedge_package(dollar_beta, risk_score, vix_percentile, current_vix, prices, whole=True):
+    """Units of each leg generate_hedge_strategy recommends for one portfolio.
+
+    whole=False keeps fractional units (allocation / price) with every leg of the tier,
+    so the package scales exactly with the portfolio.
+    """
+    book = float(dollar_beta) if whole else REFERENCE_DOLLAR_BETA
+    row = batch_hedge(pd.DataFrame({'portfolio_id': [0], 'dollar_beta': [book]}),
+                      risk_score, vix_percentile, current_vix, prices).iloc[0]
+    if whole:
+        return HedgePackage(book, row.sh_shares, row.put_contracts, row.call_contracts)
+
+    scale = dollar_beta / book
+
+    def units(cost, price):
+        return cost * scale / price if price > 0 else 0.0
+    return HedgePackage(float(dollar_beta), units(row.sh_cost, prices.sh_price),
+                        units(row.put_cost, prices.put_premium), units(row.call_premium, prices.call_premium))
+
+
+def _legs(package, prices):
+    """(strikes, calls, signed contracts, premiums now) of the option legs"""
+    return (np.array([prices.put_strike, prices.call_strike]),
+            np.array([False, True]),
+            np.array([package.put_contracts, -package.call_contracts], dtype=float),
+            np.array([prices.put_premium, prices.call_premium]))
+
+
+def sh_value(package, prices):
+    """Dollars held in SH; zero when SH has no price"""
+    return package.sh_shares * prices.sh_price if prices.sh_price > 0 else 0.0
+
+
+def option_pnl(package, prices, spot, vix, horizon_days=HORIZON_DAYS, rate=RISK_FREE_RATE):
+    """P&L of the package's option legs repriced at `spot` and `vix` (points), `horizon_days` on.
+
+    spot and vix broadcast against each other; the result has their broadcast shape.
+    """
+    strikes, calls, contracts, premiums = _legs(package, prices)
+    spot = np.asarray(spot, dtype=float)[..., None]
+    vol = np.maximum(np.asarray(vix, dtype=float), MIN_VIX)[..., None] / 100
+    years = (prices.expiry_days - horizon_days) / 365
+    values = black_scholes(spot, strikes, years, vol, rate, call=calls).price * CONTRACT_MULTIPLIER
+    return ((values - premiums) * contracts).sum(axis=-1)
+
+
+def scenario_pnl(package, prices, moves=SPY_MOVES, shocks=VIX_SHOCKS, horizon_days=HORIZON_DAYS,
+                 rate=RISK_FREE_RATE):
+    """P&L of the portfolio and its hedge package at every (VIX shock, SPY move) pair.
+
+    The portfolio moves with its dollar beta and SH by minus the SPY move (its daily reset
+    is ignored over the horizon). Options are repriced at the shocked spot and VIX with
+    `horizon_days` less to expiry.
+    """
+    moves = np.asarray(moves, dtype=float)
+    shocks = np.asarray(shocks, dtype=float)
+    options = option_pnl(package, prices, prices.spy_price * (1 + moves)[None, :], (prices.vix + shocks)[:, None],
+                         horizon_days, rate)
+    portfolio = np.broadcast_to(package.dollar_beta * moves, options.shape)
+    hedge = options - sh_value(package, prices) * moves
+    return Scenarios(moves, shocks, portfolio, hedge, portfolio + hedge)
+
+
+def package_greeks(package, prices, rate=RISK_FREE_RATE):
+    """Dollar sensitivities of the hedged portfolio at the current SPY and VIX"""
+    strikes, calls, contracts, _ = _legs(package, prices)
+    spot = prices.spy_price
+    greeks = black_scholes(spot, strikes, prices.expiry_days / 365, prices.vix / 100, rate, call=calls)
+    units = contracts * CONTRACT_MULTIPLIER
+    return PackageGreeks(
+        dollar_delta=float(package.dollar_beta - sh_value(package, prices) + (units * greeks.delta).sum() * spot),
+        dollar_gamma=float((units * greeks.gamma).sum() * spot * spot * 0.01),
+        vega=float((units * greeks.vega).sum() / 100),
+        theta=float((units * greeks.theta).sum() / 365),
+    )
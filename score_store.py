@@ -0,0 +1,202 @@
+"""Append-only log of every scored market snapshot, kept in SQLite in WAL mode.
+
+Each row holds the snapshot's prices, signals, component scores, hedge percentage and VIX
+outlook, keyed by (interval, ts) where ts is when the snapshot was scored and asof is the
+market date it describes. Live rows are written by the background refresher; dates the
+terminal was not running for are backfilled from the price history (source 'backfill',
+no outlook) the first time they are needed.
+
+Next to the log, a `latest` table keeps the newest snapshot of every (interval, market date),
+updated in the same transaction as each append. Both are clustered on their keys, so the
+chart's date-range read touches one row per date and an audit read only the rows in range,
+however long the log grows.
+
+Writes go through one connection behind a lock. Reads check out a read-only connection
+from a small pool, so concurrent readers (dashboard sessions, API requests) run in
+parallel against the WAL without waiting on each other or on the writer.
+"""
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from market_data import PRICE_KEYS
+from risk_engine import METRIC_COLUMNS, TICKERS, VIX_PERCENTILE_WINDOW, _sessions, compute_score_history, hedge_percentage
+
+DEFAULT_SCORE_STORE = os.environ.get(
+    'JAMS_SCORE_STORE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'scores.sqlite')
+)
+
+PRICE_COLUMNS = [PRICE_KEYS[t] for t in TICKERS]
+VALUE_COLUMNS = PRICE_COLUMNS + METRIC_COLUMNS + ['hedge_percentage']
+LOG_COLUMNS = ['interval', 'ts', 'asof', 'source'] + VALUE_COLUMNS + ['vix_outlook']
+
+# Read-only connections kept open per store
+READ_POOL_SIZE = 4
+
+_COLUMNS_SQL = f"""
+    interval TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    asof INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    {', '.join(f'{c} REAL' for c in VALUE_COLUMNS)},
+    vix_outlook TEXT"""
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS snapshots ({_COLUMNS_SQL},
+    PRIMARY KEY (interval, ts)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS latest ({_COLUMNS_SQL},
+    PRIMARY KEY (interval, asof)
+) WITHOUT ROWID;
+"""
+
+_VALUES = f"({', '.join(LOG_COLUMNS)}) VALUES ({', '.join('?' * len(LOG_COLUMNS))})"
+_INSERT = f"INSERT OR IGNORE INTO snapshots {_VALUES}"
+_UPSERT_LATEST = (f"INSERT INTO latest {_VALUES} ON CONFLICT (interval, asof) DO UPDATE SET "
+                  + ', '.join(f'{c} = excluded.{c}' for c in LOG_COLUMNS[1:] if c != 'asof')
+                  + " WHERE excluded.ts >= latest.ts")
+
+
+def _micros(timestamp):
+    return pd.Timestamp(timestamp).tz_localize(None).value // 1000
+
+
+def _micros_index(index):
+    return pd.DatetimeIndex(index).tz_localize(None).to_numpy(dtype='datetime64[us]').astype(np.int64).tolist()
+
+
+def _times(column):
+    return pd.to_datetime(column.to_numpy(dtype=np.int64) * 1000)
+
+
+class ScoreStore:
+    """Snapshot log in one SQLite file; a writer connection plus a reader pool, safe to share between threads"""
+
+    def __init__(self, path=DEFAULT_SCORE_STORE, readers=READ_POOL_SIZE):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.executescript(_SCHEMA)
+        self._readers = queue.Queue()
+        for _ in range(readers):
+            self._readers.put(sqlite3.connect(f"file:{quote(os.path.abspath(path))}?mode=ro", uri=True,
+                                              check_same_thread=False))
+
+    def close(self):
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+        with self._lock:
+            self._db.close()
+
+    @contextmanager
+    def _reader(self):
+        """Check a read-only connection out of the pool, waiting while all are in use"""
+        db = self._readers.get()
+        try:
+            yield db
+        finally:
+            self._readers.put(db)
+
+    def _insert(self, rows):
+        with self._lock, self._db:
+            inserted = self._db.executemany(_INSERT, rows).rowcount
+            self._db.executemany(_UPSERT_LATEST, rows)
+        return inserted
+
+    def record(self, interval, ts, asof, current_data, risk_score, detailed_metrics):
+        """Append one live snapshot"""
+        values = dict(detailed_metrics, risk_score=risk_score)
+        values.update({c: current_data.get(c) for c in PRICE_COLUMNS})
+        row = [interval, _micros(ts), _micros(asof), 'live']
+        row += [None if values.get(c) is None else float(values[c]) for c in VALUE_COLUMNS]
+        row.append(detailed_metrics.get('vix_outlook'))
+        return self._insert([row])
+
+    def stored_dates(self, interval, start=None, end=None):
+        """Market dates in [start, end] with at least one snapshot"""
+        return pd.DatetimeIndex(_times(self._stored(interval, start, end)['asof']))
+
+    def _stored(self, interval, start, end):
+        """asof and scoring time (both in microseconds) of the newest snapshot of every date in [start, end]"""
+        return self._query('SELECT asof, ts FROM latest WHERE interval = ? AND asof >= ? AND asof <= ?',
+                           interval, start, end)
+
+    def backfill(self, interval, historical_data):
+        """Score and insert every date of `historical_data` without a final snapshot.
+
+        A date needs one when nothing is stored for it, or when its newest snapshot was scored
+        before the next bar opened (a mid-session value) and that next bar shows its close is
+        final. Final rows are stamped a microsecond before the next bar, so each is corrected
+        once. Dates before the VIX percentile window is warm are never stored.
+        """
+        dates = pd.DatetimeIndex(historical_data.index)
+        if dates.empty:
+            return 0
+        stamps = np.array(_micros_index(dates), dtype=np.int64)
+        # A bar's close is final once the next one opens; the last bar is still open
+        session_end = np.append(stamps[1:] - 1, np.iinfo(np.int64).max)
+        stored = self._stored(interval, dates[0], dates[-1])
+        scored_at = pd.Series(stored['ts'].to_numpy(dtype=np.int64), index=stored['asof'].to_numpy(dtype=np.int64))
+        scored_at = scored_at.reindex(stamps).to_numpy(dtype=float)
+        final = np.arange(len(dates)) < len(dates) - 1
+        missing = np.isnan(scored_at) | (final & (scored_at < session_end.astype(float)))
+        missing &= _sessions(dates)[0] >= VIX_PERCENTILE_WINDOW - 1
+        if not missing.any():
+            return 0
+        scores = compute_score_history(historical_data)
+        scores['hedge_percentage'] = hedge_percentage(
+            scores['risk_score'].to_numpy(), scores['vix_percentile'].to_numpy(),
+            historical_data['^VIX'].to_numpy(dtype=float)
+        )
+        for t in TICKERS:
+            scores[PRICE_KEYS[t]] = historical_data[t].to_numpy(dtype=float)
+        keep = missing & scores['risk_score'].notna().to_numpy()
+        if not keep.any():
+            return 0
+        scores = scores[keep]
+
+        # The unfinished last date keeps its own stamp, so live snapshots of it still supersede the row
+        scored = np.where(final, session_end, stamps)[keep].tolist()
+        values = scores[VALUE_COLUMNS].astype(object).where(scores[VALUE_COLUMNS].notna(), None)
+        rows = [[interval, ts, asof, 'backfill', *row, None]
+                for ts, asof, row in zip(scored, stamps[keep].tolist(), values.itertuples(index=False))]
+        return self._insert(rows)
+
+    def history(self, interval, start=None, end=None, columns=('risk_score',)):
+        """Latest snapshot of every market date in [start, end], indexed by asof"""
+        query = (f"SELECT asof, {', '.join(columns)} FROM latest WHERE interval = ?"
+                 f" AND asof >= ? AND asof <= ? ORDER BY asof")
+        frame = self._query(query, interval, start, end)
+        frame.index = pd.DatetimeIndex(_times(frame.pop('asof')), name='asof')
+        return frame
+
+    def log(self, interval, start=None, end=None):
+        """Every snapshot scored in [start, end], in order: the audit trail"""
+        query = (f"SELECT {', '.join(LOG_COLUMNS)} FROM snapshots WHERE interval = ?"
+                 f" AND ts >= ? AND ts <= ? ORDER BY ts")
+        frame = self._query(query, interval, start, end)
+        frame['ts'] = _times(frame['ts'])
+        frame['asof'] = _times(frame['asof'])
+        return frame
+
+    def _query(self, query, interval, start, end):
+        bounds = (interval,
+                  _micros(start) if start is not None else np.iinfo(np.int64).min,
+                  _micros(end) if end is not None else np.iinfo(np.int64).max)
+        with self._reader() as db:
+            cursor = db.execute(query, bounds)
+            rows = cursor.fetchall()
+            names = [d[0] for d in cursor.description]
+        return pd.DataFrame.from_records(rows, columns=names)
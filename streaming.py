@@ -0,0 +1,176 @@
+import bisect
+import math
+from collections import deque
+
+import pandas as pd
+
+from risk_engine import (
+    DEFAULT_PARAMETERS, MIN_HISTORY, TICKERS, VIX_PERCENTILE_WINDOW, _as_score, breadth_component,
+    credit_component, currency_component, total_risk_score, vix_momentum_component
+)
+
+# Completed daily closes each ticker has to remember for its look-backs
+LOOKBACK = {t: 5 for t in TICKERS}
+LOOKBACK.update({'HYG': 10, 'TLT': 10, '^VIX': VIX_PERCENTILE_WINDOW - 1})
+
+# Component scores that depend on each ticker
+COMPONENTS = {
+    'HYG': 'credit', 'TLT': 'credit',
+    'FXY': 'currency', 'UUP': 'currency',
+    'RSP': 'breadth', 'SPY': 'breadth', 'IWM': 'breadth', 'XLU': 'breadth', 'XLK': 'breadth',
+    '^VIX': 'vix'
+}
+
+
+class RiskState:
+    """Streaming risk score: O(1) update per tick from ring buffers of prior daily closes.
+
+    The current session's price for each ticker is its latest tick; tickers that have not
+    traded yet in a new session carry the previous close. The 30-day VIX percentile is kept
+    with a sorted window of prior closes, so each query is a binary search. As in
+    compute_score_history, a component with a missing input is NaN and leaves the session
+    unscored rather than bucketed as calm.
+    """
+
+    def __init__(self, params=DEFAULT_PARAMETERS):
+        self.params = params
+        self.closes = {t: deque(maxlen=LOOKBACK[t]) for t in TICKERS}
+        self.prices = {t: math.nan for t in TICKERS}
+        self.session = None
+        self.sessions = 0
+        self.metrics = {}
+        self.risk_score = math.nan
+        self._vix_sorted = []
+
+    @classmethod
+    def from_history(cls, historical_data, params=DEFAULT_PARAMETERS):
+        """Seed the state from daily closes; the last row becomes the live session"""
+        state = cls(params)
+        prior = historical_data[TICKERS].iloc[:-1]
+        for t in TICKERS:
+            for close in prior[t].to_numpy(dtype=float)[-LOOKBACK[t]:]:
+                state._push_close(t, close)
+        state.prices = {t: float(v) for t, v in historical_data[TICKERS].iloc[-1].items()}
+        state.session = pd.Timestamp(historical_data.index[-1]).normalize()
+        state.sessions = len(historical_data)
+        state._score_all()
+        return state
+
+    def _push_close(self, ticker, close):
+        ring = self.closes[ticker]
+        if ticker == '^VIX':
+            if len(ring) == ring.maxlen and not math.isnan(ring[0]):
+                del self._vix_sorted[bisect.bisect_left(self._vix_sorted, ring[0])]
+            if not math.isnan(close):
+                bisect.insort(self._vix_sorted, close)
+        ring.append(close)
+
+    def _ago(self, ticker, sessions):
+        ring = self.closes[ticker]
+        return ring[-sessions] if len(ring) >= sessions else math.nan
+
+    def update(self, ticker, price, ts):
+        """Apply one price tick and return the refreshed risk score; ticks for other tickers are ignored"""
+        if ticker not in COMPONENTS:
+            return self.risk_score
+        session = pd.Timestamp(ts).normalize()
+        if self.session is None:
+            self.session = session
+            self.sessions = 1
+        elif session > self.session:
+            # New trading day: yesterday's last prices become closes and every look-back moves
+            for t in TICKERS:
+                self._push_close(t, self.prices[t])
+            self.session = session
+            self.sessions += 1
+            self.prices[ticker] = float(price)
+            self._score_all()
+            return self.risk_score
+
+        self.prices[ticker] = float(price)
+        component = COMPONENTS[ticker]
+        if component == 'credit':
+            self._score_credit()
+        elif component == 'currency':
+            self._score_currency()
+        elif component == 'breadth':
+            self._score_breadth()
+        self._score_vix()
+        self._score_total()
+        return self.risk_score
+
+    def _score_all(self):
+        self._score_credit()
+        self._score_currency()
+        self._score_breadth()
+        self._score_vix()
+        self._score_total()
+
+    def _score_credit(self):
+        p = self.prices
+        hyg_tlt_ratio = p['HYG'] / p['TLT']
+        change_5d = (hyg_tlt_ratio / (self._ago('HYG', 5) / self._ago('TLT', 5)) - 1) * 100
+        change_10d = (hyg_tlt_ratio / (self._ago('HYG', 10) / self._ago('TLT', 10)) - 1) * 100
+        self.metrics['hyg_tlt_change'] = change_5d
+        self.metrics['hyg_tlt_10d_change'] = change_10d
+        self.metrics['credit_score'] = _score(credit_component, change_5d, change_10d, params=self.params)
+
+    def _score_currency(self):
+        p = self.prices
+        fxy_change = (p['FXY'] / self._ago('FXY', 5) - 1) * 100
+        uup_change = (p['UUP'] / self._ago('UUP', 5) - 1) * 100
+        self.metrics['fxy_change'] = fxy_change
+        self.metrics['uup_change'] = uup_change
+        self.metrics['currency_score'] = _score(currency_component, fxy_change, uup_change, params=self.params)
+
+    def _score_breadth(self):
+        p = self.prices
+        rsp_spy_change = (p['RSP'] / p['SPY'] / (self._ago('RSP', 5) / self._ago('SPY', 5)) - 1) * 100
+        iwm_spy_change = ((p['IWM'] / self._ago('IWM', 5)) / (p['SPY'] / self._ago('SPY', 5)) - 1) * 100
+        defensive_rotation = (p['XLU'] / p['XLK'] / (self._ago('XLU', 5) / self._ago('XLK', 5)) - 1) * 100
+        self.metrics['rsp_spy_change'] = rsp_spy_change
+        self.metrics['iwm_spy_change'] = iwm_spy_change
+        self.metrics['defensive_rotation'] = defensive_rotation
+        self.metrics['breadth_score'] = _score(
+            breadth_component, rsp_spy_change, iwm_spy_change, defensive_rotation, params=self.params
+        )
+
+    def _score_vix(self):
+        vix = self.prices['^VIX']
+        # Window is the prior closes plus today; today is never below itself
+        below = bisect.bisect_left(self._vix_sorted, vix) if not math.isnan(vix) else 0
+        vix_5d_change = (vix / self._ago('^VIX', 5) - 1) * 100
+        window = len(self.closes['^VIX']) + 1
+        self.metrics['vix_percentile'] = below / window * 100 if not math.isnan(vix) else math.nan
+        self.metrics['vix_5d_change'] = vix_5d_change
+        self.metrics['vix_momentum_score'] = _score(
+            vix_momentum_component, vix, vix_5d_change,
+            self.metrics['credit_score'], self.metrics['currency_score'], params=self.params
+        )
+
+    def _score_total(self):
+        m = self.metrics
+        components = (m['credit_score'], m['currency_score'], m['breadth_score'], m['vix_momentum_score'])
+        if self.sessions < MIN_HISTORY or any(math.isnan(c) for c in components):
+            self.risk_score = math.nan
+            return
+        self.risk_score = int(total_risk_score(*components, self.params))
+
+
+def _score(component, *inputs, params=DEFAULT_PARAMETERS):
+    """Component score of scalar inputs, NaN when any of them is missing"""
+    if any(math.isnan(x) for x in inputs):
+        return math.nan
+    return _as_score(component(*inputs, params))
+
+
+def load_ticks(path):
+    """Read a tick replay CSV with ts, ticker and price columns, in time order"""
+    ticks = pd.read_csv(path, parse_dates=['ts'])
+    return ticks.sort_values('ts', kind='stable')[['ts', 'ticker', 'price']]
+
+
+def replay(state, ticks):
+    """Feed ticks through the state, yielding (ts, ticker, risk_score) after each one"""
+    for ts, ticker, price in ticks.itertuples(index=False):
+        yield ts, ticker, state.update(ticker, price, ts)
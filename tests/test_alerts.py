@@ -0,0 +1,24 @@
+import pandas as pd
+
+from alerts import DEFAULT_RULES, AlertEngine
+from universe import pair_subjects
+
+
+def test_integer_score_flicker_fires_once():
+    engine = AlertEngine([r for r in DEFAULT_RULES if r.name == 'risk_elevated'])
+    alerts = [a for score in (6, 5, 6, 5, 6, 5) for a in engine.evaluate_one('1d', {'risk_score': score})]
+    assert [a.state for a in alerts] == ['fired']
+
+
+def test_clears_past_hysteresis():
+    engine = AlertEngine([r for r in DEFAULT_RULES if r.name == 'risk_elevated'])
+    engine.evaluate_one('1d', {'risk_score': 6})
+    assert [a.state for a in engine.evaluate_one('1d', {'risk_score': 4})] == ['cleared']
+
+
+def test_pair_alert_clears_after_its_weak_leg_flips():
+    engine = AlertEngine(DEFAULT_RULES, scope='universe')
+    fired = engine.evaluate(pair_subjects(pd.DataFrame({'weak': ['XLK'], 'strong': ['XLU'], 'zscore': [-4.0]})))
+    cleared = engine.evaluate(pair_subjects(pd.DataFrame({'weak': ['XLU'], 'strong': ['XLK'], 'zscore': [-1.0]})))
+    assert [(a.subject, a.state) for a in fired + cleared] == [('XLK/XLU', 'fired'), ('XLK/XLU', 'cleared')]
+    assert engine.active() == []
@@ -0,0 +1,17 @@
+import json
+
+from optimizer import completed_keys, drop_partial_line, load_results
+
+
+def test_resume_after_a_killed_write(tmp_path):
+    path = tmp_path / 'results.jsonl'
+    rows = [{'key': 'a', 'hedged_calmar': 1.0}, {'key': 'b', 'hedged_calmar': 2.0}]
+    path.write_text(''.join(json.dumps(r) + '\n' for r in rows) + '{"key": "c", "hedged_ca')
+
+    assert completed_keys(path) == {'a', 'b'}
+    assert load_results(path)['key'].tolist() == ['b', 'a']
+
+    drop_partial_line(path)
+    with open(path, 'a') as out:
+        out.write(json.dumps({'key': 'c', 'hedged_calmar': 3.0}) + '\n')
+    assert load_results(path)['key'].tolist() == ['c', 'b', 'a']
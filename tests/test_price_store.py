@@ -0,0 +1,55 @@
+import pandas as pd
+
+from price_store import FixtureFeed, PriceStore, sync_prices
+
+
+def feed(days=200):
+    index = pd.bdate_range(end='2024-12-31', periods=days)
+    return FixtureFeed.from_frame(pd.DataFrame({
+        'AAA': range(days), 'BBB': range(100, 100 + days), 'SPY': range(200, 200 + days),
+    }, index=index, dtype=float))
+
+
+def test_added_ticker_downloads_its_history(tmp_path):
+    source = feed()
+    requests = []
+
+    def download(tickers, **kwargs):
+        requests.append((list(tickers), 'period' if 'period' in kwargs else 'start'))
+        return source.download(tickers, **kwargs)
+
+    store = PriceStore(str(tmp_path))
+    sync_prices(store, ['AAA', 'SPY'], download, days=90)
+    prices = sync_prices(store, ['AAA', 'BBB', 'SPY'], download, days=90)
+
+    assert requests[1:] == [(['BBB'], 'period'), (['AAA', 'SPY'], 'start')]
+    assert prices['BBB'].count() == prices['AAA'].count() > 50
+    # Once filled, the new ticker syncs incrementally with the rest
+    sync_prices(store, ['AAA', 'BBB', 'SPY'], download, days=90)
+    assert requests[-1] == (['AAA', 'BBB', 'SPY'], 'start')
+
+
+def test_short_feed_history_is_not_downloaded_again(tmp_path):
+    source = feed()
+    source.prices.loc[source.prices.index[:-20], 'BBB'] = float('nan')
+    periods = []
+
+    def download(tickers, **kwargs):
+        if 'period' in kwargs:
+            periods.append(list(tickers))
+        return source.download(tickers, **kwargs)
+
+    store = PriceStore(str(tmp_path))
+    sync_prices(store, ['AAA', 'BBB'], download, days=90)
+    sync_prices(store, ['AAA', 'BBB'], download, days=90)
+    assert periods == [['AAA', 'BBB']]
+
+
+def test_drop_before_keeps_later_bars(tmp_path):
+    store = PriceStore(str(tmp_path), interval='5m')
+    index = pd.date_range('2024-12-30 09:30', periods=6, freq='12h')
+    store.append(pd.DataFrame({'AAA': range(6)}, index=index, dtype=float))
+
+    assert store.drop_before('2024-12-31') == 2
+    assert store.read().index[0] == index[2]
+    assert store.drop_before('2024-12-31') == 0
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from risk_engine import TICKERS, _lookback_windows, compute_score_history
+
+
+def regime_change_history(calm=60, stress=30):
+    """Closes that drift risk-on for `calm` sessions, then turn risk-off for `stress` sessions"""
+    days = calm + stress
+    index = pd.bdate_range(end='2024-12-31', periods=days)
+    stressed = np.arange(days) >= calm
+    # Daily log drift of each ticker in the calm and the stressed leg
+    drift = {
+        'HYG': (0.002, -0.006), 'TLT': (-0.001, 0.004),
+        'FXY': (-0.002, 0.006), 'UUP': (-0.001, 0.003),
+        'RSP': (0.002, -0.008), 'SPY': (0.001, -0.004), 'IWM': (0.002, -0.008),
+        'XLU': (-0.001, 0.004), 'XLK': (0.002, -0.008),
+    }
+    prices = pd.DataFrame(index=index, columns=TICKERS, dtype=float)
+    for ticker, (calm_drift, stress_drift) in drift.items():
+        prices[ticker] = 100 * np.exp(np.cumsum(np.where(stressed, stress_drift, calm_drift)))
+    prices['^VIX'] = np.where(stressed, 14 + 1.0 * (np.arange(days) - calm + 1), 14 - 0.02 * np.arange(days))
+    return prices, stressed
+
+
+def test_scores_follow_a_regime_change():
+    prices, stressed = regime_change_history()
+    scores = compute_score_history(prices)['risk_score']
+    calm = scores[~stressed].dropna()
+    stress = scores[stressed].iloc[10:]
+    assert len(calm) and stress.notna().all()
+    assert stress.min() > calm.max()
+
+
+def test_lookback_windows_skip_empty_entries():
+    assert _lookback_windows('5,10,') == (5, 10)
+    for text in ('5,0', ',', '5,x'):
+        with pytest.raises(ValueError, match='JAMS_LOOKBACKS'):
+            _lookback_windows(text)
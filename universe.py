@@ -0,0 +1,147 @@
+"""Ratio-momentum stress scan over every pair in a configurable ticker universe.
+
+Usage:  python universe.py [--universe tickers.txt] [--top 50] [--offline]
+
+Each pair's signal is the HYG/TLT-style ratio change: the 5- and 10-session percent change of
+A/B, and the 5-session change as a z-score against the pair's own trailing history. Pair
+statistics come from (N x N) matrix products over the per-ticker log changes, so 500
+tickers (~125k pairs) are one vectorized pass rather than a loop over pairs.
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from alignment import align_prices
+from price_store import DEFAULT_STORE_PATH, OFFLINE, PRICE_FIXTURE, FixtureFeed, PriceStore, sync_prices
+from risk_engine import CHANGE_SESSIONS, TREND_SESSIONS
+
+UNIVERSE_GROUPS = {
+    'sectors': ['XLB', 'XLC', 'XLE', 'XLF', 'XLI', 'XLK', 'XLP', 'XLRE', 'XLU', 'XLV', 'XLY'],
+    'countries': ['EFA', 'EEM', 'EZU', 'EWJ', 'EWG', 'EWU', 'EWC', 'EWA', 'EWZ', 'EWY', 'EWT',
+                  'EWW', 'FXI', 'INDA'],
+    'credit': ['HYG', 'JNK', 'LQD', 'EMB', 'BKLN', 'TLT', 'IEF', 'SHY', 'AGG'],
+    'macro': ['SPY', 'RSP', 'IWM', 'QQQ', 'GLD', 'UUP', 'FXY'],
+}
+DEFAULT_UNIVERSE = [t for group in UNIVERSE_GROUPS.values() for t in group]
+
+# JAMS_UNIVERSE=<file> replaces the default universe: one ticker per line, # for comments
+UNIVERSE_FILE = os.environ.get('JAMS_UNIVERSE')
+
+# Prior sessions of 5-session changes each pair's z-score is measured against
+ZSCORE_WINDOW = 60
+
+# History kept in the universe store; covers the z-score window plus the trend look-back
+UNIVERSE_DAYS = 365
+
+
+def load_universe(path=UNIVERSE_FILE):
+    """Tickers listed in a universe file, or the default universe"""
+    if not path:
+        return list(DEFAULT_UNIVERSE)
+    with open(path) as f:
+        tickers = [line.split('#')[0].strip().upper() for line in f]
+    return list(dict.fromkeys(t for t in tickers if t))
+
+
+def _pair_moments(changes):
+    """Mean and sample variance of x_i - x_j over the rows where both are present, as (N x N)"""
+    present = ~np.isnan(changes)
+    x = np.where(present, changes, 0.0)
+    m = present.astype(float)
+    n = m.T @ m
+    sums = x.T @ m                      # sums[i, j]: x_i over rows where j is present too
+    squares = (x * x).T @ m
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean = (sums - sums.T) / n
+        second = (squares + squares.T - 2 * (x.T @ x)) / n
+        variance = np.maximum(second - mean ** 2, 0.0) * n / (n - 1)
+    return mean, variance, n
+
+
+def pair_stress(prices, change_sessions=CHANGE_SESSIONS, trend_sessions=TREND_SESSIONS,
+                window=ZSCORE_WINDOW, top=50):
+    """Rank every pair of columns by the z-score of its latest ratio change.
+
+    Each pair is oriented weak/strong so its ratio fell; the most negative z-scores (the
+    sharpest relative breakdowns against the pair's own history) come first. Returns at
+    most `top` rows, or every scored pair when top is None.
+    """
+    prices = prices.dropna(how='all')
+    tickers = np.array(prices.columns)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_prices = np.log(prices.to_numpy(dtype=float))
+    if len(log_prices) <= max(change_sessions, trend_sessions) + 1:
+        raise ValueError("not enough history to scan the universe")
+
+    changes = log_prices[change_sessions:] - log_prices[:-change_sessions]
+    current = changes[-1]
+    trend = log_prices[-1] - log_prices[-1 - trend_sessions]
+    mean, variance, n = _pair_moments(changes[-window - 1:-1])
+
+    i, j = np.triu_indices(len(tickers), 1)
+    change = current[i] - current[j]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        zscore = (change - mean[i, j]) / np.sqrt(variance[i, j])
+    zscore[(n[i, j] < window // 2) | ~np.isfinite(zscore)] = np.nan
+
+    # Orient each pair so the ratio fell: weak leg over strong leg
+    flip = zscore > 0
+    weak = np.where(flip, j, i)
+    strong = np.where(flip, i, j)
+    sign = np.where(flip, -1.0, 1.0)
+    zscore = zscore * sign
+
+    scored = np.flatnonzero(~np.isnan(zscore))
+    if top is not None and top < len(scored):
+        scored = scored[np.argpartition(zscore[scored], top)[:top]]
+    order = scored[np.argsort(zscore[scored], kind='stable')]
+
+    table = pd.DataFrame({
+        'weak': tickers[weak[order]],
+        'strong': tickers[strong[order]],
+        'change_5d': np.expm1(change[order] * sign[order]) * 100,
+        'change_10d': np.expm1((trend[i] - trend[j])[order] * sign[order]) * 100,
+        'zscore': zscore[order],
+    })
+    table.index = table['weak'] + '/' + table['strong']
+    table.index.name = 'pair'
+    return table
+
+
+def pair_subjects(table):
+    """Stress table keyed by its legs in sorted order, so a pair keeps one name whichever leg is weak"""
+    weak, strong = table['weak'].to_numpy(dtype=str), table['strong'].to_numpy(dtype=str)
+    ordered = weak < strong
+    first, second = np.where(ordered, weak, strong), np.where(ordered, strong, weak)
+    return table.set_axis(pd.Index(np.char.add(np.char.add(first, '/'), second), name='pair'))
+
+
+def scan_universe(tickers, download, store=None, offline=False, top=50):
+    """Bulk-sync the universe store and rank its pairs; returns (stress table, as-of date)"""
+    store = store or PriceStore(os.path.join(DEFAULT_STORE_PATH, 'universe'))
+    prices = sync_prices(store, tickers, download, offline=offline, days=UNIVERSE_DAYS)
+    prices = align_prices(prices.dropna(axis=1, how='all')).prices
+    return pair_stress(prices, top=top), prices.index[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank ratio-momentum stress across every pair in a universe")
+    parser.add_argument('--universe', default=UNIVERSE_FILE, help="file with one ticker per line")
+    parser.add_argument('--top', type=int, default=50)
+    parser.add_argument('--offline', action='store_true', default=OFFLINE)
+    args = parser.parse_args()
+
+    if PRICE_FIXTURE:
+        download = FixtureFeed(PRICE_FIXTURE).download
+    else:
+        import yfinance as yf
+        download = yf.download
+    table, asof = scan_universe(load_universe(args.universe), download, offline=args.offline, top=args.top)
+    print(f"pair stress as of {asof:%Y-%m-%d}")
+    print(table.to_string(float_format=lambda v: f"{v:8.2f}"))
+
+
+if __name__ == "__main__":
+    main()